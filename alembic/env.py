@@ -1,8 +1,5 @@
 from logging.config import fileConfig
 
-from sqlalchemy import engine_from_config, create_engine
-from sqlalchemy import pool
-
 from alembic import context
 
 import os
@@ -16,30 +13,13 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 load_dotenv()
 
 # Import your models
-from app.core.database import Base, DATABASE_URL
+from app.core.database import Base, DATABASE_URL, create_db_engine
 from app.models import models  # Import all models here
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
 
-# Create engine with the same configuration as the main application
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={
-        "sslmode": "require",
-        "connect_timeout": 30,
-        "application_name": "student_management",
-        "options": "-c statement_timeout=60000"  # 60 seconds
-    },
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-    pool_recycle=3600,  # Recycle connections after 1 hour
-    pool_timeout=30,    # Timeout for getting connection from pool
-    pool_use_lifo=True  # Use LIFO to reduce number of connections in use
-)
-
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
@@ -85,6 +65,8 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    # Cùng cấu hình kết nối và pool với app (DB_POOL_MODE, SSL, statement_timeout)
+    engine = create_db_engine()
     with engine.connect() as connection:
         context.configure(
             connection=connection,
@@ -93,6 +75,7 @@ def run_migrations_online() -> None:
 
         with context.begin_transaction():
             context.run_migrations()
+    engine.dispose()
 
 
 if context.is_offline_mode():
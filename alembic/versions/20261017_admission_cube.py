@@ -0,0 +1,137 @@
+"""admission analytics cube
+
+Revision ID: 20261017_admission_cube
+Revises: 20261017_timetable
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261017_admission_cube'
+down_revision: Union[str, None] = '20261017_timetable'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10000
+
+# Khoảng điểm thi và trạng thái bỏ học tại revision này (bản sao cố định của app.core.admissions)
+SCORE_BANDS = [
+    (27.0, '27-30'),
+    (24.0, '24-27'),
+    (21.0, '21-24'),
+    (18.0, '18-21'),
+    (15.0, '15-18'),
+    (0.0, '0-15'),
+]
+DROPOUT_STATUSES = {'thoi hoc'}
+CUBE_DIMENSIONS = ('cohort', 'high_school', 'hometown', 'score_band')
+CUBE_COLUMNS = (
+    'student_count', 'gpa_sum', 'gpa_count', 'dropout_count',
+    'fit_count', 'fit_x_sum', 'fit_y_sum', 'fit_xx_sum', 'fit_xy_sum', 'fit_yy_sum',
+)
+
+_WHITESPACE = re.compile(r'\s+')
+
+students = sa.table(
+    'students',
+    sa.column('graduation_year', sa.Integer()),
+    sa.column('high_school', sa.String()),
+    sa.column('hometown', sa.String()),
+    sa.column('university_entrance_score', sa.Float()),
+    sa.column('gpa', sa.Float()),
+    sa.column('study_status', sa.String()),
+)
+admission_cube = sa.table(
+    'admission_cube',
+    sa.column('cohort', sa.Integer()),
+    sa.column('high_school', sa.String()),
+    sa.column('hometown', sa.String()),
+    sa.column('score_band', sa.String()),
+    sa.column('student_count', sa.Integer()),
+    sa.column('gpa_sum', sa.Float()),
+    sa.column('gpa_count', sa.Integer()),
+    sa.column('dropout_count', sa.Integer()),
+    sa.column('fit_count', sa.Integer()),
+    sa.column('fit_x_sum', sa.Float()),
+    sa.column('fit_y_sum', sa.Float()),
+    sa.column('fit_xx_sum', sa.Float()),
+    sa.column('fit_xy_sum', sa.Float()),
+    sa.column('fit_yy_sum', sa.Float()),
+)
+
+
+def fold_text(value):
+    if not value:
+        return ''
+    value = value.replace('đ', 'd').replace('Đ', 'D')
+    decomposed = unicodedata.normalize('NFD', value)
+    stripped = ''.join(ch for ch in decomposed if unicodedata.category(ch) != 'Mn')
+    return _WHITESPACE.sub(' ', stripped).strip().lower()
+
+
+def score_band(score):
+    if score is None:
+        return ''
+    for lower, label in SCORE_BANDS:
+        if score >= lower:
+            return label
+    return SCORE_BANDS[-1][1]
+
+
+def cube_rows(conn):
+    # Mỗi sinh viên góp vào đúng một ô; fit_* là các tổng để khớp GPA theo điểm thi
+    cells = defaultdict(lambda: [0, 0.0, 0, 0, 0, 0.0, 0.0, 0.0, 0.0, 0.0])
+    for graduation_year, high_school, hometown, x, y, study_status in conn.execute(sa.select(students)):
+        row = cells[(graduation_year or 0, high_school or '', hometown or '', score_band(x))]
+        row[0] += 1
+        if y is not None:
+            row[1] += y
+            row[2] += 1
+        if fold_text(study_status) in DROPOUT_STATUSES:
+            row[3] += 1
+        if x is not None and y is not None:
+            for i, amount in enumerate((1, x, y, x * x, x * y, y * y), start=4):
+                row[i] += amount
+    return [dict(zip(CUBE_DIMENSIONS + CUBE_COLUMNS, key + tuple(totals))) for key, totals in sorted(cells.items())]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'admission_cube',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cohort', sa.Integer(), nullable=False),
+        sa.Column('high_school', sa.String(), nullable=False),
+        sa.Column('hometown', sa.String(), nullable=False),
+        sa.Column('score_band', sa.String(), nullable=False),
+        sa.Column('student_count', sa.Integer(), nullable=False),
+        sa.Column('gpa_sum', sa.Float(), nullable=False),
+        sa.Column('gpa_count', sa.Integer(), nullable=False),
+        sa.Column('dropout_count', sa.Integer(), nullable=False),
+        sa.Column('fit_count', sa.Integer(), nullable=False),
+        sa.Column('fit_x_sum', sa.Float(), nullable=False),
+        sa.Column('fit_y_sum', sa.Float(), nullable=False),
+        sa.Column('fit_xx_sum', sa.Float(), nullable=False),
+        sa.Column('fit_xy_sum', sa.Float(), nullable=False),
+        sa.Column('fit_yy_sum', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('cohort', 'high_school', 'hometown', 'score_band', name='uq_admission_cube_key'),
+    )
+    op.create_index(op.f('ix_admission_cube_cohort'), 'admission_cube', ['cohort'], unique=False)
+
+    # Tính khối ban đầu từ dữ liệu sinh viên hiện có
+    bind = op.get_bind()
+    rows = cube_rows(bind)
+    for start in range(0, len(rows), BATCH_SIZE):
+        bind.execute(admission_cube.insert(), rows[start:start + BATCH_SIZE])
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_admission_cube_cohort'), table_name='admission_cube')
+    op.drop_table('admission_cube')
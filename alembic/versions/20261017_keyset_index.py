@@ -0,0 +1,25 @@
+"""students keyset pagination index
+
+Revision ID: 20261017_keyset_index
+Revises: 20240326_initial
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261017_keyset_index'
+down_revision: Union[str, None] = '20240326_initial'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_students_full_name_id', 'students', ['full_name', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_students_full_name_id', table_name='students')
@@ -0,0 +1,137 @@
+"""normalized student activities and peer groups
+
+Revision ID: 20261017_student_activities
+Revises: 20261017_admission_cube
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+import re
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261017_student_activities'
+down_revision: Union[str, None] = '20261017_admission_cube'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10000
+
+_SEPARATORS = re.compile(r'[,;\n]+')
+_WHITESPACE = re.compile(r'\s+')
+
+students = sa.table(
+    'students',
+    sa.column('id', sa.Integer()),
+    sa.column('extracurricular_activities', sa.String()),
+    sa.column('special_skills', sa.String()),
+)
+activities = sa.table(
+    'activities',
+    sa.column('id', sa.Integer()),
+    sa.column('key', sa.String()),
+    sa.column('name', sa.String()),
+)
+student_activities = sa.table(
+    'student_activities',
+    sa.column('student_id', sa.Integer()),
+    sa.column('activity_id', sa.Integer()),
+)
+
+
+# Bản sao cố định của cách tách và gộp hoạt động trong app.core.activities tại revision này
+def fold_text(value):
+    if not value:
+        return ''
+    value = value.replace('đ', 'd').replace('Đ', 'D')
+    decomposed = unicodedata.normalize('NFD', value)
+    stripped = ''.join(ch for ch in decomposed if unicodedata.category(ch) != 'Mn')
+    return _WHITESPACE.sub(' ', stripped).strip().lower()
+
+
+def parse_activities(*texts):
+    parsed = {}
+    for value in texts:
+        if not value:
+            continue
+        for part in _SEPARATORS.split(value):
+            name = ' '.join(part.split()).strip(' .')
+            key = fold_text(name)
+            if key:
+                parsed.setdefault(key, name[:1].upper() + name[1:])
+    return parsed
+
+
+def upgrade() -> None:
+    op.create_table(
+        'activities',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('key'),
+    )
+    op.create_index(op.f('ix_activities_id'), 'activities', ['id'], unique=False)
+    op.create_table(
+        'student_activities',
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('activity_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['activity_id'], ['activities.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('student_id', 'activity_id'),
+    )
+    op.create_index(op.f('ix_student_activities_activity_id'), 'student_activities', ['activity_id'], unique=False)
+    op.create_table(
+        'student_peer_groups',
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('group_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('student_id'),
+    )
+    op.create_index(op.f('ix_student_peer_groups_group_id'), 'student_peer_groups', ['group_id'], unique=False)
+
+    # Chuẩn hóa hoạt động của sinh viên hiện có theo lô; nhóm cùng sở thích được tính sau
+    # bằng lệnh detect-peer-groups
+    bind = op.get_bind()
+    known = {}
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(students.c.id, students.c.extracurricular_activities, students.c.special_skills)
+            .where(students.c.id > last_id)
+            .order_by(students.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        parsed = [(student_id, parse_activities(*texts)) for student_id, *texts in rows]
+        new = {}
+        for _, student_parsed in parsed:
+            for key, name in student_parsed.items():
+                if key not in known:
+                    new.setdefault(key, name)
+        if new:
+            bind.execute(activities.insert(), [{'key': key, 'name': name} for key, name in new.items()])
+            known.update(bind.execute(
+                sa.select(activities.c.key, activities.c.id).where(activities.c.key.in_(new))
+            ).all())
+        link_rows = [
+            {'student_id': student_id, 'activity_id': known[key]}
+            for student_id, student_parsed in parsed
+            for key in student_parsed
+        ]
+        if link_rows:
+            bind.execute(student_activities.insert(), link_rows)
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_student_peer_groups_group_id'), table_name='student_peer_groups')
+    op.drop_table('student_peer_groups')
+    op.drop_index(op.f('ix_student_activities_activity_id'), table_name='student_activities')
+    op.drop_table('student_activities')
+    op.drop_index(op.f('ix_activities_id'), table_name='activities')
+    op.drop_table('activities')
@@ -0,0 +1,192 @@
+"""precomputed student recommendations
+
+Revision ID: 20261017_student_recommendations
+Revises: 20261017_student_risk_scores
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+import re
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261017_student_recommendations'
+down_revision: Union[str, None] = '20261017_student_risk_scores'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10000
+TOP_K = 5
+
+# Danh mục và không gian đặc trưng tại revision này (bản sao cố định của app.core.recommend):
+# (mã, từ khóa, GPA tối thiểu, điểm thi tối thiểu)
+CATALOG = [
+    ('7480201', ['lập trình', 'tin học', 'máy tính', 'phần mềm', 'thuật toán', 'olympic tin'], 2.5, 24.0),
+    ('7480101', ['thuật toán', 'toán', 'lập trình', 'trí tuệ nhân tạo', 'olympic toán'], 3.0, 26.0),
+    ('7340101', ['kinh doanh', 'lãnh đạo', 'quản lý', 'khởi nghiệp', 'thuyết trình'], 2.0, 22.0),
+    ('7340201', ['tài chính', 'kế toán', 'đầu tư', 'toán', 'chứng khoán'], 2.5, 23.0),
+    ('7220201', ['tiếng anh', 'ielts', 'toeic', 'ngoại ngữ', 'dịch thuật', 'hùng biện'], 2.5, 23.0),
+    ('7210403', ['vẽ', 'thiết kế', 'hội họa', 'nhiếp ảnh', 'photoshop', 'sáng tạo'], 2.0, 20.0),
+    ('7310401', ['tâm lý', 'tư vấn', 'tình nguyện', 'công tác xã hội', 'lắng nghe'], 2.0, 21.0),
+    ('7520201', ['điện', 'điện tử', 'robot', 'vật lý', 'arduino'], 2.5, 22.0),
+    ('7810101', ['du lịch', 'hướng dẫn viên', 'ngoại ngữ', 'giao tiếp', 'sự kiện'], 2.0, 20.0),
+    ('7140209', ['toán', 'gia sư', 'giảng dạy', 'olympic toán', 'học sinh giỏi'], 2.8, 25.0),
+    ('INT3401', ['trí tuệ nhân tạo', 'học máy', 'lập trình', 'toán'], 3.0, 0.0),
+    ('INT2208', ['phần mềm', 'lập trình', 'làm việc nhóm'], 2.0, 0.0),
+    ('BSA2001', ['lãnh đạo', 'câu lạc bộ', 'làm việc nhóm', 'thuyết trình'], 0.0, 0.0),
+    ('FLF2101', ['tiếng anh', 'ielts', 'ngoại ngữ'], 0.0, 0.0),
+    ('PSY1050', ['tư vấn', 'tâm lý', 'lắng nghe', 'tình nguyện'], 0.0, 0.0),
+    ('ART1002', ['nhiếp ảnh', 'thiết kế', 'sáng tạo'], 0.0, 0.0),
+]
+GPA_BUCKETS = [(3.6, '3.6-4.0'), (3.2, '3.2-3.6'), (2.5, '2.5-3.2'), (2.0, '2.0-2.5'), (1.0, '1.0-2.0'), (0.0, '0.0-1.0')]
+ENTRANCE_BANDS = [(27.0, '27-30'), (24.0, '24-27'), (21.0, '21-24'), (18.0, '18-21'), (0.0, '0-18')]
+LEVEL_WEIGHT = 0.5
+TEXT_FIELDS = ('special_skills', 'achievements', 'extracurricular_activities')
+
+_WHITESPACE = re.compile(r'\s+')
+
+students = sa.table(
+    'students',
+    sa.column('id', sa.Integer()),
+    sa.column('special_skills', sa.String()),
+    sa.column('achievements', sa.String()),
+    sa.column('extracurricular_activities', sa.String()),
+    sa.column('gpa', sa.Float()),
+    sa.column('university_entrance_score', sa.Float()),
+)
+student_recommendations = sa.table(
+    'student_recommendations',
+    sa.column('student_id', sa.Integer()),
+    sa.column('rank', sa.Integer()),
+    sa.column('item_code', sa.String()),
+    sa.column('score', sa.Float()),
+)
+
+
+def fold_text(value):
+    if not value:
+        return ''
+    value = value.replace('đ', 'd').replace('Đ', 'D')
+    decomposed = unicodedata.normalize('NFD', value)
+    stripped = ''.join(ch for ch in decomposed if unicodedata.category(ch) != 'Mn')
+    return _WHITESPACE.sub(' ', stripped).strip().lower()
+
+
+def band(value, bands):
+    for lower, label in bands:
+        if value >= lower:
+            return label
+    return bands[-1][1]
+
+
+def build_vocabulary():
+    vocabulary = {}
+    for _, keywords, _, _ in CATALOG:
+        for keyword in keywords:
+            vocabulary.setdefault(fold_text(keyword), len(vocabulary))
+    level_start = len(vocabulary)
+    for _, label in GPA_BUCKETS:
+        vocabulary[f'gpa:{label}'] = len(vocabulary)
+    for _, label in ENTRANCE_BANDS:
+        vocabulary[f'entrance:{label}'] = len(vocabulary)
+    return vocabulary, level_start
+
+
+def build_item_matrix(vocabulary):
+    matrix = np.zeros((len(CATALOG), len(vocabulary)))
+    for row, (_, keywords, min_gpa, min_entrance) in enumerate(CATALOG):
+        for keyword in keywords:
+            matrix[row, vocabulary[fold_text(keyword)]] = 1.0
+        for lower, label in GPA_BUCKETS:
+            if lower >= min_gpa:
+                matrix[row, vocabulary[f'gpa:{label}']] = LEVEL_WEIGHT
+        for lower, label in ENTRANCE_BANDS:
+            if lower >= min_entrance:
+                matrix[row, vocabulary[f'entrance:{label}']] = LEVEL_WEIGHT
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def student_terms(vocabulary, max_words, text_values, gpa, entrance_score):
+    words = fold_text(' '.join(value for value in text_values if value)).replace(',', ' ').replace(';', ' ').split()
+    indices = []
+    for size in range(1, max_words + 1):
+        for start in range(len(words) - size + 1):
+            index = vocabulary.get(' '.join(words[start:start + size]))
+            if index is not None:
+                indices.append(index)
+    if gpa is not None:
+        indices.append(vocabulary[f'gpa:{band(gpa, GPA_BUCKETS)}'])
+    if entrance_score is not None:
+        indices.append(vocabulary[f'entrance:{band(entrance_score, ENTRANCE_BANDS)}'])
+    return indices
+
+
+def recommend_rows(rows, vocabulary, level_start, items):
+    # Cosine giữa hồ sơ sinh viên và cả danh mục, lấy top-k cho từng sinh viên
+    max_words = max(len(key.split()) for key in list(vocabulary)[:level_start])
+    top_k = min(TOP_K, len(CATALOG))
+    vectors = np.zeros((len(rows), len(vocabulary)))
+    for row_index, (_, *text_values, gpa, entrance_score) in enumerate(rows):
+        indices = student_terms(vocabulary, max_words, text_values, gpa, entrance_score)
+        if indices:
+            np.add.at(vectors[row_index], indices, 1.0)
+    vectors[:, level_start:] *= LEVEL_WEIGHT
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    scores = vectors @ items.T
+    top = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+    result = []
+    for (student_id, *_), row_items, row_scores in zip(rows, top.tolist(), top_scores.tolist()):
+        rank = 0
+        for item, score in zip(row_items, row_scores):
+            if score <= 0:
+                break
+            rank += 1
+            result.append({'student_id': student_id, 'rank': rank, 'item_code': CATALOG[item][0], 'score': score})
+    return result
+
+
+def upgrade() -> None:
+    op.create_table(
+        'student_recommendations',
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.Column('item_code', sa.String(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('student_id', 'rank'),
+    )
+
+    # Tính gợi ý ban đầu cho sinh viên hiện có theo lô
+    bind = op.get_bind()
+    vocabulary, level_start = build_vocabulary()
+    items = build_item_matrix(vocabulary)
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(students.c.id, *[students.c[field] for field in TEXT_FIELDS],
+                      students.c.gpa, students.c.university_entrance_score)
+            .where(students.c.id > last_id)
+            .order_by(students.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        recommendations = recommend_rows(rows, vocabulary, level_start, items)
+        if recommendations:
+            bind.execute(student_recommendations.insert(), recommendations)
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    op.drop_table('student_recommendations')
@@ -0,0 +1,146 @@
+"""student dropout risk scores
+
+Revision ID: 20261017_student_risk_scores
+Revises: 20261017_student_stats
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+import math
+import re
+import unicodedata
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261017_student_risk_scores'
+down_revision: Union[str, None] = '20261017_student_stats'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10000
+
+# Mô hình rủi ro phiên bản 1 (bản sao cố định của app.core.risk tại revision này)
+RISK_MODEL_VERSION = 1
+RISK_BIAS = -2.0
+GPA_WEIGHT = 4.0
+GPA_REFERENCE = 2.5
+CREDIT_GAP_WEIGHT = 2.0
+CREDITS_PER_YEAR = 30
+ENTRANCE_WEIGHT = 1.0
+ENTRANCE_REFERENCE = 20.0
+STUDY_STATUS_WEIGHTS = {
+    'dang hoc': 0.0,
+    'bao luu': 1.5,
+    'canh bao hoc vu': 2.0,
+    'dinh chi': 3.0,
+    'thoi hoc': 6.0,
+    'tot nghiep': -6.0,
+}
+
+_WHITESPACE = re.compile(r'\s+')
+
+students = sa.table(
+    'students',
+    sa.column('id', sa.Integer()),
+    sa.column('class_id', sa.Integer()),
+    sa.column('gpa', sa.Float()),
+    sa.column('accumulated_credits', sa.Integer()),
+    sa.column('university_entrance_score', sa.Float()),
+    sa.column('graduation_year', sa.Integer()),
+    sa.column('study_status', sa.String()),
+)
+student_risk_scores = sa.table(
+    'student_risk_scores',
+    sa.column('student_id', sa.Integer()),
+    sa.column('class_id', sa.Integer()),
+    sa.column('score', sa.Float()),
+    sa.column('model_version', sa.Integer()),
+    sa.column('computed_at', sa.DateTime(timezone=True)),
+)
+
+
+def fold_text(value):
+    if not value:
+        return ''
+    value = value.replace('đ', 'd').replace('Đ', 'D')
+    decomposed = unicodedata.normalize('NFD', value)
+    stripped = ''.join(ch for ch in decomposed if unicodedata.category(ch) != 'Mn')
+    return _WHITESPACE.sub(' ', stripped).strip().lower()
+
+
+def clip(value, lower, upper):
+    return min(max(value, lower), upper)
+
+
+def score_student(gpa, credits, entrance_score, graduation_year, study_status, current_year):
+    # Cùng công thức với bản NumPy của ứng dụng, chấm từng sinh viên; None là giá trị thiếu
+    gpa_term = (GPA_REFERENCE - (GPA_REFERENCE if gpa is None else gpa)) / GPA_REFERENCE
+    if graduation_year is None:
+        expected_credits = 0.0
+    else:
+        expected_credits = clip(current_year - graduation_year, 0, 4) * CREDITS_PER_YEAR
+    if credits is None:
+        credits = expected_credits
+    credit_gap = clip((expected_credits - credits) / max(expected_credits, 1.0), 0.0, 1.0)
+    entrance_term = clip(
+        (ENTRANCE_REFERENCE - (ENTRANCE_REFERENCE if entrance_score is None else entrance_score)) / 10.0, -1.0, 1.0
+    )
+    logit = (
+        RISK_BIAS
+        + GPA_WEIGHT * gpa_term
+        + CREDIT_GAP_WEIGHT * credit_gap
+        + ENTRANCE_WEIGHT * entrance_term
+        + STUDY_STATUS_WEIGHTS.get(fold_text(study_status), 0.0)
+    )
+    return 1.0 / (1.0 + math.exp(-logit))
+
+
+def upgrade() -> None:
+    op.create_table(
+        'student_risk_scores',
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('class_id', sa.Integer(), nullable=True),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('model_version', sa.Integer(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('student_id'),
+    )
+    op.create_index('ix_student_risk_scores_score', 'student_risk_scores', ['score'], unique=False)
+    op.create_index(
+        'ix_student_risk_scores_class_id_score', 'student_risk_scores', ['class_id', 'score'], unique=False
+    )
+
+    # Chấm điểm ban đầu cho sinh viên hiện có
+    bind = op.get_bind()
+    now = datetime.now(timezone.utc)
+    rows = bind.execute(sa.select(
+        students.c.id,
+        students.c.class_id,
+        students.c.gpa,
+        students.c.accumulated_credits,
+        students.c.university_entrance_score,
+        students.c.graduation_year,
+        students.c.study_status,
+    )).all()
+    scores = [
+        {
+            'student_id': student_id,
+            'class_id': class_id,
+            'score': score_student(*features, now.year),
+            'model_version': RISK_MODEL_VERSION,
+            'computed_at': now,
+        }
+        for student_id, class_id, *features in rows
+    ]
+    for start in range(0, len(scores), BATCH_SIZE):
+        bind.execute(student_risk_scores.insert(), scores[start:start + BATCH_SIZE])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_student_risk_scores_class_id_score', table_name='student_risk_scores')
+    op.drop_index('ix_student_risk_scores_score', table_name='student_risk_scores')
+    op.drop_table('student_risk_scores')
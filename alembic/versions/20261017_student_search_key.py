@@ -0,0 +1,101 @@
+"""student search key
+
+Revision ID: 20261017_student_search_key
+Revises: 20261017_keyset_index
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+import re
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261017_student_search_key'
+down_revision: Union[str, None] = '20261017_keyset_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+# Bản sao cố định của app.core.search tại revision này, để migration không phụ thuộc code hiện tại
+def fold_text(value):
+    if not value:
+        return ''
+    value = value.replace('đ', 'd').replace('Đ', 'D')
+    decomposed = unicodedata.normalize('NFD', value)
+    stripped = ''.join(ch for ch in decomposed if unicodedata.category(ch) != 'Mn')
+    return _WHITESPACE.sub(' ', stripped).strip().lower()
+
+
+def build_search_key(full_name, student_code, email):
+    return ' '.join(part for part in (fold_text(full_name), fold_text(student_code), fold_text(email)) if part)
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS students_fts USING fts5("
+    "search_key, content='students', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS students_fts_ai AFTER INSERT ON students BEGIN "
+    "INSERT INTO students_fts(rowid, search_key) VALUES (new.id, new.search_key); END",
+    "CREATE TRIGGER IF NOT EXISTS students_fts_ad AFTER DELETE ON students BEGIN "
+    "INSERT INTO students_fts(students_fts, rowid, search_key) VALUES ('delete', old.id, old.search_key); END",
+    "CREATE TRIGGER IF NOT EXISTS students_fts_au AFTER UPDATE OF search_key ON students BEGIN "
+    "INSERT INTO students_fts(students_fts, rowid, search_key) VALUES ('delete', old.id, old.search_key); "
+    "INSERT INTO students_fts(rowid, search_key) VALUES (new.id, new.search_key); END",
+]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    op.add_column('students', sa.Column('search_key', sa.String(), nullable=True))
+
+    # Backfill search_key theo lô
+    students = sa.table(
+        'students',
+        sa.column('id', sa.Integer()),
+        sa.column('full_name', sa.String()),
+        sa.column('student_code', sa.String()),
+        sa.column('email', sa.String()),
+        sa.column('search_key', sa.String()),
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(students.c.id, students.c.full_name, students.c.student_code, students.c.email)
+            .where(students.c.id > last_id)
+            .order_by(students.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        bind.execute(
+            students.update().where(students.c.id == sa.bindparam('_id')).values(search_key=sa.bindparam('_key')),
+            [{'_id': row.id, '_key': build_search_key(row.full_name, row.student_code, row.email)} for row in rows]
+        )
+        last_id = rows[-1].id
+
+    if bind.dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index(
+            'ix_students_search_key_trgm', 'students', ['search_key'],
+            postgresql_using='gin', postgresql_ops={'search_key': 'gin_trgm_ops'}
+        )
+    elif bind.dialect.name == 'sqlite':
+        for statement in SQLITE_SEARCH_DDL:
+            op.execute(statement)
+        op.execute("INSERT INTO students_fts(students_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.drop_index('ix_students_search_key_trgm', table_name='students')
+    elif bind.dialect.name == 'sqlite':
+        for trigger in ('students_fts_ai', 'students_fts_ad', 'students_fts_au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS students_fts')
+    op.drop_column('students', 'search_key')
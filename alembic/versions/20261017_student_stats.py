@@ -0,0 +1,107 @@
+"""student stats rollup table
+
+Revision ID: 20261017_student_stats
+Revises: 20261017_student_search_key
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261017_student_stats'
+down_revision: Union[str, None] = '20261017_student_search_key'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Khoảng GPA và các chiều thống kê tại revision này (bản sao cố định của app.core.stats)
+GPA_BUCKETS = [
+    (3.6, '3.6-4.0'),
+    (3.2, '3.2-3.6'),
+    (2.5, '2.5-3.2'),
+    (2.0, '2.0-2.5'),
+    (1.0, '1.0-2.0'),
+    (0.0, '0.0-1.0'),
+]
+STATUS_DIMENSIONS = ('academic_status', 'study_status', 'gender')
+
+students = sa.table(
+    'students',
+    sa.column('class_id', sa.Integer()),
+    sa.column('gpa', sa.Float()),
+    sa.column('accumulated_credits', sa.Integer()),
+    sa.column('academic_status', sa.String()),
+    sa.column('study_status', sa.String()),
+    sa.column('gender', sa.String()),
+)
+student_stats = sa.table(
+    'student_stats',
+    sa.column('class_id', sa.Integer()),
+    sa.column('dimension', sa.String()),
+    sa.column('value', sa.String()),
+    sa.column('student_count', sa.Integer()),
+    sa.column('gpa_sum', sa.Float()),
+    sa.column('gpa_count', sa.Integer()),
+    sa.column('credits_sum', sa.Integer()),
+)
+
+
+def backfill_statement():
+    # Mỗi sinh viên có lớp góp một dòng vào mỗi chiều: tổng lớp, từng trạng thái và khoảng GPA
+    gpa_value = sa.case(
+        (students.c.gpa.is_(None), ''),
+        *[(students.c.gpa >= lower, label) for lower, label in GPA_BUCKETS],
+        else_=GPA_BUCKETS[-1][1]
+    )
+    values = [('all', sa.literal('', sa.String))]
+    values += [(dimension, sa.func.coalesce(students.c[dimension], '')) for dimension in STATUS_DIMENSIONS]
+    values.append(('gpa', gpa_value))
+    source = sa.union_all(*[
+        sa.select(
+            students.c.class_id.label('class_id'),
+            sa.literal(dimension, sa.String).label('dimension'),
+            value.label('value'),
+            students.c.gpa.label('gpa'),
+            students.c.accumulated_credits.label('credits'),
+        ).where(students.c.class_id.isnot(None))
+        for dimension, value in values
+    ]).subquery()
+    rollup = sa.select(
+        source.c.class_id,
+        source.c.dimension,
+        source.c.value,
+        sa.func.count(),
+        sa.func.coalesce(sa.func.sum(source.c.gpa), 0.0),
+        sa.func.count(source.c.gpa),
+        sa.func.coalesce(sa.func.sum(source.c.credits), 0),
+    ).group_by(source.c.class_id, source.c.dimension, source.c.value)
+    return student_stats.insert().from_select(
+        ['class_id', 'dimension', 'value', 'student_count', 'gpa_sum', 'gpa_count', 'credits_sum'], rollup
+    )
+
+
+def upgrade() -> None:
+    op.create_table(
+        'student_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('class_id', sa.Integer(), nullable=False),
+        sa.Column('dimension', sa.String(), nullable=False),
+        sa.Column('value', sa.String(), nullable=False),
+        sa.Column('student_count', sa.Integer(), nullable=False),
+        sa.Column('gpa_sum', sa.Float(), nullable=False),
+        sa.Column('gpa_count', sa.Integer(), nullable=False),
+        sa.Column('credits_sum', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('class_id', 'dimension', 'value', name='uq_student_stats_key'),
+    )
+    op.create_index(op.f('ix_student_stats_class_id'), 'student_stats', ['class_id'], unique=False)
+
+    # Tính số liệu ban đầu từ dữ liệu sinh viên hiện có; bảng vừa tạo nên không cần xóa hay khóa
+    op.get_bind().execute(backfill_statement())
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_student_stats_class_id'), table_name='student_stats')
+    op.drop_table('student_stats')
@@ -0,0 +1,55 @@
+"""teaching feedback and streaming aggregates
+
+Revision ID: 20261017_teaching_feedback
+Revises: 20261017_student_activities
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261017_teaching_feedback'
+down_revision: Union[str, None] = '20261017_student_activities'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'teaching_feedback',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('section_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('lecturer', sa.String(), nullable=True),
+        sa.Column('rating', sa.Integer(), nullable=False),
+        sa.Column('comment', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.ForeignKeyConstraint(['section_id'], ['course_sections.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('section_id', 'user_id', name='uq_teaching_feedback_section_user'),
+    )
+    op.create_index(op.f('ix_teaching_feedback_id'), 'teaching_feedback', ['id'], unique=False)
+    op.create_table(
+        'feedback_aggregates',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('scope', sa.String(), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('response_count', sa.Integer(), nullable=False),
+        sa.Column('rating_sum', sa.Integer(), nullable=False),
+        sa.Column('rating_1', sa.Integer(), nullable=False),
+        sa.Column('rating_2', sa.Integer(), nullable=False),
+        sa.Column('rating_3', sa.Integer(), nullable=False),
+        sa.Column('rating_4', sa.Integer(), nullable=False),
+        sa.Column('rating_5', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('scope', 'key', name='uq_feedback_aggregates_scope_key'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('feedback_aggregates')
+    op.drop_index(op.f('ix_teaching_feedback_id'), table_name='teaching_feedback')
+    op.drop_table('teaching_feedback')
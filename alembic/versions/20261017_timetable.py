@@ -0,0 +1,100 @@
+"""timetable: rooms, time slots, course sections, assignments, schedule jobs
+
+Revision ID: 20261017_timetable
+Revises: 20261017_student_recommendations
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261017_timetable'
+down_revision: Union[str, None] = '20261017_student_recommendations'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'rooms',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('capacity', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_rooms_id'), 'rooms', ['id'], unique=False)
+    op.create_index(op.f('ix_rooms_name'), 'rooms', ['name'], unique=True)
+
+    op.create_table(
+        'time_slots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('day_of_week', sa.Integer(), nullable=False),
+        sa.Column('period', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('day_of_week', 'period', name='uq_time_slots_day_period'),
+    )
+    op.create_index(op.f('ix_time_slots_id'), 'time_slots', ['id'], unique=False)
+
+    op.create_table(
+        'course_sections',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('code', sa.String(), nullable=True),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('class_id', sa.Integer(), nullable=True),
+        sa.Column('lecturer', sa.String(), nullable=True),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('sessions_per_week', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['class_id'], ['classes.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_course_sections_id'), 'course_sections', ['id'], unique=False)
+    op.create_index(op.f('ix_course_sections_code'), 'course_sections', ['code'], unique=True)
+    op.create_index(op.f('ix_course_sections_class_id'), 'course_sections', ['class_id'], unique=False)
+
+    op.create_table(
+        'section_assignments',
+        sa.Column('section_id', sa.Integer(), nullable=False),
+        sa.Column('session', sa.Integer(), nullable=False),
+        sa.Column('slot_id', sa.Integer(), nullable=False),
+        sa.Column('room_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['section_id'], ['course_sections.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['slot_id'], ['time_slots.id']),
+        sa.ForeignKeyConstraint(['room_id'], ['rooms.id']),
+        sa.PrimaryKeyConstraint('section_id', 'session'),
+        sa.UniqueConstraint('slot_id', 'room_id', name='uq_section_assignments_slot_room'),
+    )
+
+    op.create_table(
+        'schedule_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('section_id', sa.Integer(), nullable=True),
+        sa.Column('status', sa.Enum('PENDING', 'RUNNING', 'DONE', 'FAILED', name='schedulejobstatus'), nullable=False),
+        sa.Column('assigned', sa.Integer(), nullable=True),
+        sa.Column('unassigned', sa.Integer(), nullable=True),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_schedule_jobs_id'), 'schedule_jobs', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_schedule_jobs_id'), table_name='schedule_jobs')
+    op.drop_table('schedule_jobs')
+    sa.Enum(name='schedulejobstatus').drop(op.get_bind(), checkfirst=True)
+    op.drop_table('section_assignments')
+    op.drop_index(op.f('ix_course_sections_class_id'), table_name='course_sections')
+    op.drop_index(op.f('ix_course_sections_code'), table_name='course_sections')
+    op.drop_index(op.f('ix_course_sections_id'), table_name='course_sections')
+    op.drop_table('course_sections')
+    op.drop_index(op.f('ix_time_slots_id'), table_name='time_slots')
+    op.drop_table('time_slots')
+    op.drop_index(op.f('ix_rooms_name'), table_name='rooms')
+    op.drop_index(op.f('ix_rooms_id'), table_name='rooms')
+    op.drop_table('rooms')
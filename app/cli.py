@@ -0,0 +1,108 @@
+# Lệnh quản trị chạy ngoài API:
+#   python -m app.cli create-admin    tạo tài khoản admin mặc định (mật khẩu lấy từ ADMIN_PASSWORD) nếu chưa có
+#   python -m app.cli rebuild-stats   tính lại bảng student_stats từ bảng students
+#   python -m app.cli rescore-risk    chấm lại điểm rủi ro bỏ học của toàn bộ sinh viên
+#   python -m app.cli recompute-recommendations   tính lại gợi ý ngành/môn học cho toàn bộ sinh viên
+#   python -m app.cli rebuild-admissions   tính lại khối tổng hợp tuyển sinh admission_cube
+#   python -m app.cli rebuild-activities   chuẩn hóa lại hoạt động ngoại khóa/kỹ năng của toàn bộ sinh viên
+#   python -m app.cli detect-peer-groups   tính lại các nhóm sinh viên cùng sở thích
+#   python -m app.cli rebuild-feedback     tính lại tổng hợp đánh giá giảng dạy từ bảng teaching_feedback
+import argparse
+import os
+import time
+from sqlalchemy import select
+from .core.activities import detect_peer_groups, rebuild_activities
+from .core.admissions import rebuild_admission_cube
+from .core.database import engine
+from .core.feedback import rebuild_statements as rebuild_feedback_statements
+from .core.recommend import recompute_all
+from .core.risk import rescore_all
+from .core.security import get_password_hash
+from .core.stats import rebuild_statements
+from .models.models import User, UserRole
+
+
+def create_admin():
+    with engine.begin() as conn:
+        if conn.execute(select(User.id).where(User.username == "admin")).first():
+            print("Tài khoản admin đã tồn tại")
+            return
+        conn.execute(User.__table__.insert().values(
+            username="admin",
+            hashed_password=get_password_hash(os.getenv("ADMIN_PASSWORD", "admin")),
+            is_active=True,
+            role=UserRole.ADMIN,
+        ))
+    print("Đã tạo tài khoản admin")
+
+
+def rebuild_stats():
+    with engine.begin() as conn:
+        for statement in rebuild_statements(conn.dialect.name):
+            conn.execute(statement)
+    print("Đã tính lại thống kê sinh viên")
+
+
+def rescore_risk():
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        count = rescore_all(conn)
+    print(f"Đã chấm lại {count} sinh viên trong {time.perf_counter() - started:.1f} giây")
+
+
+def recompute_recommendations():
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        count = recompute_all(conn)
+    print(f"Đã tính lại gợi ý cho {count} sinh viên trong {time.perf_counter() - started:.1f} giây")
+
+
+def rebuild_admissions():
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        count = rebuild_admission_cube(conn)
+    print(f"Đã tính lại {count} ô tuyển sinh trong {time.perf_counter() - started:.1f} giây")
+
+
+def rebuild_student_activities():
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        count = rebuild_activities(conn)
+    print(f"Đã chuẩn hóa {count} liên kết sinh viên - hoạt động trong {time.perf_counter() - started:.1f} giây")
+
+
+def detect_groups():
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        count = detect_peer_groups(conn)
+    print(f"Đã xếp nhóm cho {count} sinh viên trong {time.perf_counter() - started:.1f} giây")
+
+
+def rebuild_feedback():
+    with engine.begin() as conn:
+        for statement in rebuild_feedback_statements(conn.dialect.name):
+            conn.execute(statement)
+    print("Đã tính lại tổng hợp đánh giá giảng dạy")
+
+
+COMMANDS = {
+    "create-admin": create_admin,
+    "rebuild-stats": rebuild_stats,
+    "rescore-risk": rescore_risk,
+    "recompute-recommendations": recompute_recommendations,
+    "rebuild-admissions": rebuild_admissions,
+    "rebuild-activities": rebuild_student_activities,
+    "detect-peer-groups": detect_groups,
+    "rebuild-feedback": rebuild_feedback,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Student Management API admin commands")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+    COMMANDS[args.command]()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import asyncio
+import heapq
+import re
+import time
+from collections import Counter, defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from ..models import models
+from .config import settings
+from .search import fold_text
+
+# Chuẩn hóa extracurricular_activities và special_skills (chuỗi tự do, các mục cách nhau
+# bằng dấu phẩy/chấm phẩy/xuống dòng) thành từ điển activities + bảng nối student_activities.
+# Hai mục trùng nhau sau khi bỏ dấu, chữ thường (fold_text) là cùng một hoạt động.
+ACTIVITY_SOURCE_FIELDS = ("extracurricular_activities", "special_skills")
+_SEPARATORS = re.compile(r"[,;\n]+")
+
+# Số vòng lan truyền nhãn tối đa khi phát hiện nhóm
+LABEL_PROPAGATION_ROUNDS = 20
+
+
+def parse_activities(*texts: Optional[str]) -> Dict[str, str]:
+    # "Vẽ, nhiếp ảnh; Bóng đá" -> {"ve": "Vẽ", "nhiep anh": "Nhiếp ảnh", "bong da": "Bóng đá"}
+    activities = {}
+    for value in texts:
+        if not value:
+            continue
+        for part in _SEPARATORS.split(value):
+            name = " ".join(part.split()).strip(" .")
+            key = fold_text(name)
+            if key:
+                activities.setdefault(key, name[:1].upper() + name[1:])
+    return activities
+
+
+def activity_source_query():
+    return select(models.Student.id, *[getattr(models.Student, field) for field in ACTIVITY_SOURCE_FIELDS])
+
+
+def insert_activities_statement(dialect_name: str):
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    return dialect.insert(models.Activity).on_conflict_do_nothing(index_elements=["key"])
+
+
+async def sync_student_activities(db, condition) -> Dict[int, Set[int]]:
+    # Chuẩn hóa lại hoạt động của các sinh viên thỏa condition trong transaction hiện tại của db;
+    # trả về {student_id: {activity_id}} để cập nhật activity_index sau khi commit
+    rows = (await db.execute(activity_source_query().where(condition))).all()
+    parsed = {student_id: parse_activities(*texts) for student_id, *texts in rows}
+    names = {}
+    for activities in parsed.values():
+        for key, name in activities.items():
+            names.setdefault(key, name)
+    ids = {}
+    if names:
+        # Sắp theo khóa để các transaction song song khóa dòng cùng thứ tự
+        await db.execute(
+            insert_activities_statement(db.get_bind().dialect.name),
+            [{"key": key, "name": name} for key, name in sorted(names.items())]
+        )
+        ids = dict((await db.execute(
+            select(models.Activity.key, models.Activity.id).where(models.Activity.key.in_(names))
+        )).all())
+    await db.execute(delete(models.StudentActivity).where(models.StudentActivity.student_id.in_(parsed)))
+    links = {student_id: {ids[key] for key in activities} for student_id, activities in parsed.items()}
+    link_rows = [
+        {"student_id": student_id, "activity_id": activity_id}
+        for student_id, activity_ids in links.items()
+        for activity_id in sorted(activity_ids)
+    ]
+    if link_rows:
+        await db.execute(insert(models.StudentActivity), link_rows)
+    return links
+
+
+def rebuild_activities(conn, batch_size: int = 10000) -> int:
+    # Chuẩn hóa lại hoạt động của toàn bộ sinh viên theo lô (lệnh rebuild-activities, migration);
+    # giữ nguyên id của các hoạt động đã có trong từ điển
+    if conn.dialect.name == "postgresql":
+        # Chặn các cập nhật tăng dần cho tới khi tính lại xong
+        conn.execute(text("LOCK TABLE student_activities IN SHARE ROW EXCLUSIVE MODE"))
+    conn.execute(delete(models.StudentActivity))
+    known = dict(conn.execute(select(models.Activity.key, models.Activity.id)).all())
+    count = 0
+    result = conn.execution_options(yield_per=batch_size).execute(
+        activity_source_query().order_by(models.Student.id)
+    )
+    for rows in result.partitions():
+        parsed = [(student_id, parse_activities(*texts)) for student_id, *texts in rows]
+        new = {}
+        for _, activities in parsed:
+            for key, name in activities.items():
+                if key not in known:
+                    new.setdefault(key, name)
+        if new:
+            conn.execute(insert(models.Activity), [{"key": key, "name": name} for key, name in new.items()])
+            known.update(conn.execute(
+                select(models.Activity.key, models.Activity.id).where(models.Activity.key.in_(new))
+            ).all())
+        link_rows = [
+            {"student_id": student_id, "activity_id": known[key]}
+            for student_id, activities in parsed
+            for key in activities
+        ]
+        if link_rows:
+            conn.execute(insert(models.StudentActivity), link_rows)
+        count += len(link_rows)
+    return count
+
+
+class ActivityIndex:
+    # Chỉ mục ngược trong bộ nhớ: sinh viên -> hoạt động và hoạt động -> sinh viên, nạp từ
+    # toàn bộ bảng student_activities. Ghi ở instance này được áp dụng ngay qua update();
+    # ghi ở instance khác được thấy sau tối đa ttl giây. `version` tăng mỗi lần thay đổi;
+    # bản nạp được bắt đầu trước đó sẽ không được lưu lại.
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self.version = 0
+        self._student_activities: Optional[Dict[int, FrozenSet[int]]] = None
+        self._members: Optional[Dict[int, Set[int]]] = None
+        self._expires_at = 0.0
+
+    async def get(self, db) -> Tuple[Dict[int, FrozenSet[int]], Dict[int, Set[int]]]:
+        if self._members is not None and self._expires_at > time.monotonic():
+            return self._student_activities, self._members
+        version = self.version
+        student_activities = defaultdict(set)
+        members = defaultdict(set)
+        rows = await db.execute(select(models.StudentActivity.student_id, models.StudentActivity.activity_id))
+        for student_id, activity_id in rows:
+            student_activities[student_id].add(activity_id)
+            members[activity_id].add(student_id)
+        student_activities = {
+            student_id: frozenset(activity_ids) for student_id, activity_ids in student_activities.items()
+        }
+        members = dict(members)
+        if version == self.version:
+            self._student_activities = student_activities
+            self._members = members
+            self._expires_at = time.monotonic() + self.ttl
+        return student_activities, members
+
+    def update(self, links: Dict[int, Set[int]]) -> None:
+        # links: kết quả sync_student_activities() đã commit; tập rỗng là sinh viên đã bị xóa
+        self.version += 1
+        if self._members is None:
+            return
+        for student_id, activity_ids in links.items():
+            old = self._student_activities.get(student_id, frozenset())
+            for activity_id in old - activity_ids:
+                self._members[activity_id].discard(student_id)
+            for activity_id in activity_ids - old:
+                self._members.setdefault(activity_id, set()).add(student_id)
+            if activity_ids:
+                self._student_activities[student_id] = frozenset(activity_ids)
+            else:
+                self._student_activities.pop(student_id, None)
+
+    def invalidate(self) -> None:
+        self.version += 1
+        self._student_activities = None
+        self._members = None
+
+
+activity_index = ActivityIndex(ttl=settings.ACTIVITY_INDEX_TTL)
+
+
+def find_peers(student_activities, members, student_id: int, limit: int) -> List[Tuple[int, List[int]]]:
+    # Các sinh viên có nhiều hoạt động chung nhất với student_id (hòa thì id nhỏ trước);
+    # trả về [(peer_id, [activity_id chung])]
+    activity_ids = student_activities.get(student_id, frozenset())
+    shared = Counter()
+    for activity_id in activity_ids:
+        shared.update(members.get(activity_id, ()))
+    shared.pop(student_id, None)
+    # Số hoạt động chung không vượt quá số hoạt động của student_id (vài cái): lấy lần lượt
+    # từng mức từ cao xuống thay vì sắp xếp cả danh sách, vốn có thể tới hàng chục nghìn sinh viên;
+    # thường mức cao nhất đã đủ limit người
+    top = []
+    for count in sorted(set(shared.values()), reverse=True):
+        top.extend(heapq.nsmallest(limit - len(top), (peer_id for peer_id, n in shared.items() if n == count)))
+        if len(top) >= limit:
+            break
+    return [(peer_id, sorted(activity_ids & student_activities[peer_id])) for peer_id in top]
+
+
+def majority_label(labels: Iterable[int], current: Optional[int]) -> int:
+    counts = Counter(labels)
+    best = max(counts.values())
+    # Giữ nhãn hiện tại khi hòa để thuật toán hội tụ
+    if current is not None and counts.get(current) == best:
+        return current
+    return min(label for label, count in counts.items() if count == best)
+
+
+def label_propagation(student_activities: Dict[int, Iterable[int]], rounds: int = LABEL_PROPAGATION_ROUNDS) -> Dict[int, int]:
+    # Lan truyền nhãn trên đồ thị hai phía sinh viên - hoạt động, không chiếu sang đồ thị
+    # sinh viên - sinh viên (một hoạt động đông người cho O(n²) cạnh). Mỗi hoạt động bắt đầu
+    # với nhãn là id của chính nó; mỗi vòng sinh viên lấy nhãn phổ biến nhất trong các hoạt động
+    # của mình, rồi hoạt động lấy nhãn phổ biến nhất trong các thành viên, tới khi không đổi.
+    # Mỗi vòng O(số cạnh). Trả về {student_id: nhãn}.
+    members = defaultdict(list)
+    for student_id, activity_ids in student_activities.items():
+        for activity_id in activity_ids:
+            members[activity_id].append(student_id)
+    activity_label = {activity_id: activity_id for activity_id in members}
+    student_label: Dict[int, int] = {}
+    for _ in range(rounds):
+        changed = False
+        for student_id, activity_ids in student_activities.items():
+            if not activity_ids:
+                continue
+            current = student_label.get(student_id)
+            label = majority_label((activity_label[activity_id] for activity_id in activity_ids), current)
+            if label != current:
+                student_label[student_id] = label
+                changed = True
+        for activity_id, student_ids in members.items():
+            current = activity_label[activity_id]
+            label = majority_label((student_label[student_id] for student_id in student_ids), current)
+            if label != current:
+                activity_label[activity_id] = label
+                changed = True
+        if not changed:
+            break
+    return student_label
+
+
+def peer_group_rows(edges: Iterable[Tuple[int, int]]) -> List[Dict]:
+    student_activities = defaultdict(list)
+    for student_id, activity_id in edges:
+        student_activities[student_id].append(activity_id)
+    labels = label_propagation(student_activities)
+    return [{"student_id": student_id, "group_id": label} for student_id, label in sorted(labels.items())]
+
+
+def detect_peer_groups(conn, batch_size: int = 10000) -> int:
+    # Tính lại toàn bộ nhóm sinh viên cùng sở thích (lệnh detect-peer-groups)
+    rows = peer_group_rows(conn.execute(
+        select(models.StudentActivity.student_id, models.StudentActivity.activity_id)
+    ))
+    conn.execute(delete(models.StudentPeerGroup))
+    for start in range(0, len(rows), batch_size):
+        conn.execute(insert(models.StudentPeerGroup), rows[start:start + batch_size])
+    return len(rows)
+
+
+# Mỗi tiến trình chỉ chạy một lần phát hiện nhóm tại một thời điểm
+peer_group_lock = asyncio.Lock()
+
+
+async def run_peer_group_detection(session_factory, batch_size: int = 10000) -> int:
+    # Như detect_peer_groups nhưng chạy nền từ API: lan truyền nhãn chạy trên thread riêng
+    async with peer_group_lock:
+        async with session_factory() as db:
+            edges = (await db.execute(
+                select(models.StudentActivity.student_id, models.StudentActivity.activity_id)
+            )).all()
+            # Kết thúc transaction đọc để không giữ kết nối trong lúc tính
+            await db.rollback()
+            rows = await asyncio.to_thread(peer_group_rows, edges)
+            await db.execute(delete(models.StudentPeerGroup))
+            for start in range(0, len(rows), batch_size):
+                await db.execute(insert(models.StudentPeerGroup), rows[start:start + batch_size])
+            await db.commit()
+            return len(rows)
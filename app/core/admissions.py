@@ -0,0 +1,160 @@
+from collections import defaultdict
+from typing import Iterable, List, Optional, Sequence
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from ..models import models
+from ..schemas import schemas
+from .search import fold_text
+
+# Phân tích tuyển sinh trên khối tổng hợp admission_cube thay vì quét bảng students.
+# Mỗi sinh viên góp vào đúng một ô (cohort, high_school, hometown, score_band); truy vấn
+# cắt lát/gộp nhóm chỉ cộng các ô. Hồi quy GPA theo điểm thi đại học được khớp từ các tổng
+# fit_* (số mẫu, tổng x, y, x², xy, y²) nên cho cùng kết quả với khớp trên từng sinh viên.
+CUBE_DIMENSIONS = ("cohort", "high_school", "hometown", "score_band")
+
+# Khoảng điểm thi đại học (thang 30), xét từ cận dưới cao nhất xuống
+SCORE_BANDS = [
+    (27.0, "27-30"),
+    (24.0, "24-27"),
+    (21.0, "21-24"),
+    (18.0, "18-21"),
+    (15.0, "15-18"),
+    (0.0, "0-15"),
+]
+
+# Trạng thái học tập (đã bỏ dấu bằng fold_text) được tính là bỏ học
+DROPOUT_STATUSES = {"thoi hoc"}
+
+CUBE_COLUMNS = (
+    "student_count", "gpa_sum", "gpa_count", "dropout_count",
+    "fit_count", "fit_x_sum", "fit_y_sum", "fit_xx_sum", "fit_xy_sum", "fit_yy_sum",
+)
+CUBE_SOURCE_FIELDS = (
+    "graduation_year", "high_school", "hometown", "university_entrance_score", "gpa", "study_status",
+)
+
+
+def score_band(score: Optional[float]) -> str:
+    if score is None:
+        return ""
+    for lower, label in SCORE_BANDS:
+        if score >= lower:
+            return label
+    return SCORE_BANDS[-1][1]
+
+
+def admission_values(student) -> dict:
+    # Ảnh chụp các trường ảnh hưởng tới khối tuyển sinh, từ ORM object hoặc dict dùng để insert
+    if isinstance(student, dict):
+        return {field: student.get(field) for field in CUBE_SOURCE_FIELDS}
+    return {field: getattr(student, field) for field in CUBE_SOURCE_FIELDS}
+
+
+def add_contribution(deltas, values: dict, sign: int) -> None:
+    key = (
+        values["graduation_year"] or 0,
+        values["high_school"] or "",
+        values["hometown"] or "",
+        score_band(values["university_entrance_score"]),
+    )
+    x = values["university_entrance_score"]
+    y = values["gpa"]
+    row = deltas[key]
+    row[0] += sign
+    if y is not None:
+        row[1] += sign * y
+        row[2] += sign
+    if fold_text(values["study_status"]) in DROPOUT_STATUSES:
+        row[3] += sign
+    if x is not None and y is not None:
+        for i, amount in enumerate((1, x, y, x * x, x * y, y * y), start=4):
+            row[i] += sign * amount
+
+
+def cube_deltas():
+    return defaultdict(lambda: [0, 0.0, 0, 0, 0, 0.0, 0.0, 0.0, 0.0, 0.0])
+
+
+def cube_rows(deltas) -> List[dict]:
+    # Sắp theo khóa để các transaction song song khóa dòng cùng thứ tự, tránh deadlock
+    return [
+        dict(zip(CUBE_DIMENSIONS + CUBE_COLUMNS, key + tuple(delta)))
+        for key, delta in sorted(deltas.items())
+        if any(delta)
+    ]
+
+
+def upsert_statement(dialect_name: str):
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    statement = dialect.insert(models.AdmissionCube)
+    return statement.on_conflict_do_update(
+        index_elements=list(CUBE_DIMENSIONS),
+        set_={
+            column: getattr(models.AdmissionCube, column) + getattr(statement.excluded, column)
+            for column in CUBE_COLUMNS
+        }
+    )
+
+
+async def apply_admission_cube(db, added: Iterable[dict] = (), removed: Iterable[dict] = ()) -> None:
+    # Cộng phần chênh lệch vào admission_cube trong transaction hiện tại của db;
+    # added/removed là các admission_values() của sinh viên được thêm vào/bớt đi
+    deltas = cube_deltas()
+    for values in added:
+        add_contribution(deltas, values, 1)
+    for values in removed:
+        add_contribution(deltas, values, -1)
+    rows = cube_rows(deltas)
+    if rows:
+        await db.execute(upsert_statement(db.get_bind().dialect.name), rows)
+
+
+def rebuild_admission_cube(conn, batch_size: int = 10000) -> int:
+    # Tính lại toàn bộ admission_cube từ bảng students (lệnh rebuild-admissions, migration),
+    # dùng cùng add_contribution với đường cập nhật tăng dần
+    if conn.dialect.name == "postgresql":
+        # Chặn các upsert tăng dần cho tới khi tính lại xong
+        conn.execute(text("LOCK TABLE admission_cube IN SHARE ROW EXCLUSIVE MODE"))
+    deltas = cube_deltas()
+    columns = [getattr(models.Student, field) for field in CUBE_SOURCE_FIELDS]
+    for row in conn.execute(select(*columns)):
+        add_contribution(deltas, dict(zip(CUBE_SOURCE_FIELDS, row)), 1)
+    rows = cube_rows(deltas)
+    conn.execute(delete(models.AdmissionCube))
+    for start in range(0, len(rows), batch_size):
+        conn.execute(insert(models.AdmissionCube), rows[start:start + batch_size])
+    return len(rows)
+
+
+def admission_cell(keys: dict, totals: Sequence) -> schemas.AdmissionCell:
+    student_count, gpa_sum, gpa_count, dropout_count = totals
+    return schemas.AdmissionCell(
+        cohort=keys.get("cohort") or None,
+        high_school=keys.get("high_school") or None,
+        hometown=keys.get("hometown") or None,
+        score_band=keys.get("score_band") or None,
+        student_count=student_count,
+        average_gpa=round(gpa_sum / gpa_count, 2) if gpa_count else None,
+        dropout_rate=round(dropout_count / student_count, 4),
+    )
+
+
+def fit_admission_model(totals: Sequence, entrance_score: Optional[float] = None) -> schemas.AdmissionModel:
+    # Bình phương tối thiểu GPA = intercept + slope * điểm thi từ các tổng đã cộng dồn
+    n, sx, sy, sxx, sxy, syy = totals
+    n = n or 0
+    model = schemas.AdmissionModel(sample_size=n, entrance_score=entrance_score)
+    sxx_centered = n * sxx - sx * sx
+    if n < 2 or sxx_centered <= 1e-9:
+        return model
+    sxy_centered = n * sxy - sx * sy
+    syy_centered = n * syy - sy * sy
+    slope = sxy_centered / sxx_centered
+    intercept = (sy - slope * sx) / n
+    model.slope = round(slope, 4)
+    model.intercept = round(intercept, 4)
+    if syy_centered > 1e-9:
+        model.r_squared = round(min(sxy_centered * sxy_centered / (sxx_centered * syy_centered), 1.0), 4)
+    if entrance_score is not None:
+        model.predicted_gpa = round(intercept + slope * entrance_score, 2)
+    return model
@@ -0,0 +1,47 @@
+import time
+from typing import Dict, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models import models
+from ..schemas import schemas
+from .config import settings
+
+
+class ClassCache:
+    # Bản sao toàn bộ bảng classes (nhỏ, ít thay đổi) dùng chung cho router lớp học và
+    # phần class_info của sinh viên. `version` tăng mỗi lần invalidate(); bản nạp được bắt đầu
+    # trước khi invalidate sẽ không được lưu lại.
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self.version = 0
+        self._classes: Optional[Dict[int, schemas.Class]] = None
+        self._expires_at = 0.0
+
+    async def get_all(self, db: AsyncSession) -> Dict[int, schemas.Class]:
+        classes = self._classes
+        if classes is not None and self._expires_at > time.monotonic():
+            return classes
+        version = self.version
+        rows = (await db.scalars(select(models.Class).order_by(models.Class.id))).all()
+        classes = {row.id: schemas.Class.from_orm(row) for row in rows}
+        if version == self.version:
+            self._classes = classes
+            self._expires_at = time.monotonic() + self.ttl
+        return classes
+
+    async def get(self, db: AsyncSession, class_id: int) -> Optional[schemas.Class]:
+        class_ = (await self.get_all(db)).get(class_id)
+        if class_ is None:
+            # Có thể lớp vừa được tạo ở instance khác: kiểm tra lại trong DB
+            db_class = await db.scalar(select(models.Class).where(models.Class.id == class_id))
+            if db_class is not None:
+                self.invalidate()
+                class_ = schemas.Class.from_orm(db_class)
+        return class_
+
+    def invalidate(self) -> None:
+        self.version += 1
+        self._classes = None
+
+
+class_cache = ClassCache(ttl=settings.CLASS_CACHE_TTL)
@@ -15,6 +15,75 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Cache tổng số sinh viên theo bộ lọc
+    STUDENT_COUNT_CACHE_TTL: int = 30
+    STUDENT_COUNT_CACHE_SIZE: int = 1024
+    
+    # Cache người dùng đã xác thực (id, role, is_active) theo username
+    PRINCIPAL_CACHE_TTL: int = 60
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    
+    # Băm mật khẩu (bcrypt) chạy trên thread pool riêng, ngoài event loop
+    PASSWORD_HASH_WORKERS: int = os.cpu_count() or 1
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    PASSWORD_HASH_ROUNDS: int = 12
+    
+    # Cache toàn bộ bảng classes; mỗi instance tự nạp lại sau tối đa TTL giây
+    CLASS_CACHE_TTL: int = 300
+    
+    # Import sinh viên hàng loạt
+    STUDENT_IMPORT_BATCH_SIZE: int = 500
+    
+    # Export sinh viên: số dòng đọc mỗi lần từ server-side cursor
+    STUDENT_EXPORT_BATCH_SIZE: int = 1000
+    
+    # Số khóa (id hoặc mã sinh viên) tối đa trong một yêu cầu POST /students/batch
+    STUDENT_BATCH_MAX_SIZE: int = 100
+    
+    # Gợi ý ngành/môn học: số gợi ý lưu sẵn cho mỗi sinh viên và cache kết quả đã đọc
+    RECOMMENDATION_TOP_K: int = 5
+    RECOMMENDATION_CACHE_TTL: int = 300
+    RECOMMENDATION_CACHE_SIZE: int = 10000
+    
+    # Chỉ mục ngược sinh viên <-> hoạt động trong bộ nhớ; mỗi instance tự nạp lại sau tối đa TTL giây
+    ACTIVITY_INDEX_TTL: int = 300
+    
+    # Đánh giá giảng dạy: gom vào bộ đệm trong tiến trình rồi ghi theo lô khi đủ FEEDBACK_BATCH_SIZE
+    # hoặc sau tối đa FEEDBACK_FLUSH_INTERVAL giây; quá FEEDBACK_MAX_PENDING thì trả 503
+    FEEDBACK_BATCH_SIZE: int = 500
+    FEEDBACK_FLUSH_INTERVAL: float = 1.0
+    FEEDBACK_MAX_PENDING: int = 20000
+    # Cache (có tồn tại, giảng viên) của lớp học phần khi nhận đánh giá
+    FEEDBACK_SECTION_CACHE_TTL: int = 300
+    FEEDBACK_SECTION_CACHE_SIZE: int = 10000
+    
+    # Pool kết nối DB. DB_POOL_MODE=null: không giữ kết nối trong tiến trình (NullPool), dùng khi chạy
+    # sau pooler bên ngoài (PgBouncer/Supabase ở transaction mode); mặc định "queue": pool riêng mỗi worker
+    DB_POOL_MODE: str = os.getenv("DB_POOL_MODE", "queue")
+    # Số kết nối tối đa của MỘT instance, chia đều cho WEB_CONCURRENCY worker (mỗi worker một pool);
+    # số instance tối đa x DB_MAX_CONNECTIONS phải nhỏ hơn max_connections của Postgres
+    DB_MAX_CONNECTIONS: int = int(os.getenv("DB_MAX_CONNECTIONS", "15"))
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+    # Số kết nối giữ lại trong pool của mỗi worker; phần còn lại của hạn mức là overflow (đóng khi trả về)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+    # Chỉ ping kết nối đã nằm rỗi trong pool quá số giây này trước khi dùng lại (thay cho pool_pre_ping
+    # ping mọi lần lấy kết nối); 0 = ping mọi lần
+    DB_POOL_PING_IDLE: float = float(os.getenv("DB_POOL_PING_IDLE", "60"))
+    
+    # Số kết nối DB mở sẵn ở nền ngay sau khi khởi động (0 = không mở trước, tối đa DB_POOL_SIZE)
+    DB_PREWARM_CONNECTIONS: int = int(os.getenv("DB_PREWARM_CONNECTIONS", "0"))
+    
+    # Nhật ký truy vấn SQL (tắt mặc định): log câu lệnh chậm hơn SLOW_QUERY_MS mili giây và câu lệnh
+    # lặp lại từ QUERY_REPEAT_THRESHOLD lần trở lên trong một request (nghi N+1)
+    QUERY_LOG_ENABLED: bool = os.getenv("QUERY_LOG_ENABLED", "false").lower() == "true"
+    SLOW_QUERY_MS: float = 200
+    QUERY_REPEAT_THRESHOLD: int = 10
+    
+    # GET /metrics (Prometheus); nếu đặt thì phải gửi kèm "Authorization: Bearer <METRICS_TOKEN>"
+    METRICS_TOKEN: Optional[str] = os.getenv("METRICS_TOKEN")
+    
     class Config:
         case_sensitive = True
 
@@ -1,8 +1,16 @@
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine, event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, Pool
 from .config import settings
+import asyncio
+import logging
+from .metrics import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool, register_engine
 import os
+import time
+from typing import Any, Dict, Optional, Tuple, Type
+from uuid import uuid4
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -17,31 +25,140 @@ POSTGRES_DB = os.getenv("POSTGRES_DB")
 
 # Create database URL from parameters
 DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={
-        "sslmode": "require",
-        "connect_timeout": 30,
+POOL_MODES = ("queue", "null")
+if settings.DB_POOL_MODE not in POOL_MODES:
+    raise ValueError(f"DB_POOL_MODE must be one of {', '.join(POOL_MODES)}, got {settings.DB_POOL_MODE!r}")
+
+def pool_limits(connections: int) -> Tuple[int, int]:
+    # (pool_size, max_overflow) sao cho pool không bao giờ mở quá `connections` kết nối
+    pool_size = min(settings.DB_POOL_SIZE, connections)
+    return pool_size, connections - pool_size
+
+def worker_connections() -> int:
+    # Hạn mức kết nối của instance chia cho số worker: mỗi worker có một pool riêng
+    return max(1, settings.DB_MAX_CONNECTIONS // max(1, settings.WEB_CONCURRENCY))
+
+def pool_options(poolclass: Type[Pool], connections: int) -> Dict[str, Any]:
+    if settings.DB_POOL_MODE == "null":
+        # Mỗi lần checkout mở kết nối mới tới pooler và đóng khi trả về; pooler giữ kết nối tới Postgres
+        return {"poolclass": NullPool}
+    pool_size, max_overflow = pool_limits(connections)
+    return {
+        "poolclass": poolclass,  # đo thời gian chờ kết nối cho /metrics
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_use_lifo": True,  # Use LIFO to reduce number of connections in use
+    }
+
+def ping_idle_connections(engine: Engine, idle_seconds: float) -> None:
+    # Thay cho pool_pre_ping (thêm một round-trip mỗi lần checkout): chỉ ping kết nối đã nằm rỗi lâu,
+    # vì Postgres/pooler/NAT chỉ cắt kết nối rỗi. Ping lỗi thì pool bỏ kết nối đó và mở kết nối mới;
+    # kết nối đứt giữa lúc dùng vẫn được SQLAlchemy loại khỏi pool khi gặp lỗi mất kết nối.
+    @event.listens_for(engine, "checkin")
+    def mark_idle(dbapi_connection, connection_record):
+        connection_record.info["idle_since"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def ping_if_idle(dbapi_connection, connection_record, connection_proxy):
+        idle_since = connection_record.info.pop("idle_since", None)
+        if idle_since is None or time.monotonic() - idle_since < idle_seconds:
+            return
+        try:
+            engine.dialect.do_ping(dbapi_connection)
+        except Exception as error:
+            raise exc.DisconnectionError(f"Idle connection failed ping: {error}") from error
+
+# connect_args cho Postgres của app (SSL, statement_timeout); benchmark truyền connect_args riêng
+SYNC_CONNECT_ARGS = {
+    "sslmode": "require",
+    "connect_timeout": 30,
+    "application_name": "student_management",
+    "options": "-c statement_timeout=60000"  # 60 seconds
+}
+ASYNC_CONNECT_ARGS = {
+    "ssl": "require",
+    "timeout": 30,
+    "server_settings": {
         "application_name": "student_management",
-        "options": "-c statement_timeout=60000"  # 60 seconds
+        "statement_timeout": "60000"  # 60 seconds
     },
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-    pool_recycle=3600,  # Recycle connections after 1 hour
-    pool_timeout=30,    # Timeout for getting connection from pool
-    pool_use_lifo=True  # Use LIFO to reduce number of connections in use
-)
+    # Pooler của Supabase (pgbouncer, transaction mode) không giữ prepared statement
+    # giữa các transaction: tắt cache và đặt tên ngẫu nhiên để tránh trùng tên
+    "statement_cache_size": 0,
+    "prepared_statement_cache_size": 0,
+    "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+}
+
+def create_db_engine(
+    url: str = DATABASE_URL, connections: int = 1, connect_args: Optional[Dict[str, Any]] = None
+) -> Engine:
+    # Engine đồng bộ (psycopg2) dùng chung cho app, CLI và Alembic
+    db_engine = create_engine(
+        url,
+        connect_args=SYNC_CONNECT_ARGS if connect_args is None else connect_args,
+        **pool_options(InstrumentedQueuePool, connections),
+    )
+    if settings.DB_POOL_MODE == "queue":
+        ping_idle_connections(db_engine, settings.DB_POOL_PING_IDLE)
+    return db_engine
+
+def create_async_db_engine(
+    url: str = ASYNC_DATABASE_URL, connections: Optional[int] = None, connect_args: Optional[Dict[str, Any]] = None
+) -> AsyncEngine:
+    db_engine = create_async_engine(
+        url,
+        connect_args=ASYNC_CONNECT_ARGS if connect_args is None else connect_args,
+        **pool_options(InstrumentedAsyncAdaptedQueuePool, connections or worker_connections()),
+    )
+    if settings.DB_POOL_MODE == "queue":
+        ping_idle_connections(db_engine.sync_engine, settings.DB_POOL_PING_IDLE)
+    return db_engine
+
+# Engine đồng bộ chỉ dùng cho CLI và script, mỗi lúc một kết nối nên pool giữ một kết nối
+engine = create_db_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine bất đồng bộ (asyncpg) phục vụ mọi request; pool theo hạn mức kết nối của mỗi worker
+async_engine = create_async_db_engine()
+
+register_engine("sync", engine)
+register_engine("async", async_engine.sync_engine)
+
+# expire_on_commit=False: sau commit vẫn đọc được thuộc tính mà không phải lazy load
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
+logger = logging.getLogger(__name__)
+
+async def prewarm_pool(connections: int) -> None:
+    # Mở sẵn kết nối (TCP + TLS + xác thực) cho async_engine sau khi app đã nhận request, để các
+    # request đầu tiên sau cold start không phải tự mở kết nối. Mở đồng thời rồi trả hết về pool;
+    # không quá pool_size vì kết nối overflow bị đóng ngay khi trả về.
+    connections = min(connections, async_engine.pool.size())
+    results = await asyncio.gather(
+        *(async_engine.connect().start() for _ in range(connections)), return_exceptions=True
+    )
+    opened = [conn for conn in results if not isinstance(conn, BaseException)]
+    for conn in opened:
+        await conn.close()
+    if len(opened) < connections:
+        error = next(result for result in results if isinstance(result, BaseException))
+        logger.warning(f"Opened {len(opened)}/{connections} pooled connections at startup: {error}")
+
 # Dependency
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
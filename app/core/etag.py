@@ -0,0 +1,33 @@
+import hashlib
+from typing import Optional
+from fastapi import Response, status
+
+
+def version_of(obj):
+    # Phiên bản của một bản ghi: updated_at nếu đã sửa, ngược lại created_at.
+    # Gắn tiền tố để lần sửa đầu tiên trong cùng giây tạo vẫn đổi ETag (SQLite chỉ lưu tới giây).
+    if getattr(obj, "updated_at", None) is not None:
+        return ("u", obj.updated_at.isoformat())
+    created_at = getattr(obj, "created_at", None)
+    return ("c", created_at.isoformat() if created_at is not None else None)
+
+
+def weak_etag(*parts) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    # So sánh kiểu weak cho cả If-None-Match và If-Match; hỗ trợ danh sách và "*"
+    if not header:
+        return False
+    opaque = etag.removeprefix("W/")
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
@@ -0,0 +1,250 @@
+import asyncio
+import contextlib
+import logging
+from collections import defaultdict
+from typing import List, NamedTuple, Optional
+from sqlalchemy import String, case, cast, delete, func, insert, literal, select, text, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from ..models import models
+from ..schemas import schemas
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Tổng hợp đánh giá giảng dạy theo lớp học phần và theo giảng viên, cộng dồn theo từng lô
+# được ghi nên báo cáo chỉ đọc vài dòng của feedback_aggregates
+SECTION_SCOPE = "section"
+LECTURER_SCOPE = "lecturer"
+RATINGS = range(1, 6)
+AGGREGATE_COLUMNS = ("response_count", "rating_sum") + tuple(f"rating_{rating}" for rating in RATINGS)
+
+
+class FeedbackBufferFullError(Exception):
+    pass
+
+
+class PendingFeedback(NamedTuple):
+    section_id: int
+    user_id: int
+    lecturer: Optional[str]
+    rating: int
+    comment: Optional[str]
+
+
+def aggregate_deltas():
+    return defaultdict(lambda: [0] * len(AGGREGATE_COLUMNS))
+
+
+def add_contribution(deltas, section_id: int, lecturer: Optional[str], rating: int, count: int = 1) -> None:
+    keys = [(SECTION_SCOPE, str(section_id))]
+    if lecturer:
+        keys.append((LECTURER_SCOPE, lecturer))
+    for key in keys:
+        row = deltas[key]
+        row[0] += count
+        row[1] += count * rating
+        row[1 + rating] += count
+
+
+def upsert_statement(dialect_name: str):
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    statement = dialect.insert(models.FeedbackAggregate)
+    return statement.on_conflict_do_update(
+        index_elements=["scope", "key"],
+        set_={
+            column: getattr(models.FeedbackAggregate, column) + getattr(statement.excluded, column)
+            for column in AGGREGATE_COLUMNS
+        }
+    )
+
+
+async def apply_feedback_aggregates(db, deltas) -> None:
+    # Khóa các dòng theo cùng một thứ tự để hai transaction song song không deadlock
+    rows = [
+        dict(zip(("scope", "key") + AGGREGATE_COLUMNS, key + tuple(delta)))
+        for key, delta in sorted(deltas.items())
+        if any(delta)
+    ]
+    if rows:
+        await db.execute(upsert_statement(db.get_bind().dialect.name), rows)
+
+
+def insert_feedback_statement(dialect_name: str):
+    # Đánh giá trùng (cùng người, cùng lớp học phần) bị bỏ qua; RETURNING chỉ trả các dòng đã chèn.
+    # Chèn trên Table (Core) thay vì ORM entity: đường bulk insert của ORM có RETURNING biên dịch
+    # lại câu lệnh cho từng dòng, còn Core gửi cả lô bằng insertmanyvalues.
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    feedback = models.TeachingFeedback.__table__
+    return (
+        dialect.insert(feedback)
+        .on_conflict_do_nothing(index_elements=["section_id", "user_id"])
+        .returning(feedback.c.section_id, feedback.c.lecturer, feedback.c.rating)
+    )
+
+
+async def write_feedback(db, items: List[PendingFeedback]) -> int:
+    # Chèn một lô đánh giá và cộng phần tổng hợp trong transaction hiện tại của db
+    unique = {}
+    for item in items:
+        unique.setdefault((item.section_id, item.user_id), item._asdict())
+    inserted = (await db.execute(
+        insert_feedback_statement(db.get_bind().dialect.name), list(unique.values())
+    )).all()
+    deltas = aggregate_deltas()
+    for section_id, lecturer, rating in inserted:
+        add_contribution(deltas, section_id, lecturer, rating)
+    await apply_feedback_aggregates(db, deltas)
+    return len(inserted)
+
+
+async def write_batch(session_factory, batch: List[PendingFeedback]) -> int:
+    async with session_factory() as db:
+        try:
+            written = await write_feedback(db, batch)
+            await db.commit()
+            return written
+        except IntegrityError:
+            # Lớp học phần bị xóa sau khi đánh giá được nhận: ghi từng dòng, bỏ các dòng lỗi
+            await db.rollback()
+        written = 0
+        for item in batch:
+            try:
+                async with db.begin_nested():
+                    written += await write_feedback(db, [item])
+            except IntegrityError:
+                logger.warning(f"Dropping feedback for missing section {item.section_id}")
+        await db.commit()
+        return written
+
+
+class FeedbackBuffer:
+    # Bộ đệm đánh giá trong tiến trình: POST /feedback chỉ thêm vào bộ đệm, lô được ghi khi đủ
+    # batch_size (ngay trong request làm đầy lô) hoặc sau tối đa flush_interval giây (flush loop
+    # chạy từ lúc khởi động). Số đánh giá đang chờ bị giới hạn; vượt quá thì báo lỗi ngay.
+    # Đánh giá còn trong bộ đệm sẽ mất nếu tiến trình bị dừng đột ngột.
+    def __init__(self, batch_size: int, flush_interval: float, max_pending: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._items: List[PendingFeedback] = []
+        self._task: Optional[asyncio.Task] = None
+        self._session_factory = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._items)
+
+    def add(self, item: PendingFeedback) -> bool:
+        # Trả về True khi đã đủ một lô và nên flush
+        if len(self._items) >= self.max_pending:
+            raise FeedbackBufferFullError("Feedback buffer is full")
+        self._items.append(item)
+        return len(self._items) >= self.batch_size
+
+    async def flush(self, session_factory) -> int:
+        written = 0
+        while self._items:
+            batch, self._items = self._items[:self.batch_size], self._items[self.batch_size:]
+            try:
+                written += await write_batch(session_factory, batch)
+            except BaseException:
+                # Lỗi hoặc bị hủy giữa chừng (khi tắt app): trả lô về đầu bộ đệm để lần flush sau ghi lại
+                self._items[:0] = batch
+                raise
+        return written
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush(self._session_factory)
+            except Exception:
+                logger.exception("Failed to flush teaching feedback")
+
+    def start(self, session_factory) -> None:
+        self._session_factory = session_factory
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        # Chờ flush loop dừng hẳn (lô đang ghi dở đã về lại bộ đệm) rồi mới flush lần cuối
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        await self.flush(self._session_factory)
+
+
+feedback_buffer = FeedbackBuffer(
+    batch_size=settings.FEEDBACK_BATCH_SIZE,
+    flush_interval=settings.FEEDBACK_FLUSH_INTERVAL,
+    max_pending=settings.FEEDBACK_MAX_PENDING,
+)
+
+
+async def remove_section_feedback(db, section_id: int) -> None:
+    # Xóa đánh giá của một lớp học phần và trừ phần đóng góp khỏi tổng hợp theo giảng viên
+    feedback = models.TeachingFeedback
+    rows = await db.execute(
+        select(feedback.lecturer, feedback.rating, func.count())
+        .where(feedback.section_id == section_id)
+        .group_by(feedback.lecturer, feedback.rating)
+    )
+    deltas = aggregate_deltas()
+    for lecturer, rating, count in rows:
+        add_contribution(deltas, section_id, lecturer, rating, -count)
+    await apply_feedback_aggregates(db, deltas)
+    await db.execute(delete(feedback).where(feedback.section_id == section_id))
+    await db.execute(
+        delete(models.FeedbackAggregate).where(
+            models.FeedbackAggregate.scope == SECTION_SCOPE,
+            models.FeedbackAggregate.key == str(section_id),
+        )
+    )
+
+
+def rebuild_statements(dialect_name: str) -> List:
+    # Tính lại toàn bộ feedback_aggregates từ bảng teaching_feedback (lệnh rebuild-feedback)
+    feedback = models.TeachingFeedback
+    source = union_all(
+        select(
+            literal(SECTION_SCOPE, String).label("scope"),
+            cast(feedback.section_id, String).label("key"),
+            feedback.rating.label("rating"),
+        ),
+        select(
+            literal(LECTURER_SCOPE, String).label("scope"),
+            feedback.lecturer.label("key"),
+            feedback.rating.label("rating"),
+        ).where(feedback.lecturer.isnot(None), feedback.lecturer != ""),
+    ).subquery()
+    rollup = select(
+        source.c.scope,
+        source.c.key,
+        func.count(),
+        func.sum(source.c.rating),
+        *[func.sum(case((source.c.rating == rating, 1), else_=0)) for rating in RATINGS],
+    ).group_by(source.c.scope, source.c.key)
+
+    statements = []
+    if dialect_name == "postgresql":
+        # Chặn các lô ghi tăng dần cho tới khi tính lại xong
+        statements.append(text("LOCK TABLE feedback_aggregates IN SHARE ROW EXCLUSIVE MODE"))
+    statements.append(delete(models.FeedbackAggregate))
+    statements.append(insert(models.FeedbackAggregate).from_select(
+        ["scope", "key"] + list(AGGREGATE_COLUMNS), rollup
+    ))
+    return statements
+
+
+def feedback_summary(totals, **fields) -> schemas.FeedbackSummary:
+    # totals: các cột AGGREGATE_COLUMNS của một dòng feedback_aggregates (None nếu chưa có đánh giá)
+    response_count, rating_sum, *histogram = totals or (0, 0, 0, 0, 0, 0, 0)
+    return schemas.FeedbackSummary(
+        response_count=response_count,
+        average_rating=round(rating_sum / response_count, 2) if response_count else None,
+        histogram=histogram,
+        **fields
+    )
@@ -0,0 +1,358 @@
+import hmac
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Số liệu vận hành ở định dạng text của Prometheus (0.0.4) cho GET /metrics, không cần
+# prometheus_client. Ghi nhận chỉ là vài phép cộng trên bộ nhãn đã tạo sẵn, không khóa:
+# mọi ghi nhận diễn ra trên thread của event loop (việc chạy trên thread pool tự đo thời gian
+# rồi ghi khi kết quả về lại loop), nên không có hai thread cùng cộng một giá trị.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+PASSWORD_HASH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+HTTP_METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS")
+STATUS_CLASSES = ("2xx", "3xx", "4xx", "5xx")
+UNMATCHED_ROUTE = "unmatched"
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class GaugeValue(CounterValue):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class HistogramValue:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # counts[i]: số quan sát thuộc khoảng (buckets[i-1], buckets[i]]; phần tử cuối là +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        if not self.label_names:
+            self._values[()] = self.new_value()
+
+    def new_value(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        # Bộ nhãn nên được tạo sẵn lúc khởi động; bộ nhãn mới chỉ tốn thêm một lần tạo
+        value = self._values.get(values)
+        if value is None:
+            value = self._values[values] = self.new_value()
+        return value
+
+    def samples(self) -> Iterable[Tuple[str, Sequence[str], Sequence[str], float]]:
+        for labels, value in self._values.items():
+            yield "", self.label_names, labels, value.value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, names, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{format_labels(names, labels)} {format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def new_value(self):
+        return CounterValue()
+
+    def inc(self, amount: float = 1) -> None:
+        self._values[()].inc(amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def new_value(self):
+        return GaugeValue()
+
+    def inc(self, amount: float = 1) -> None:
+        self._values[()].inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        self._values[()].dec(amount)
+
+
+class CallbackGauge(Metric):
+    # Giá trị được đọc lúc scrape: callback trả về [(bộ nhãn, giá trị)]
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str], callback: Callable):
+        self.callback = callback
+        super().__init__(name, documentation, label_names)
+
+    def new_value(self):
+        return GaugeValue()
+
+    def samples(self):
+        for labels, value in self.callback():
+            yield "", self.label_names, labels, value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, label_names)
+
+    def new_value(self):
+        return HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._values[()].observe(value)
+
+    def samples(self):
+        bucket_names = self.label_names + ("le",)
+        for labels, value in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), value.counts):
+                cumulative += count
+                yield "_bucket", bucket_names, labels + (format_value(bound),), cumulative
+            yield "_sum", self.label_names, labels, value.sum
+            yield "_count", self.label_names, labels, cumulative
+
+
+REGISTRY: List[Metric] = []
+
+
+def register(metric: Metric) -> Metric:
+    REGISTRY.append(metric)
+    return metric
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def check_metrics_token(authorization: Optional[str], token: Optional[str]) -> bool:
+    # Không đặt METRICS_TOKEN thì /metrics mở (Prometheus scrape trong mạng nội bộ)
+    if not token:
+        return True
+    return hmac.compare_digest(authorization or "", f"Bearer {token}")
+
+
+# --- HTTP ---
+
+HTTP_REQUESTS_IN_FLIGHT = register(Gauge(
+    "http_requests_in_flight", "Requests currently being handled by this process"
+))
+HTTP_REQUEST_SECONDS = register(Histogram(
+    "http_request_duration_seconds", "Time until the last byte of the response was sent",
+    ("method", "route", "status"), LATENCY_BUCKETS,
+))
+HTTP_REQUEST_QUERIES = register(Histogram(
+    "http_request_queries", "SQL statements executed while handling a request",
+    ("method", "route"), QUERY_COUNT_BUCKETS,
+))
+
+# Bộ đếm câu lệnh SQL của request hiện tại; None ngoài request (CLI, vòng flush nền)
+request_queries: ContextVar[Optional[List[int]]] = ContextVar("request_queries", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    queries = request_queries.get()
+    if queries is not None:
+        queries[0] += 1
+
+
+def route_templates(routes) -> Dict[Callable, str]:
+    # endpoint -> mẫu đường dẫn; sau khi khớp route, Router ghi endpoint vào scope["endpoint"]
+    paths = {}
+    for route in routes:
+        endpoint = getattr(route, "endpoint", None)
+        if endpoint is not None and getattr(route, "methods", None):
+            paths.setdefault(endpoint, route.path)
+    return paths
+
+
+class MetricsMiddleware:
+    # ASGI middleware thuần (không qua BaseHTTPMiddleware): đo số request đang xử lý, thời gian
+    # tới byte cuối của response (không tính background task chạy sau đó) và số câu lệnh SQL,
+    # gắn nhãn theo mẫu đường dẫn của route (/students/{student_id}) để số bộ nhãn có giới hạn
+    def __init__(self, app, routes):
+        self.app = app
+        self.route_paths = route_templates(routes)
+        for route in routes:
+            if getattr(route, "endpoint", None) is None or not getattr(route, "methods", None):
+                continue
+            for method in route.methods:
+                HTTP_REQUEST_QUERIES.labels(method, route.path)
+                for status_class in STATUS_CLASSES:
+                    HTTP_REQUEST_SECONDS.labels(method, route.path, status_class)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = [0]
+        status_code = 500
+        finished = None
+
+        async def send_with_metrics(message):
+            nonlocal status_code, finished
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                finished = (time.perf_counter(), queries[0])
+            await send(message)
+
+        token = request_queries.set(queries)
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            request_queries.reset(token)
+            ended, query_count = finished or (time.perf_counter(), queries[0])
+            # Không khớp route nào thì gom chung một nhãn
+            route = self.route_paths.get(scope.get("endpoint"), UNMATCHED_ROUTE)
+            method = scope["method"] if scope["method"] in HTTP_METHODS else "other"
+            HTTP_REQUEST_SECONDS.labels(method, route, f"{status_code // 100}xx").observe(ended - started)
+            HTTP_REQUEST_QUERIES.labels(method, route).observe(query_count)
+
+
+# --- Pool kết nối DB ---
+
+DB_POOL_WAIT_SECONDS = register(Histogram(
+    "db_pool_checkout_seconds", "Time spent waiting for a connection from the pool",
+    ("engine",), POOL_WAIT_BUCKETS,
+))
+DB_POOL_TIMEOUTS = register(Counter(
+    "db_pool_checkout_timeouts_total", "Connection checkouts that gave up after pool_timeout", ("engine",)
+))
+
+_engines: Dict[str, Engine] = {}
+
+
+class InstrumentedPoolMixin:
+    # Đo thời gian lấy kết nối (chờ kết nối rảnh hoặc mở kết nối overflow mới). Là lớp con của
+    # pool chứ không phải event vì SQLAlchemy không có event trước khi checkout.
+    metrics_label = "default"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.labels(self.metrics_label).inc()
+            raise
+        finally:
+            DB_POOL_WAIT_SECONDS.labels(self.metrics_label).observe(time.perf_counter() - started)
+
+    def recreate(self):
+        # dispose() thay bằng pool mới tạo từ self.__class__; giữ lại nhãn
+        pool = super().recreate()
+        pool.metrics_label = self.metrics_label
+        return pool
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def register_engine(label: str, engine: Engine) -> None:
+    DB_POOL_WAIT_SECONDS.labels(label)
+    DB_POOL_TIMEOUTS.labels(label)
+    if isinstance(engine.pool, InstrumentedPoolMixin):
+        engine.pool.metrics_label = label
+    _engines[label] = engine
+
+
+def pool_values(read: Callable):
+    # Đọc engine.pool mỗi lần scrape vì dispose() thay pool mới
+    for label, engine in _engines.items():
+        pool = engine.pool
+        if isinstance(pool, QueuePool):
+            yield (label,), read(pool)
+
+
+register(CallbackGauge(
+    "db_pool_size", "Configured number of pooled connections", ("engine",),
+    lambda: pool_values(lambda pool: pool.size()),
+))
+register(CallbackGauge(
+    "db_pool_checked_out", "Connections currently checked out of the pool", ("engine",),
+    lambda: pool_values(lambda pool: pool.checkedout()),
+))
+register(CallbackGauge(
+    "db_pool_overflow", "Connections open beyond pool_size (max_overflow in use)", ("engine",),
+    lambda: pool_values(lambda pool: max(pool.overflow(), 0)),
+))
+
+
+# --- Băm mật khẩu ---
+
+PASSWORD_HASH_SECONDS = register(Histogram(
+    "password_hash_seconds", "Time spent inside bcrypt on the hashing thread pool",
+    ("operation",), PASSWORD_HASH_BUCKETS,
+))
+PASSWORD_HASH_SECONDS.labels("hash")
+PASSWORD_HASH_SECONDS.labels("verify")
@@ -0,0 +1,64 @@
+import base64
+import binascii
+import json
+from typing import Any, List, Tuple
+from sqlalchemy import and_, or_, tuple_
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(sort_by: str, sort_order: str, key: Any, last_id: int) -> str:
+    # Cursor là token mờ (opaque): [cột sắp xếp, chiều, giá trị khóa, id] dạng base64url
+    payload = json.dumps([sort_by, sort_order, key, last_id], separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[str, str, Any, int]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise InvalidCursorError(str(e))
+    if not isinstance(payload, list) or len(payload) != 4:
+        raise InvalidCursorError("Malformed cursor payload")
+    sort_by, sort_order, key, last_id = payload
+    if not isinstance(sort_by, str) or sort_order not in ("asc", "desc") or not isinstance(last_id, int):
+        raise InvalidCursorError("Malformed cursor payload")
+    return sort_by, sort_order, key, last_id
+
+
+def has_unique_keys(column, id_column, unique: bool) -> bool:
+    # Cột unique nhưng cho phép NULL vẫn có thể có nhiều dòng NULL, nên vẫn cần id để phân định
+    return column is id_column or (unique and not column.expression.nullable)
+
+
+def keyset_order(column, id_column, sort_order: str, unique: bool = False) -> List:
+    # NULL luôn xếp cuối khi tăng dần và đầu khi giảm dần: đúng thứ tự của chỉ mục (cột, id) trên
+    # Postgres (quét xuôi/ngược), ghi rõ vì SQLite mặc định đặt NULL lên đầu
+    if sort_order == "asc":
+        order = [column.asc() if column is id_column else column.asc().nulls_last()]
+    else:
+        order = [column.desc() if column is id_column else column.desc().nulls_first()]
+    if not has_unique_keys(column, id_column, unique):
+        order.append(id_column.asc() if sort_order == "asc" else id_column.desc())
+    return order
+
+
+def apply_keyset(query, column, id_column, sort_order: str, key: Any, last_id: int, unique: bool = False):
+    # Tiếp tục ngay sau (key, last_id) theo thứ tự của keyset_order. Cột unique không NULL chỉ cần
+    # so sánh trên chính nó; các cột khác so sánh theo bộ (cột, id) để dùng được chỉ mục ghép.
+    if has_unique_keys(column, id_column, unique):
+        return query.filter(column > key if sort_order == "asc" else column < key)
+    if not column.expression.nullable:
+        position = tuple_(column, id_column)
+        return query.filter(position > tuple_(key, last_id) if sort_order == "asc" else position < tuple_(key, last_id))
+    # So sánh bộ với NULL cho kết quả NULL (loại mọi dòng), nên nhóm NULL được xử lý riêng
+    if sort_order == "asc":
+        if key is None:
+            return query.filter(column.is_(None), id_column > last_id)
+        return query.filter(or_(tuple_(column, id_column) > tuple_(key, last_id), column.is_(None)))
+    if key is None:
+        return query.filter(or_(and_(column.is_(None), id_column < last_id), column.isnot(None)))
+    return query.filter(tuple_(column, id_column) < tuple_(key, last_id))
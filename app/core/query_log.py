@@ -0,0 +1,139 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from .config import settings
+from .metrics import route_templates
+
+logger = logging.getLogger(__name__)
+
+# Nhật ký truy vấn (bật bằng QUERY_LOG_ENABLED): đo từng câu lệnh SQL qua event của engine,
+# gom theo request và ghi log các câu lệnh chậm hơn SLOW_QUERY_MS cùng các câu lệnh lặp lại
+# từ QUERY_REPEAT_THRESHOLD lần trong một request (nghi là N+1, vd. lazy load từng dòng).
+# Câu lệnh được so sánh theo dấu vân tay: tham số, hằng số và danh sách IN (...) thay bằng ?.
+
+_PLACEHOLDERS = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<!:):\w+|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROWS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_SPACES = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    # "SELECT ... WHERE id IN (?, ?, ?) LIMIT 20" -> "SELECT ... WHERE id IN (?) LIMIT ?"
+    statement = _SPACES.sub(" ", statement).strip()
+    statement = _PLACEHOLDERS.sub("?", statement)
+    statement = _LISTS.sub("(?)", statement)
+    return _ROWS.sub("(?)", statement)
+
+
+class QueryTrace:
+    # Các câu lệnh đã chạy trong một request (hoặc trong khối assert_max_queries)
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Counter = Counter()
+        self.slow: List[Tuple[float, str]] = []
+
+    def record(self, statement: str, duration: float, slow: bool) -> None:
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+        if slow:
+            self.slow.append((duration, statement))
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+    def summary(self) -> str:
+        return "\n".join(f"{count:5d} x {statement}" for statement, count in self.statements.most_common())
+
+
+current_trace: ContextVar[Optional[QueryTrace]] = ContextVar("current_trace", default=None)
+
+# Các khối assert_max_queries đang mở; nhận mọi câu lệnh bất kể thread (TestClient chạy app
+# trên thread riêng nên không thấy contextvar của test)
+_collectors: List[QueryTrace] = []
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    statement = fingerprint(statement)
+    slow = duration * 1000 >= settings.SLOW_QUERY_MS
+    trace = current_trace.get()
+    if trace is not None:
+        trace.record(statement, duration, slow)
+    elif slow:
+        # Ngoài request (CLI, vòng flush nền): ghi log ngay
+        logger.warning("Slow query (%.0f ms): %s", duration * 1000, statement)
+    for collector in _collectors:
+        collector.record(statement, duration, slow)
+
+
+def install_query_log() -> None:
+    # Gắn vào lớp Engine nên áp dụng cho mọi engine, kể cả engine tạo sau
+    if not event.contains(Engine, "before_cursor_execute", before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", after_cursor_execute)
+
+
+def report(trace: QueryTrace, route: str) -> None:
+    for duration, statement in trace.slow:
+        logger.warning("Slow query (%.0f ms) on %s: %s", duration * 1000, route, statement)
+    for statement, count in trace.repeated(settings.QUERY_REPEAT_THRESHOLD):
+        logger.warning("Possible N+1 on %s: %d x %s", route, count, statement)
+    logger.debug("%s: %d queries in %.1f ms", route, trace.count, trace.duration * 1000)
+
+
+class QueryLogMiddleware:
+    def __init__(self, app, routes):
+        self.app = app
+        self.route_paths = route_templates(routes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = QueryTrace()
+        token = current_trace.set(trace)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_trace.reset(token)
+            route = self.route_paths.get(scope.get("endpoint"), scope["path"])
+            report(trace, f"{scope['method']} {route}")
+
+
+@contextmanager
+def assert_max_queries(limit: int, max_repeats: Optional[int] = None):
+    # Dùng trong tests:
+    #     with assert_max_queries(3, max_repeats=1):
+    #         client.get("/api/v1/students/", headers=headers)
+    install_query_log()
+    trace = QueryTrace()
+    _collectors.append(trace)
+    try:
+        yield trace
+    finally:
+        _collectors.remove(trace)
+    if trace.count > limit:
+        raise AssertionError(f"Expected at most {limit} queries, {trace.count} were executed:\n{trace.summary()}")
+    if max_repeats is not None and trace.repeated(max_repeats + 1):
+        raise AssertionError(
+            f"A statement was executed more than {max_repeats} times (possible N+1):\n{trace.summary()}"
+        )
@@ -0,0 +1,186 @@
+from __future__ import annotations
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Sequence
+from sqlalchemy import delete, insert, select
+from ..models import models
+from .config import settings
+from .search import fold_text
+from .stats import GPA_BUCKETS, gpa_bucket
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Danh mục ngành/môn học để gợi ý: (mã, tên, loại, từ khóa, GPA tối thiểu, điểm thi tối thiểu)
+CATALOG = [
+    ("7480201", "Công nghệ thông tin", "major",
+     ["lập trình", "tin học", "máy tính", "phần mềm", "thuật toán", "olympic tin"], 2.5, 24.0),
+    ("7480101", "Khoa học máy tính", "major",
+     ["thuật toán", "toán", "lập trình", "trí tuệ nhân tạo", "olympic toán"], 3.0, 26.0),
+    ("7340101", "Quản trị kinh doanh", "major",
+     ["kinh doanh", "lãnh đạo", "quản lý", "khởi nghiệp", "thuyết trình"], 2.0, 22.0),
+    ("7340201", "Tài chính - Ngân hàng", "major",
+     ["tài chính", "kế toán", "đầu tư", "toán", "chứng khoán"], 2.5, 23.0),
+    ("7220201", "Ngôn ngữ Anh", "major",
+     ["tiếng anh", "ielts", "toeic", "ngoại ngữ", "dịch thuật", "hùng biện"], 2.5, 23.0),
+    ("7210403", "Thiết kế đồ họa", "major",
+     ["vẽ", "thiết kế", "hội họa", "nhiếp ảnh", "photoshop", "sáng tạo"], 2.0, 20.0),
+    ("7310401", "Tâm lý học", "major",
+     ["tâm lý", "tư vấn", "tình nguyện", "công tác xã hội", "lắng nghe"], 2.0, 21.0),
+    ("7520201", "Kỹ thuật điện", "major",
+     ["điện", "điện tử", "robot", "vật lý", "arduino"], 2.5, 22.0),
+    ("7810101", "Du lịch", "major",
+     ["du lịch", "hướng dẫn viên", "ngoại ngữ", "giao tiếp", "sự kiện"], 2.0, 20.0),
+    ("7140209", "Sư phạm Toán học", "major",
+     ["toán", "gia sư", "giảng dạy", "olympic toán", "học sinh giỏi"], 2.8, 25.0),
+    ("INT3401", "Trí tuệ nhân tạo", "course",
+     ["trí tuệ nhân tạo", "học máy", "lập trình", "toán"], 3.0, 0.0),
+    ("INT2208", "Công nghệ phần mềm", "course",
+     ["phần mềm", "lập trình", "làm việc nhóm"], 2.0, 0.0),
+    ("BSA2001", "Kỹ năng lãnh đạo", "course",
+     ["lãnh đạo", "câu lạc bộ", "làm việc nhóm", "thuyết trình"], 0.0, 0.0),
+    ("FLF2101", "Tiếng Anh học thuật", "course",
+     ["tiếng anh", "ielts", "ngoại ngữ"], 0.0, 0.0),
+    ("PSY1050", "Kỹ năng tư vấn", "course",
+     ["tư vấn", "tâm lý", "lắng nghe", "tình nguyện"], 0.0, 0.0),
+    ("ART1002", "Nhiếp ảnh cơ bản", "course",
+     ["nhiếp ảnh", "thiết kế", "sáng tạo"], 0.0, 0.0),
+]
+CATALOG_ITEMS = {code: (name, kind) for code, name, kind, *_ in CATALOG}
+
+# Khoảng điểm thi đại học (thang 30), xét từ cận dưới cao nhất xuống
+ENTRANCE_BANDS = [(27.0, "27-30"), (24.0, "24-27"), (21.0, "21-24"), (18.0, "18-21"), (0.0, "0-18")]
+# Trọng số của đặc trưng năng lực (GPA, điểm thi) so với một từ khóa
+LEVEL_WEIGHT = 0.5
+# Cụm từ dài nhất (số từ) được so với từ khóa trong danh mục
+MAX_TERM_WORDS = max(len(fold_text(keyword).split()) for *_, keywords, _, _ in CATALOG for keyword in keywords)
+
+RECOMMENDATION_TEXT_FIELDS = ("special_skills", "achievements", "extracurricular_activities")
+RECOMMENDATION_SOURCE_FIELDS = RECOMMENDATION_TEXT_FIELDS + ("gpa", "university_entrance_score")
+
+
+def entrance_band(score) -> str:
+    if score is None:
+        return ""
+    for lower, label in ENTRANCE_BANDS:
+        if score >= lower:
+            return label
+    return ENTRANCE_BANDS[-1][1]
+
+
+# Không gian đặc trưng: các từ khóa của danh mục + khoảng GPA + khoảng điểm thi
+VOCABULARY: Dict[str, int] = {}
+for *_, keywords, _, _ in CATALOG:
+    for keyword in keywords:
+        VOCABULARY.setdefault(fold_text(keyword), len(VOCABULARY))
+# Các cột từ LEVEL_START trở đi là đặc trưng năng lực
+LEVEL_START = len(VOCABULARY)
+for _, label in GPA_BUCKETS:
+    VOCABULARY[f"gpa:{label}"] = len(VOCABULARY)
+for _, label in ENTRANCE_BANDS:
+    VOCABULARY[f"entrance:{label}"] = len(VOCABULARY)
+
+
+@lru_cache(maxsize=None)
+def item_matrix() -> np.ndarray:
+    # Mỗi ngành/môn là một vector đã chuẩn hóa độ dài: từ khóa = 1, các khoảng năng lực
+    # đạt yêu cầu tối thiểu = LEVEL_WEIGHT. Tính (và nạp numpy) ở lần gợi ý đầu tiên thay vì
+    # lúc import, để không làm chậm lúc khởi động app
+    import numpy as np
+    matrix = np.zeros((len(CATALOG), len(VOCABULARY)))
+    for row, (_, _, _, keywords, min_gpa, min_entrance) in enumerate(CATALOG):
+        for keyword in keywords:
+            matrix[row, VOCABULARY[fold_text(keyword)]] = 1.0
+        for lower, label in GPA_BUCKETS:
+            if lower >= min_gpa:
+                matrix[row, VOCABULARY[f"gpa:{label}"]] = LEVEL_WEIGHT
+        for lower, label in ENTRANCE_BANDS:
+            if lower >= min_entrance:
+                matrix[row, VOCABULARY[f"entrance:{label}"]] = LEVEL_WEIGHT
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+ITEM_CODES = [code for code, *_ in CATALOG]
+
+
+def student_terms(values) -> List[int]:
+    # Chỉ số các đặc trưng có trong hồ sơ (có thể lặp lại nếu từ khóa xuất hiện nhiều lần)
+    text = " ".join(value for value in values[:len(RECOMMENDATION_TEXT_FIELDS)] if value)
+    words = fold_text(text).replace(",", " ").replace(";", " ").split()
+    indices = []
+    for size in range(1, MAX_TERM_WORDS + 1):
+        for start in range(len(words) - size + 1):
+            index = VOCABULARY.get(" ".join(words[start:start + size]))
+            if index is not None:
+                indices.append(index)
+    gpa, entrance_score = values[len(RECOMMENDATION_TEXT_FIELDS):]
+    if gpa is not None:
+        indices.append(VOCABULARY[f"gpa:{gpa_bucket(gpa)}"])
+    if entrance_score is not None:
+        indices.append(VOCABULARY[f"entrance:{entrance_band(entrance_score)}"])
+    return indices
+
+
+def recommendation_feature_query():
+    return select(models.Student.id, *[getattr(models.Student, field) for field in RECOMMENDATION_SOURCE_FIELDS])
+
+
+def recommend_rows(rows: Sequence, top_k: int = None) -> List[Dict]:
+    # rows: kết quả recommendation_feature_query(); chấm cosine với cả danh mục bằng một
+    # phép nhân ma trận rồi lấy top-k cho từng sinh viên
+    import numpy as np
+    top_k = min(top_k or settings.RECOMMENDATION_TOP_K, len(CATALOG))
+    if not rows:
+        return []
+    vectors = np.zeros((len(rows), len(VOCABULARY)))
+    for row_index, (_, *values) in enumerate(rows):
+        indices = student_terms(values)
+        if indices:
+            np.add.at(vectors[row_index], indices, 1.0)
+    # Đặc trưng năng lực của sinh viên cũng mang trọng số LEVEL_WEIGHT như phía danh mục
+    vectors[:, LEVEL_START:] *= LEVEL_WEIGHT
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    scores = vectors @ item_matrix().T
+    top = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+    result = []
+    for (student_id, *_), items, item_scores in zip(rows, top.tolist(), top_scores.tolist()):
+        rank = 0
+        for item, score in zip(items, item_scores):
+            if score <= 0:
+                break
+            rank += 1
+            result.append({"student_id": student_id, "rank": rank, "item_code": ITEM_CODES[item], "score": score})
+    return result
+
+
+async def recompute_recommendations(db, condition) -> None:
+    # Tính lại gợi ý của các sinh viên thỏa condition trong transaction hiện tại của db
+    rows = (await db.execute(recommendation_feature_query().where(condition))).all()
+    await db.execute(
+        delete(models.StudentRecommendation)
+        .where(models.StudentRecommendation.student_id.in_([row[0] for row in rows]))
+    )
+    recommendations = recommend_rows(rows)
+    if recommendations:
+        await db.execute(insert(models.StudentRecommendation), recommendations)
+
+
+def recompute_all(conn, batch_size: int = 10000) -> int:
+    # Tính lại gợi ý cho toàn bộ sinh viên theo lô (lệnh recompute-recommendations)
+    conn.execute(delete(models.StudentRecommendation))
+    count = 0
+    result = conn.execution_options(yield_per=batch_size).execute(
+        recommendation_feature_query().order_by(models.Student.id)
+    )
+    for rows in result.partitions():
+        recommendations = recommend_rows(rows)
+        if recommendations:
+            conn.execute(insert(models.StudentRecommendation), recommendations)
+        count += len(rows)
+    return count
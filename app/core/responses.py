@@ -0,0 +1,24 @@
+from typing import Any, Dict, Optional
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+
+def model_response(
+    content: BaseModel,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    # Model đã được validate một lần khi tạo (from_orm / model_construct từ các model con đã
+    # validate); serialize thẳng ra bytes bằng pydantic-core. Trả về Response nên FastAPI
+    # không dump rồi validate lại theo response_model (response_model vẫn dùng cho OpenAPI).
+    return Response(content.model_dump_json(), status_code=status_code, headers=headers, media_type="application/json")
+
+
+def adapter_response(
+    adapter: TypeAdapter,
+    content: Any,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    # Như model_response cho các kiểu không phải BaseModel, vd. List[schemas.Class]
+    return Response(adapter.dump_json(content), status_code=status_code, headers=headers, media_type="application/json")
@@ -0,0 +1,147 @@
+from __future__ import annotations
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Dict, List, Sequence
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from ..models import models
+from .search import fold_text
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Mô hình chấm điểm rủi ro bỏ học: hồi quy logistic với trọng số cố định trên các trường
+# số của students. Điểm của một sinh viên chỉ phụ thuộc dữ liệu của chính sinh viên đó
+# (giá trị thiếu được thay bằng hằng số), nên chấm lại từng người khi sửa cho cùng kết quả
+# với lần chấm lại toàn bộ.
+RISK_MODEL_VERSION = 1
+
+RISK_BIAS = -2.0
+GPA_WEIGHT = 4.0
+GPA_REFERENCE = 2.5  # GPA thang 4; thấp hơn mức này thì rủi ro tăng
+CREDIT_GAP_WEIGHT = 2.0
+CREDITS_PER_YEAR = 30  # Số tín chỉ dự kiến tích lũy mỗi năm học
+ENTRANCE_WEIGHT = 1.0
+ENTRANCE_REFERENCE = 20.0  # Điểm thi đại học thang 30
+
+# Trọng số theo trạng thái học tập (khóa đã bỏ dấu bằng fold_text); trạng thái khác là 0
+STUDY_STATUS_WEIGHTS = {
+    "dang hoc": 0.0,
+    "bao luu": 1.5,
+    "canh bao hoc vu": 2.0,
+    "dinh chi": 3.0,
+    "thoi hoc": 6.0,
+    "tot nghiep": -6.0,
+}
+
+RISK_FEATURE_COLUMNS = [
+    models.Student.id,
+    models.Student.class_id,
+    models.Student.gpa,
+    models.Student.accumulated_credits,
+    models.Student.university_entrance_score,
+    models.Student.graduation_year,
+    models.Student.study_status,
+]
+# Trường của sinh viên mà khi sửa thì phải chấm lại điểm (class_id được lưu kèm điểm để lọc theo lớp)
+RISK_SOURCE_FIELDS = tuple(column.key for column in RISK_FEATURE_COLUMNS if column.key != "id")
+
+
+def risk_feature_query():
+    return select(*RISK_FEATURE_COLUMNS)
+
+
+def score_features(
+    gpa: np.ndarray,
+    credits: np.ndarray,
+    entrance_score: np.ndarray,
+    graduation_year: np.ndarray,
+    study_status: np.ndarray,
+    current_year: int,
+) -> np.ndarray:
+    # Chấm cả mảng trong một lượt; NaN là giá trị thiếu.
+    # numpy chỉ được nạp khi chấm điểm lần đầu để không làm chậm lúc khởi động app
+    import numpy as np
+    gpa_term = (GPA_REFERENCE - np.nan_to_num(gpa, nan=GPA_REFERENCE)) / GPA_REFERENCE
+
+    years = np.clip(current_year - graduation_year, 0, 4)
+    expected_credits = np.nan_to_num(years * CREDITS_PER_YEAR, nan=0.0)
+    credits = np.where(np.isnan(credits), expected_credits, credits)
+    credit_gap = np.clip(
+        (expected_credits - credits) / np.maximum(expected_credits, 1.0), 0.0, 1.0
+    )
+
+    entrance_term = np.clip(
+        (ENTRANCE_REFERENCE - np.nan_to_num(entrance_score, nan=ENTRANCE_REFERENCE)) / 10.0, -1.0, 1.0
+    )
+
+    # Tra trọng số trên các giá trị khác nhau rồi trải lại cho cả mảng
+    statuses, inverse = np.unique(study_status, return_inverse=True)
+    status_weights = np.array([STUDY_STATUS_WEIGHTS.get(fold_text(status), 0.0) for status in statuses])
+    status_term = status_weights[inverse] if len(statuses) else np.zeros(len(study_status))
+
+    logit = (
+        RISK_BIAS
+        + GPA_WEIGHT * gpa_term
+        + CREDIT_GAP_WEIGHT * credit_gap
+        + ENTRANCE_WEIGHT * entrance_term
+        + status_term
+    )
+    return 1.0 / (1.0 + np.exp(-logit))
+
+
+def score_rows(rows: Sequence) -> List[Dict]:
+    # rows: kết quả risk_feature_query(); trả về các dòng để ghi vào student_risk_scores
+    if not rows:
+        return []
+    import numpy as np
+    ids, class_ids, gpa, credits, entrance_score, graduation_year, study_status = zip(*rows)
+    now = datetime.now(timezone.utc)
+    scores = score_features(
+        np.array(gpa, dtype=float),
+        np.array(credits, dtype=float),
+        np.array(entrance_score, dtype=float),
+        np.array(graduation_year, dtype=float),
+        np.array([status or "" for status in study_status], dtype=str),
+        now.year,
+    )
+    return [
+        {
+            "student_id": student_id,
+            "class_id": class_id,
+            "score": score,
+            "model_version": RISK_MODEL_VERSION,
+            "computed_at": now,
+        }
+        for student_id, class_id, score in zip(ids, class_ids, scores.tolist())
+    ]
+
+
+def upsert_statement(dialect_name: str):
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    statement = dialect.insert(models.StudentRiskScore)
+    return statement.on_conflict_do_update(
+        index_elements=["student_id"],
+        set_={
+            column: getattr(statement.excluded, column)
+            for column in ("class_id", "score", "model_version", "computed_at")
+        }
+    )
+
+
+async def rescore_students(db, condition) -> None:
+    # Chấm lại các sinh viên thỏa condition trong transaction hiện tại của db
+    rows = (await db.execute(risk_feature_query().where(condition))).all()
+    scores = score_rows(rows)
+    if scores:
+        await db.execute(upsert_statement(db.get_bind().dialect.name), scores)
+
+
+def rescore_all(conn, batch_size: int = 10000) -> int:
+    # Chấm lại toàn bộ sinh viên (lệnh rescore-risk, migration): đọc hết đặc trưng,
+    # chấm một lượt bằng NumPy rồi ghi lại bảng điểm
+    rows = conn.execute(risk_feature_query()).all()
+    scores = score_rows(rows)
+    conn.execute(delete(models.StudentRiskScore))
+    for start in range(0, len(scores), batch_size):
+        conn.execute(insert(models.StudentRiskScore), scores[start:start + batch_size])
+    return len(scores)
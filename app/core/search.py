@@ -0,0 +1,49 @@
+import re
+import unicodedata
+from typing import Optional
+from sqlalchemy import Float, Integer, String, column, func, table
+
+# Bảng FTS5 (chỉ dùng trên SQLite) đồng bộ với students.search_key qua trigger
+students_fts = table(
+    "students_fts",
+    column("rowid", Integer),
+    column("search_key", String),
+    column("rank", Float),
+)
+
+# Tokenizer trigram không khớp được chuỗi ngắn hơn 3 ký tự
+MIN_TRIGRAM_LENGTH = 3
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fold_text(value: Optional[str]) -> str:
+    # Bỏ dấu tiếng Việt, chuyển về chữ thường: "Nguyễn Văn Đức" -> "nguyen van duc"
+    if not value:
+        return ""
+    value = value.replace("đ", "d").replace("Đ", "D")
+    decomposed = unicodedata.normalize("NFD", value)
+    stripped = "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+    return _WHITESPACE.sub(" ", stripped).strip().lower()
+
+
+def build_search_key(full_name: Optional[str], student_code: Optional[str], email: Optional[str]) -> str:
+    return " ".join(part for part in (fold_text(full_name), fold_text(student_code), fold_text(email)) if part)
+
+
+def apply_search(query, search_column, id_column, term: str, dialect_name: str):
+    # Trả về (query đã lọc, biểu thức xếp hạng theo thứ tự tăng dần hoặc None)
+    folded = fold_text(term)
+    if not folded:
+        return query, None
+    if dialect_name == "postgresql":
+        # LIKE '%...%' dùng được chỉ mục GIN gin_trgm_ops
+        query = query.filter(search_column.contains(folded, autoescape=True))
+        return query, -func.word_similarity(folded, search_column)
+    if dialect_name == "sqlite" and len(folded) >= MIN_TRIGRAM_LENGTH:
+        phrase = '"' + folded.replace('"', '""') + '"'
+        query = query.join(students_fts, students_fts.c.rowid == id_column).filter(
+            students_fts.c.search_key.match(phrase)
+        )
+        return query, students_fts.c.rank
+    return query.filter(search_column.contains(folded, autoescape=True)), None
@@ -1,10 +1,15 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from ..core.config import settings
+from .metrics import PASSWORD_HASH_SECONDS, CallbackGauge, register
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.PASSWORD_HASH_ROUNDS)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -12,6 +17,87 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def timed(fn, *args):
+    # Chạy trên thread băm; thời gian được ghi vào metrics khi kết quả về lại event loop
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+class PasswordHasherBusyError(Exception):
+    pass
+
+class PasswordHasher:
+    # bcrypt nhả GIL trong lúc băm nên thread pool tận dụng được nhiều core.
+    # Số tác vụ đang chờ + đang chạy bị giới hạn; vượt quá thì báo lỗi ngay thay vì xếp hàng vô hạn.
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+            return self._executor
+
+    async def _run(self, operation: str, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordHasherBusyError("Password hashing queue is full")
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, elapsed = await loop.run_in_executor(self._get_executor(), timed, fn, *args)
+            PASSWORD_HASH_SECONDS.labels(operation).observe(elapsed)
+            return result
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", get_password_hash, password)
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        # Băm song song cho import hàng loạt, không tính vào giới hạn max_pending.
+        # Gửi từng nhóm nhỏ để các yêu cầu đăng nhập không phải xếp sau cả lô.
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        hash_seconds = PASSWORD_HASH_SECONDS.labels("hash")
+        hashed = []
+        for start in range(0, len(passwords), self.max_workers):
+            for result, elapsed in await asyncio.gather(*(
+                loop.run_in_executor(executor, timed, get_password_hash, password)
+                for password in passwords[start:start + self.max_workers]
+            )):
+                hash_seconds.observe(elapsed)
+                hashed.append(result)
+        return hashed
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
+
+register(CallbackGauge(
+    "password_hash_pending", "Password hash/verify calls queued or running", (),
+    lambda: [((), password_hasher.pending)],
+))
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -20,4 +106,4 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt 
\ No newline at end of file
+    return encoded_jwt
@@ -0,0 +1,159 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import String, case, delete, func, insert, literal, select, text, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from ..models import models
+from ..schemas import schemas
+
+# Các chiều thống kê theo lớp; TOTAL_DIMENSION là dòng tổng của cả lớp
+TOTAL_DIMENSION = "all"
+STATUS_DIMENSIONS = ("academic_status", "study_status", "gender")
+GPA_DIMENSION = "gpa"
+
+# Khoảng GPA (thang 4) theo xếp loại, xét từ cận dưới cao nhất xuống
+GPA_BUCKETS = [
+    (3.6, "3.6-4.0"),
+    (3.2, "3.2-3.6"),
+    (2.5, "2.5-3.2"),
+    (2.0, "2.0-2.5"),
+    (1.0, "1.0-2.0"),
+    (0.0, "0.0-1.0"),
+]
+
+STAT_COLUMNS = ("student_count", "gpa_sum", "gpa_count", "credits_sum")
+STAT_SOURCE_FIELDS = ("class_id", "gpa", "accumulated_credits") + STATUS_DIMENSIONS
+
+
+def gpa_bucket(gpa: Optional[float]) -> str:
+    if gpa is None:
+        return ""
+    for lower, label in GPA_BUCKETS:
+        if gpa >= lower:
+            return label
+    return GPA_BUCKETS[-1][1]
+
+
+def stat_values(student) -> dict:
+    # Ảnh chụp các trường ảnh hưởng tới thống kê, từ ORM object hoặc dict dùng để insert
+    if isinstance(student, dict):
+        return {field: student.get(field) for field in STAT_SOURCE_FIELDS}
+    return {field: getattr(student, field) for field in STAT_SOURCE_FIELDS}
+
+
+def add_contribution(deltas, values: dict, sign: int) -> None:
+    class_id = values["class_id"]
+    if class_id is None:
+        return
+    gpa = values["gpa"]
+    credits = values["accumulated_credits"]
+    contribution = (sign, sign * (gpa or 0.0), sign * (gpa is not None), sign * (credits or 0))
+    keys = [(TOTAL_DIMENSION, "")]
+    keys += [(dimension, values[dimension] or "") for dimension in STATUS_DIMENSIONS]
+    keys.append((GPA_DIMENSION, gpa_bucket(gpa)))
+    for dimension, value in keys:
+        row = deltas[(class_id, dimension, value)]
+        for i, amount in enumerate(contribution):
+            row[i] += amount
+
+
+def upsert_statement(dialect_name: str):
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    statement = dialect.insert(models.StudentStat)
+    return statement.on_conflict_do_update(
+        index_elements=["class_id", "dimension", "value"],
+        set_={
+            column: getattr(models.StudentStat, column) + getattr(statement.excluded, column)
+            for column in STAT_COLUMNS
+        }
+    )
+
+
+async def apply_student_stats(db, added: Iterable[dict] = (), removed: Iterable[dict] = ()) -> None:
+    # Cộng phần chênh lệch vào student_stats trong transaction hiện tại của db;
+    # added/removed là các stat_values() của sinh viên được thêm vào/bớt đi
+    deltas = defaultdict(lambda: [0, 0.0, 0, 0])
+    for values in added:
+        add_contribution(deltas, values, 1)
+    for values in removed:
+        add_contribution(deltas, values, -1)
+    # Khóa các dòng theo cùng một thứ tự để hai transaction song song không deadlock
+    rows = [
+        dict(zip(("class_id", "dimension", "value") + STAT_COLUMNS, key + tuple(delta)))
+        for key, delta in sorted(deltas.items())
+        if any(delta)
+    ]
+    if rows:
+        await db.execute(upsert_statement(db.get_bind().dialect.name), rows)
+
+
+def rebuild_statements(dialect_name: str) -> List:
+    # Tính lại toàn bộ student_stats từ bảng students (lệnh rebuild-stats, migration)
+    student = models.Student
+    gpa_value = case(
+        (student.gpa.is_(None), ""),
+        *[(student.gpa >= lower, label) for lower, label in GPA_BUCKETS],
+        else_=GPA_BUCKETS[-1][1]
+    )
+    values = [(TOTAL_DIMENSION, literal("", String))]
+    values += [(dimension, func.coalesce(getattr(student, dimension), "")) for dimension in STATUS_DIMENSIONS]
+    values.append((GPA_DIMENSION, gpa_value))
+    source = union_all(*[
+        select(
+            student.class_id.label("class_id"),
+            literal(dimension, String).label("dimension"),
+            value.label("value"),
+            student.gpa.label("gpa"),
+            student.accumulated_credits.label("credits"),
+        ).where(student.class_id.isnot(None))
+        for dimension, value in values
+    ]).subquery()
+    rollup = select(
+        source.c.class_id,
+        source.c.dimension,
+        source.c.value,
+        func.count(),
+        func.coalesce(func.sum(source.c.gpa), 0.0),
+        func.count(source.c.gpa),
+        func.coalesce(func.sum(source.c.credits), 0),
+    ).group_by(source.c.class_id, source.c.dimension, source.c.value)
+
+    statements = []
+    if dialect_name == "postgresql":
+        # Chặn các upsert tăng dần cho tới khi tính lại xong
+        statements.append(text("LOCK TABLE student_stats IN SHARE ROW EXCLUSIVE MODE"))
+    statements.append(delete(models.StudentStat))
+    statements.append(insert(models.StudentStat).from_select(
+        ["class_id", "dimension", "value"] + list(STAT_COLUMNS), rollup
+    ))
+    return statements
+
+
+def stat_bucket(value: str, totals) -> schemas.StatBucket:
+    student_count, gpa_sum, gpa_count, credits_sum = totals
+    return schemas.StatBucket(
+        value=value or None,
+        student_count=student_count,
+        average_gpa=round(gpa_sum / gpa_count, 2) if gpa_count else None,
+        credits_sum=credits_sum,
+    )
+
+
+def build_student_stats(rows, class_id: Optional[int] = None, class_name: Optional[str] = None) -> schemas.StudentStats:
+    # rows: (dimension, value, student_count, gpa_sum, gpa_count, credits_sum), đã cộng dồn theo phạm vi cần xem
+    buckets: Dict[str, List[schemas.StatBucket]] = {dimension: [] for dimension in STATUS_DIMENSIONS + (GPA_DIMENSION,)}
+    total = schemas.StatBucket(student_count=0, credits_sum=0)
+    for dimension, value, *totals in rows:
+        if not totals[0]:
+            continue
+        if dimension == TOTAL_DIMENSION:
+            total = stat_bucket(value, totals)
+        elif dimension in buckets:
+            buckets[dimension].append(stat_bucket(value, totals))
+    return schemas.StudentStats(
+        class_id=class_id,
+        class_name=class_name,
+        student_count=total.student_count,
+        average_gpa=total.average_gpa,
+        credits_sum=total.credits_sum,
+        **buckets
+    )
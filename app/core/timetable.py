@@ -0,0 +1,285 @@
+import asyncio
+import bisect
+import random
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from sqlalchemy import delete, insert, select, tuple_
+from ..models import models
+
+# Xếp thời khóa biểu cho các lớp học phần. Ràng buộc cứng:
+#   - một phòng chỉ có một buổi học trong mỗi ca, và phải đủ chỗ cho lớp học phần
+#   - một lớp sinh viên (class_id) và một giảng viên không học/dạy hai buổi cùng ca
+#   - các buổi của cùng một lớp học phần rơi vào các ngày khác nhau
+# Bước 1 xếp tham lam, lớp khó xếp trước (đông sinh viên, nhiều buổi). Bước 2 tìm kiếm
+# cục bộ cho các buổi chưa xếp được: chiếm chỗ của đúng một buổi đang chặn rồi xếp lại
+# buổi bị đẩy ra ở chỗ khác; nếu không được thì hoàn tác.
+
+
+class Section(NamedTuple):
+    id: int
+    class_id: Optional[int]
+    lecturer: Optional[str]
+    size: int
+    sessions: int
+
+
+class Room(NamedTuple):
+    id: int
+    capacity: int
+
+
+class Slot(NamedTuple):
+    id: int
+    day: int
+    period: int
+
+
+Key = Tuple[int, int]  # (section_id, session)
+
+# Số lần thử đẩy một buổi khác ra cho mỗi buổi chưa xếp được trong một vòng sửa
+REPAIR_ATTEMPTS = 100
+
+
+class TimetableSolver:
+    def __init__(self, sections: Iterable[Section], rooms: Iterable[Room], slots: Iterable[Slot], seed: int = 0):
+        self.sections: Dict[int, Section] = {section.id: section for section in sections}
+        self.rooms = sorted(rooms, key=lambda room: (room.capacity, room.id))
+        self.capacities = [room.capacity for room in self.rooms]
+        self.room_capacity = {room.id: room.capacity for room in self.rooms}
+        # Duyệt ca sớm trước, rải qua các ngày trước khi dùng ca muộn hơn
+        self.slots = sorted(slots, key=lambda slot: (slot.period, slot.day, slot.id))
+        self.slot_day = {slot.id: slot.day for slot in self.slots}
+        self.random = random.Random(seed)
+
+        self.assignments: Dict[Key, Tuple[int, int]] = {}
+        self.room_busy: Dict[Tuple[int, int], Key] = {}
+        self.class_busy: Dict[Tuple[int, int], Key] = {}
+        self.lecturer_busy: Dict[Tuple[int, str], Key] = {}
+        self.section_days: Dict[int, Dict[int, int]] = {}
+
+    def keys(self, section_ids: Optional[Iterable[int]] = None) -> List[Key]:
+        ids = self.sections if section_ids is None else section_ids
+        return [(section_id, session) for section_id in ids for session in range(self.sections[section_id].sessions)]
+
+    def assign(self, key: Key, slot_id: int, room_id: int) -> None:
+        section = self.sections[key[0]]
+        self.assignments[key] = (slot_id, room_id)
+        self.room_busy[(slot_id, room_id)] = key
+        if section.class_id is not None:
+            self.class_busy[(slot_id, section.class_id)] = key
+        if section.lecturer:
+            self.lecturer_busy[(slot_id, section.lecturer)] = key
+        self.section_days.setdefault(key[0], {})[key[1]] = self.slot_day[slot_id]
+
+    def unassign(self, key: Key) -> Optional[Tuple[int, int]]:
+        placement = self.assignments.pop(key, None)
+        if placement is None:
+            return None
+        slot_id, room_id = placement
+        section = self.sections[key[0]]
+        del self.room_busy[(slot_id, room_id)]
+        if section.class_id is not None:
+            del self.class_busy[(slot_id, section.class_id)]
+        if section.lecturer:
+            del self.lecturer_busy[(slot_id, section.lecturer)]
+        del self.section_days[key[0]][key[1]]
+        return placement
+
+    def load(self, assignments: Dict[Key, Tuple[int, int]]) -> None:
+        # Nạp lịch hiện có; bỏ qua buổi của lớp học phần đã bị xóa, bớt buổi,
+        # hoặc không còn hợp lệ (phòng/ca đã bị xóa, phòng không đủ chỗ, trùng lịch)
+        for key, (slot_id, room_id) in assignments.items():
+            section = self.sections.get(key[0])
+            if section is None or key[1] >= section.sessions or slot_id not in self.slot_day:
+                continue
+            if self.room_capacity.get(room_id, 0) < section.size:
+                continue
+            if (slot_id, room_id) in self.room_busy or self.blockers(key, slot_id) != set():
+                continue
+            self.assign(key, slot_id, room_id)
+
+    def blockers(self, key: Key, slot_id: int) -> Optional[set]:
+        # Các buổi khác đang chặn key ở ca slot_id (trùng lớp hoặc giảng viên);
+        # None nếu không thể xếp vào ca này (trùng ngày với buổi khác của cùng lớp học phần)
+        section = self.sections[key[0]]
+        day = self.slot_day[slot_id]
+        if any(
+            other_day == day
+            for session, other_day in self.section_days.get(key[0], {}).items()
+            if session != key[1]
+        ):
+            return None
+        blocking = set()
+        if section.class_id is not None and (slot_id, section.class_id) in self.class_busy:
+            blocking.add(self.class_busy[(slot_id, section.class_id)])
+        if section.lecturer and (slot_id, section.lecturer) in self.lecturer_busy:
+            blocking.add(self.lecturer_busy[(slot_id, section.lecturer)])
+        return blocking
+
+    def fitting_rooms(self, section: Section) -> List[Room]:
+        # Phòng đủ chỗ, nhỏ trước để dành phòng lớn cho lớp đông
+        return self.rooms[bisect.bisect_left(self.capacities, section.size):]
+
+    def free_room(self, section: Section, slot_id: int) -> Optional[int]:
+        for room in self.fitting_rooms(section):
+            if (slot_id, room.id) not in self.room_busy:
+                return room.id
+        return None
+
+    def place(self, key: Key, exclude_slot: Optional[int] = None) -> bool:
+        section = self.sections[key[0]]
+        for slot in self.slots:
+            if slot.id == exclude_slot or self.blockers(key, slot.id) != set():
+                continue
+            room_id = self.free_room(section, slot.id)
+            if room_id is not None:
+                self.assign(key, slot.id, room_id)
+                return True
+        return False
+
+    def repair(self, key: Key) -> bool:
+        # Đẩy đúng một buổi đang chặn ra, xếp key vào chỗ đó, rồi xếp lại buổi bị đẩy
+        section = self.sections[key[0]]
+        slots = list(self.slots)
+        self.random.shuffle(slots)
+        attempts = 0
+        for slot in slots:
+            if attempts >= REPAIR_ATTEMPTS:
+                break
+            blocking = self.blockers(key, slot.id)
+            if blocking is None or len(blocking) > 1:
+                continue
+            free_room = self.free_room(section, slot.id)
+            if blocking:
+                blocker = next(iter(blocking))
+                # Không còn phòng trống: dùng phòng của buổi chặn nếu đủ chỗ
+                room_id = free_room
+                if room_id is None and self.room_capacity[self.assignments[blocker][1]] >= section.size:
+                    room_id = self.assignments[blocker][1]
+                candidates = [(blocker, room_id)] if room_id is not None else []
+            elif free_room is not None:
+                self.assign(key, slot.id, free_room)
+                return True
+            else:
+                candidates = [
+                    (self.room_busy[(slot.id, room.id)], room.id)
+                    for room in self.fitting_rooms(section)
+                ]
+            self.random.shuffle(candidates)
+            for evicted, room_id in candidates[:REPAIR_ATTEMPTS - attempts]:
+                attempts += 1
+                previous = self.unassign(evicted)
+                if (slot.id, room_id) in self.room_busy:
+                    self.assign(evicted, *previous)
+                    continue
+                self.assign(key, slot.id, room_id)
+                if self.place(evicted, exclude_slot=previous[0]):
+                    return True
+                self.unassign(key)
+                self.assign(evicted, *previous)
+        return False
+
+    def solve(self, keys: Optional[List[Key]] = None, rounds: int = 3) -> List[Key]:
+        # Xếp các buổi trong keys (mặc định: tất cả buổi chưa xếp); trả về các buổi không xếp được
+        if keys is None:
+            keys = [key for key in self.keys() if key not in self.assignments]
+        keys = sorted(keys, key=lambda key: (-self.sections[key[0]].size, -self.sections[key[0]].sessions, key))
+        unassigned = [key for key in keys if not self.place(key)]
+        for _ in range(rounds):
+            if not unassigned:
+                break
+            remaining = [key for key in unassigned if not self.repair(key)]
+            if len(remaining) == len(unassigned):
+                break
+            unassigned = remaining
+        return unassigned
+
+
+# Mỗi tiến trình chỉ chạy một lần xếp lịch tại một thời điểm
+schedule_lock = asyncio.Lock()
+
+
+async def load_timetable_problem(db):
+    sections = [
+        Section(*row) for row in await db.execute(select(
+            models.CourseSection.id,
+            models.CourseSection.class_id,
+            models.CourseSection.lecturer,
+            models.CourseSection.size,
+            models.CourseSection.sessions_per_week,
+        ))
+    ]
+    rooms = [Room(*row) for row in await db.execute(select(models.Room.id, models.Room.capacity))]
+    slots = [
+        Slot(*row) for row in await db.execute(
+            select(models.TimeSlot.id, models.TimeSlot.day_of_week, models.TimeSlot.period)
+        )
+    ]
+    assignments = {
+        (section_id, session): (slot_id, room_id)
+        for section_id, session, slot_id, room_id in await db.execute(select(
+            models.SectionAssignment.section_id,
+            models.SectionAssignment.session,
+            models.SectionAssignment.slot_id,
+            models.SectionAssignment.room_id,
+        ))
+    }
+    return sections, rooms, slots, assignments
+
+
+def solve_timetable(sections, rooms, slots, current, section_id: Optional[int] = None):
+    solver = TimetableSolver(sections, rooms, slots)
+    if section_id is None:
+        # Xếp lại toàn bộ từ đầu
+        unassigned = solver.solve()
+    else:
+        # Giữ nguyên lịch hiện có, chỉ xếp lại các buổi của một lớp học phần; các buổi
+        # khác đang chưa xếp được để dành cho lần xếp lại toàn bộ
+        solver.load(current)
+        keys = solver.keys([section_id]) if section_id in solver.sections else []
+        for key in keys:
+            solver.unassign(key)
+        solver.solve(keys)
+        unassigned = [key for key in solver.keys() if key not in solver.assignments]
+    return solver.assignments, unassigned
+
+
+async def run_schedule_job(session_factory, job_id: int) -> None:
+    async with schedule_lock:
+        async with session_factory() as db:
+            job = await db.get(models.ScheduleJob, job_id)
+            section_id = job.section_id
+            job.status = models.ScheduleJobStatus.RUNNING
+            await db.commit()
+            try:
+                sections, rooms, slots, current = await load_timetable_problem(db)
+                # Kết thúc transaction đọc để không giữ kết nối trong lúc giải
+                await db.rollback()
+                assignments, unassigned = await asyncio.to_thread(
+                    solve_timetable, sections, rooms, slots, current, section_id
+                )
+                # Chỉ ghi các buổi có thay đổi: xóa trước rồi chèn, để không vi phạm
+                # ràng buộc (slot_id, room_id) duy nhất giữa chừng
+                changed = [key for key in current if assignments.get(key) != current[key]]
+                added = [key for key in assignments if current.get(key) != assignments[key]]
+                for start in range(0, len(changed), 1000):
+                    await db.execute(
+                        delete(models.SectionAssignment).where(
+                            tuple_(models.SectionAssignment.section_id, models.SectionAssignment.session)
+                            .in_(changed[start:start + 1000])
+                        )
+                    )
+                if added:
+                    await db.execute(insert(models.SectionAssignment), [
+                        {"section_id": key[0], "session": key[1], "slot_id": assignments[key][0], "room_id": assignments[key][1]}
+                        for key in added
+                    ])
+                job.status = models.ScheduleJobStatus.DONE
+                job.assigned = len(assignments)
+                job.unassigned = len(unassigned)
+            except Exception as e:
+                await db.rollback()
+                job.status = models.ScheduleJobStatus.FAILED
+                job.error = str(e)
+            job.finished_at = datetime.now(timezone.utc)
+            await db.commit()
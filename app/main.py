@@ -1,19 +1,24 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from .core.config import settings
-from .core.database import engine, get_db
-from .models import models
-from .routers import auth, students, classes
-from .core.security import get_password_hash
-from sqlalchemy.orm import Session
+from .core.database import AsyncSessionLocal, async_engine, prewarm_pool
+from .core.feedback import feedback_buffer
+from .core.metrics import CONTENT_TYPE, MetricsMiddleware, check_metrics_token, render_metrics
+from .core.query_log import QueryLogMiddleware, install_query_log
+from .routers import auth, students, classes, stats, risk, timetable, admissions, activities, feedback
+from .core.security import password_hasher
+from typing import Optional
+import asyncio
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+# Schema do Alembic quản lý (alembic upgrade head) và tài khoản admin tạo bằng
+# `python -m app.cli create-admin`: lúc import và khởi động app không truy vấn DB
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=ORJSONResponse
 )
 
 # Set up CORS
@@ -23,30 +28,49 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# Thêm sau CORS nên bọc ngoài cùng: đo cả thời gian của các middleware khác
+app.add_middleware(MetricsMiddleware, routes=app.routes)
+
+if settings.QUERY_LOG_ENABLED:
+    install_query_log()
+    app.add_middleware(QueryLogMiddleware, routes=app.routes)
+
 # Include routers
 app.include_router(auth.router, prefix=settings.API_V1_STR + "/auth", tags=["auth"])
 app.include_router(students.router, prefix=settings.API_V1_STR + "/students", tags=["students"])
 app.include_router(classes.router, prefix=settings.API_V1_STR + "/classes", tags=["classes"])
-
-# Create default admin user
-def create_default_admin():
-    db = next(get_db())
-    admin = db.query(models.User).filter(models.User.username == "admin").first()
-    if not admin:
-        admin = models.User(
-            username="admin",
-            hashed_password=get_password_hash("admin"),
-            is_active=True,
-            role=models.UserRole.ADMIN
-        )
-        db.add(admin)
-        db.commit()
+app.include_router(stats.router, prefix=settings.API_V1_STR + "/stats", tags=["stats"])
+app.include_router(risk.router, prefix=settings.API_V1_STR + "/risk", tags=["risk"])
+app.include_router(timetable.router, prefix=settings.API_V1_STR + "/timetable", tags=["timetable"])
+app.include_router(admissions.router, prefix=settings.API_V1_STR + "/admissions", tags=["admissions"])
+app.include_router(activities.router, prefix=settings.API_V1_STR + "/activities", tags=["activities"])
+app.include_router(feedback.router, prefix=settings.API_V1_STR + "/feedback", tags=["feedback"])
 
 @app.on_event("startup")
 async def startup_event():
-    create_default_admin()
+    feedback_buffer.start(AsyncSessionLocal)
+    if settings.DB_PREWARM_CONNECTIONS > 0 and settings.DB_POOL_MODE == "queue":
+        # Chạy nền: không chặn việc nhận request đầu tiên. NullPool không giữ kết nối nên bỏ qua
+        app.state.prewarm_task = asyncio.create_task(prewarm_pool(settings.DB_PREWARM_CONNECTIONS))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    prewarm_task = getattr(app.state, "prewarm_task", None)
+    if prewarm_task is not None:
+        prewarm_task.cancel()
+    # Ghi nốt các đánh giá còn trong bộ đệm trước khi đóng engine
+    await feedback_buffer.stop()
+    password_hasher.shutdown()
+    await async_engine.dispose()
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(authorization: Optional[str] = Header(None)):
+    if not check_metrics_token(authorization, settings.METRICS_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
 
 @app.get("/")
 async def root():
@@ -1,7 +1,8 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Enum, Float
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Enum, Float, Index, UniqueConstraint, DDL, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..core.database import Base
+from ..core.search import build_search_key
 import enum
 
 class UserRole(str, enum.Enum):
@@ -33,6 +34,15 @@ class Class(Base):
 
 class Student(Base):
     __tablename__ = "students"
+    __table_args__ = (
+        # Phục vụ phân trang keyset khi sắp xếp theo họ tên
+        Index("ix_students_full_name_id", "full_name", "id"),
+        # Chỉ mục trigram cho tìm kiếm, chỉ tạo trên Postgres
+        Index(
+            "ix_students_search_key_trgm", "search_key",
+            postgresql_using="gin", postgresql_ops={"search_key": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     student_code = Column(String, unique=True, index=True)
@@ -73,7 +83,228 @@ class Student(Base):
     achievements = Column(String, nullable=True)  # Thành tích
     special_skills = Column(String, nullable=True)  # Kỹ năng đặc biệt
     
+    # Khóa tìm kiếm đã bỏ dấu (họ tên + mã SV + email), cập nhật khi ghi
+    search_key = Column(String, nullable=True)
+    
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
-    class_info = relationship("Class", back_populates="students") 
\ No newline at end of file
+    class_info = relationship("Class", back_populates="students") 
+
+class StudentStat(Base):
+    # Bảng tổng hợp thống kê sinh viên theo lớp, cập nhật tăng dần cùng transaction ghi sinh viên
+    # (app/core/stats.py); mỗi dòng là một giá trị của một chiều, "all" là dòng tổng của lớp
+    __tablename__ = "student_stats"
+    __table_args__ = (
+        UniqueConstraint("class_id", "dimension", "value", name="uq_student_stats_key"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    class_id = Column(Integer, nullable=False, index=True)
+    dimension = Column(String, nullable=False)  # all / academic_status / study_status / gender / gpa
+    value = Column(String, nullable=False)  # "" khi sinh viên chưa có giá trị
+    student_count = Column(Integer, nullable=False, default=0)
+    gpa_sum = Column(Float, nullable=False, default=0)
+    gpa_count = Column(Integer, nullable=False, default=0)  # số sinh viên đã có GPA
+    credits_sum = Column(Integer, nullable=False, default=0)
+
+class StudentRiskScore(Base):
+    # Điểm rủi ro bỏ học (0..1) của từng sinh viên, do app/core/risk.py chấm
+    __tablename__ = "student_risk_scores"
+    __table_args__ = (
+        # Phục vụ GET /risk/top: lấy các điểm cao nhất, toàn trường hoặc theo lớp
+        Index("ix_student_risk_scores_score", "score"),
+        Index("ix_student_risk_scores_class_id_score", "class_id", "score"),
+    )
+
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), primary_key=True)
+    class_id = Column(Integer, nullable=True)
+    score = Column(Float, nullable=False)
+    model_version = Column(Integer, nullable=False)
+    computed_at = Column(DateTime(timezone=True), nullable=False)
+
+class StudentRecommendation(Base):
+    # Top-k ngành/môn học gợi ý cho từng sinh viên, do app/core/recommend.py tính sẵn
+    __tablename__ = "student_recommendations"
+
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    item_code = Column(String, nullable=False)  # Mã trong recommend.CATALOG
+    score = Column(Float, nullable=False)
+
+class AdmissionCube(Base):
+    # Khối tổng hợp tuyển sinh: mỗi dòng là một ô (khóa tốt nghiệp THPT, trường THPT, quê quán,
+    # khoảng điểm thi), cập nhật tăng dần cùng transaction ghi sinh viên (app/core/admissions.py).
+    # Các cột fit_* là tổng đủ để khớp hồi quy GPA theo điểm thi mà không đọc lại bảng students.
+    __tablename__ = "admission_cube"
+    __table_args__ = (
+        UniqueConstraint("cohort", "high_school", "hometown", "score_band", name="uq_admission_cube_key"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    cohort = Column(Integer, nullable=False, index=True)  # Năm tốt nghiệp THPT, 0 khi chưa có
+    high_school = Column(String, nullable=False)  # "" khi sinh viên chưa có giá trị
+    hometown = Column(String, nullable=False)
+    score_band = Column(String, nullable=False)
+    student_count = Column(Integer, nullable=False, default=0)
+    gpa_sum = Column(Float, nullable=False, default=0)
+    gpa_count = Column(Integer, nullable=False, default=0)
+    dropout_count = Column(Integer, nullable=False, default=0)
+    # Chỉ tính các sinh viên có cả điểm thi (x) và GPA (y)
+    fit_count = Column(Integer, nullable=False, default=0)
+    fit_x_sum = Column(Float, nullable=False, default=0)
+    fit_y_sum = Column(Float, nullable=False, default=0)
+    fit_xx_sum = Column(Float, nullable=False, default=0)
+    fit_xy_sum = Column(Float, nullable=False, default=0)
+    fit_yy_sum = Column(Float, nullable=False, default=0)
+
+# Hoạt động ngoại khóa/kỹ năng đã chuẩn hóa từ extracurricular_activities và special_skills
+class Activity(Base):
+    __tablename__ = "activities"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String, unique=True, nullable=False)  # Tên đã bỏ dấu, chữ thường (fold_text)
+    name = Column(String, nullable=False)  # Tên hiển thị, lấy từ lần xuất hiện đầu tiên
+
+class StudentActivity(Base):
+    __tablename__ = "student_activities"
+
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), primary_key=True)
+    activity_id = Column(Integer, ForeignKey("activities.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+class StudentPeerGroup(Base):
+    # Nhóm sinh viên cùng sở thích do job phát hiện cộng đồng (app/core/activities.py) tính;
+    # group_id là id của hoạt động đại diện cho nhóm
+    __tablename__ = "student_peer_groups"
+
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), primary_key=True)
+    group_id = Column(Integer, nullable=False, index=True)
+
+# Thời khóa biểu
+class Room(Base):
+    __tablename__ = "rooms"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True)
+    capacity = Column(Integer, nullable=False)  # Số chỗ ngồi
+
+class TimeSlot(Base):
+    __tablename__ = "time_slots"
+    __table_args__ = (
+        UniqueConstraint("day_of_week", "period", name="uq_time_slots_day_period"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    day_of_week = Column(Integer, nullable=False)  # 1 = thứ Hai ... 7 = Chủ nhật
+    period = Column(Integer, nullable=False)  # Ca học trong ngày, bắt đầu từ 1
+
+class CourseSection(Base):
+    # Lớp học phần: một nhóm sinh viên (class_id) học một môn với một giảng viên,
+    # sessions_per_week buổi mỗi tuần, mỗi buổi vào một ngày khác nhau
+    __tablename__ = "course_sections"
+
+    id = Column(Integer, primary_key=True, index=True)
+    code = Column(String, unique=True, index=True)
+    name = Column(String, nullable=False)
+    class_id = Column(Integer, ForeignKey("classes.id"), nullable=True, index=True)
+    lecturer = Column(String, nullable=True)
+    size = Column(Integer, nullable=False)  # Số sinh viên, phòng phải đủ chỗ
+    sessions_per_week = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class SectionAssignment(Base):
+    # Xếp một buổi (session) của lớp học phần vào một ca và một phòng
+    __tablename__ = "section_assignments"
+    __table_args__ = (
+        UniqueConstraint("slot_id", "room_id", name="uq_section_assignments_slot_room"),
+    )
+
+    section_id = Column(Integer, ForeignKey("course_sections.id", ondelete="CASCADE"), primary_key=True)
+    session = Column(Integer, primary_key=True)
+    slot_id = Column(Integer, ForeignKey("time_slots.id"), nullable=False)
+    room_id = Column(Integer, ForeignKey("rooms.id"), nullable=False)
+
+class TeachingFeedback(Base):
+    # Đánh giá chất lượng giảng dạy của sinh viên cho một lớp học phần. Chỉ lưu user_id để mỗi
+    # người đánh giá một lần, không liên kết tới hồ sơ sinh viên; lecturer là giảng viên lúc đánh giá.
+    __tablename__ = "teaching_feedback"
+    __table_args__ = (
+        UniqueConstraint("section_id", "user_id", name="uq_teaching_feedback_section_user"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    section_id = Column(Integer, ForeignKey("course_sections.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, nullable=False)
+    lecturer = Column(String, nullable=True)
+    rating = Column(Integer, nullable=False)  # 1..5
+    comment = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class FeedbackAggregate(Base):
+    # Tổng hợp đánh giá theo lớp học phần (scope "section", key = id) và theo giảng viên
+    # (scope "lecturer", key = tên), cộng dồn mỗi lần ghi một lô đánh giá (app/core/feedback.py)
+    __tablename__ = "feedback_aggregates"
+    __table_args__ = (
+        UniqueConstraint("scope", "key", name="uq_feedback_aggregates_scope_key"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    scope = Column(String, nullable=False)
+    key = Column(String, nullable=False)
+    response_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    rating_1 = Column(Integer, nullable=False, default=0)
+    rating_2 = Column(Integer, nullable=False, default=0)
+    rating_3 = Column(Integer, nullable=False, default=0)
+    rating_4 = Column(Integer, nullable=False, default=0)
+    rating_5 = Column(Integer, nullable=False, default=0)
+
+class ScheduleJobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+class ScheduleJob(Base):
+    # Một lần chạy bộ xếp lịch; section_id khác NULL là xếp lại riêng lớp học phần đó
+    __tablename__ = "schedule_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    section_id = Column(Integer, nullable=True)
+    status = Column(Enum(ScheduleJobStatus), default=ScheduleJobStatus.PENDING, nullable=False)
+    assigned = Column(Integer, nullable=True)  # Số buổi đã xếp được
+    unassigned = Column(Integer, nullable=True)  # Số buổi không xếp được
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+@event.listens_for(Student, "before_insert")
+@event.listens_for(Student, "before_update")
+def update_student_search_key(mapper, connection, target):
+    target.search_key = build_search_key(target.full_name, target.student_code, target.email)
+
+# Postgres: extension pg_trgm cho chỉ mục trigram
+event.listen(
+    Base.metadata, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
+# SQLite: bảng FTS5 (tokenizer trigram) đồng bộ với students.search_key qua trigger
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS students_fts USING fts5("
+    "search_key, content='students', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS students_fts_ai AFTER INSERT ON students BEGIN "
+    "INSERT INTO students_fts(rowid, search_key) VALUES (new.id, new.search_key); END",
+    "CREATE TRIGGER IF NOT EXISTS students_fts_ad AFTER DELETE ON students BEGIN "
+    "INSERT INTO students_fts(students_fts, rowid, search_key) VALUES ('delete', old.id, old.search_key); END",
+    "CREATE TRIGGER IF NOT EXISTS students_fts_au AFTER UPDATE OF search_key ON students BEGIN "
+    "INSERT INTO students_fts(students_fts, rowid, search_key) VALUES ('delete', old.id, old.search_key); "
+    "INSERT INTO students_fts(rowid, search_key) VALUES (new.id, new.search_key); END",
+]
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Student.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(
+    Student.__table__, "before_drop",
+    DDL("DROP TABLE IF EXISTS students_fts").execute_if(dialect="sqlite")
+)
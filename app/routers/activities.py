@@ -0,0 +1,124 @@
+from collections import defaultdict
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import List
+from ..core.database import get_async_db
+from ..core.activities import activity_index, run_peer_group_detection
+from ..models import models
+from ..schemas import schemas
+from .auth import get_current_user
+from .students import check_admin_access
+
+router = APIRouter()
+
+# Số hoạt động phổ biến nhất hiển thị cho mỗi nhóm
+GROUP_TOP_ACTIVITIES = 5
+
+@router.get("/", response_model=List[schemas.Activity])
+async def read_activities(
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    # Số sinh viên lấy từ chỉ mục ngược trong bộ nhớ
+    _, members = await activity_index.get(db)
+    top = sorted(members.items(), key=lambda item: (-len(item[1]), item[0]))[:limit]
+    names = dict((await db.execute(
+        select(models.Activity.id, models.Activity.name)
+        .where(models.Activity.id.in_([activity_id for activity_id, _ in top]))
+    )).all())
+    return [
+        schemas.Activity(id=activity_id, name=names[activity_id], student_count=len(student_ids))
+        for activity_id, student_ids in top
+        if student_ids and activity_id in names
+    ]
+
+async def group_activities(db: AsyncSession, group_ids: List[int]):
+    # Các hoạt động phổ biến nhất trong mỗi nhóm
+    group = models.StudentPeerGroup
+    link = models.StudentActivity
+    member_count = func.count()
+    rows = await db.execute(
+        select(group.group_id, models.Activity.name, member_count)
+        .join(link, link.student_id == group.student_id)
+        .join(models.Activity, models.Activity.id == link.activity_id)
+        .where(group.group_id.in_(group_ids))
+        .group_by(group.group_id, models.Activity.id, models.Activity.name)
+        .order_by(group.group_id, member_count.desc(), models.Activity.name)
+    )
+    activities = defaultdict(list)
+    for group_id, name, _ in rows:
+        if len(activities[group_id]) < GROUP_TOP_ACTIVITIES:
+            activities[group_id].append(name)
+    names = dict((await db.execute(
+        select(models.Activity.id, models.Activity.name).where(models.Activity.id.in_(group_ids))
+    )).all())
+    return names, activities
+
+@router.get("/groups", response_model=List[schemas.PeerGroup])
+async def read_peer_groups(
+    min_size: int = Query(2, ge=1),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+
+    group = models.StudentPeerGroup
+    size = func.count()
+    groups = (await db.execute(
+        select(group.group_id, size)
+        .group_by(group.group_id)
+        .having(size >= min_size)
+        .order_by(size.desc(), group.group_id)
+        .limit(limit)
+    )).all()
+    names, activities = await group_activities(db, [group_id for group_id, _ in groups])
+    return [
+        schemas.PeerGroup(
+            group_id=group_id, name=names.get(group_id, ""), size=group_size, activities=activities[group_id]
+        )
+        for group_id, group_size in groups
+    ]
+
+@router.get("/groups/{group_id}", response_model=schemas.PeerGroupDetail)
+async def read_peer_group(
+    group_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+
+    students = (await db.execute(
+        select(models.Student.id, models.Student.student_code, models.Student.full_name, models.Student.class_id)
+        .join(models.StudentPeerGroup, models.StudentPeerGroup.student_id == models.Student.id)
+        .where(models.StudentPeerGroup.group_id == group_id)
+        .order_by(models.Student.id)
+    )).all()
+    if not students:
+        raise HTTPException(status_code=404, detail="Group not found")
+    names, activities = await group_activities(db, [group_id])
+    return schemas.PeerGroupDetail(
+        group_id=group_id,
+        name=names.get(group_id, ""),
+        size=len(students),
+        activities=activities[group_id],
+        students=[
+            schemas.PeerGroupMember(student_id=id, student_code=code, full_name=full_name, class_id=class_id)
+            for id, code, full_name, class_id in students
+        ],
+    )
+
+@router.post("/groups/detect", status_code=status.HTTP_202_ACCEPTED)
+async def detect_peer_groups(
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+
+    # Session của request đã đóng khi background task chạy: job tự mở session trên cùng engine
+    session_factory = async_sessionmaker(db.bind, autoflush=False, expire_on_commit=False)
+    background_tasks.add_task(run_peer_group_detection, session_factory)
+    return {"message": "Peer group detection started"}
@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from ..core.database import get_async_db
+from ..core.admissions import SCORE_BANDS, admission_cell, fit_admission_model
+from ..models import models
+from ..schemas import schemas
+from .auth import get_current_user
+from .students import check_admin_access
+
+router = APIRouter()
+
+Dimension = Literal["cohort", "high_school", "hometown", "score_band"]
+
+def cube_filters(query, cohort, high_school, hometown, score_band):
+    # Cắt lát theo giá trị của từng chiều; chỉ đọc các ô của admission_cube
+    cube = models.AdmissionCube
+    if cohort is not None:
+        query = query.where(cube.cohort == cohort)
+    if high_school is not None:
+        query = query.where(cube.high_school == high_school)
+    if hometown is not None:
+        query = query.where(cube.hometown == hometown)
+    if score_band is not None:
+        if score_band not in {label for _, label in SCORE_BANDS}:
+            raise HTTPException(status_code=400, detail="Unknown score band")
+        query = query.where(cube.score_band == score_band)
+    return query
+
+@router.get("/cube", response_model=List[schemas.AdmissionCell])
+async def read_admission_cube(
+    group_by: List[Dimension] = Query([]),
+    cohort: Optional[int] = None,
+    high_school: Optional[str] = None,
+    hometown: Optional[str] = None,
+    score_band: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+
+    cube = models.AdmissionCube
+    dimensions = list(dict.fromkeys(group_by))
+    keys = [getattr(cube, dimension) for dimension in dimensions]
+    student_count = func.sum(cube.student_count)
+    query = select(
+        *keys,
+        student_count,
+        func.sum(cube.gpa_sum),
+        func.sum(cube.gpa_count),
+        func.sum(cube.dropout_count),
+    ).group_by(*keys).having(student_count > 0).order_by(*keys)
+    query = cube_filters(query, cohort, high_school, hometown, score_band)
+    rows = await db.execute(query)
+    return [
+        admission_cell(dict(zip(dimensions, row[:len(dimensions)])), row[len(dimensions):])
+        for row in rows
+    ]
+
+@router.get("/model", response_model=schemas.AdmissionModel)
+async def read_admission_model(
+    entrance_score: Optional[float] = Query(None, ge=0, le=30),
+    cohort: Optional[int] = None,
+    high_school: Optional[str] = None,
+    hometown: Optional[str] = None,
+    score_band: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+
+    cube = models.AdmissionCube
+    query = select(*[
+        func.sum(column) for column in (
+            cube.fit_count, cube.fit_x_sum, cube.fit_y_sum, cube.fit_xx_sum, cube.fit_xy_sum, cube.fit_yy_sum
+        )
+    ])
+    query = cube_filters(query, cohort, high_school, hometown, score_band)
+    totals = (await db.execute(query)).one()
+    return fit_admission_model([value or 0 for value in totals], entrance_score)
@@ -1,26 +1,62 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
 from ..core import security
+from ..core.cache import TTLCache
 from ..core.config import settings
-from ..core.database import get_db
+from ..core.database import get_async_db
 from ..models import models
 from ..schemas import schemas
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = db.query(models.User).filter(models.User.username == username).first()
+# Cache principal trong tiến trình để không phải truy vấn bảng users ở mỗi request.
+# Mỗi instance có cache riêng, nên thay đổi từ instance khác có hiệu lực sau tối đa TTL giây.
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL
+)
+
+def invalidate_principal(username: str):
+    principal_cache.pop(username)
+
+# Mọi thay đổi trên users qua ORM (đổi mật khẩu, khóa tài khoản, xóa sinh viên...) đều xóa cache
+# ngay khi flush; các handler gọi lại invalidate_principal sau commit để request song song
+# không nạp lại bản ghi cũ vào cache trong khoảng giữa flush và commit
+@event.listens_for(models.User, "after_insert")
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def invalidate_principal_on_write(mapper, connection, target):
+    invalidate_principal(target.username)
+    for old_username in inspect(target).attrs.username.history.deleted:
+        invalidate_principal(old_username)
+
+def password_hashing_unavailable():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Password hashing service is busy, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    result = await db.execute(
+        select(models.User.id, models.User.username, models.User.hashed_password, models.User.is_active)
+        .where(models.User.username == username)
+    )
+    user = result.first()
+    # Trả kết nối về pool trước khi chờ bcrypt, tránh giữ kết nối trong ~250ms
+    await db.close()
     if not user:
         return False
-    if not security.verify_password(password, user.hashed_password):
+    if not await security.password_hasher.verify(password, user.hashed_password):
         return False
     return user
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -34,17 +70,31 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         token_data = schemas.TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    user = db.query(models.User).filter(models.User.username == token_data.username).first()
-    if user is None:
-        raise credentials_exception
-    return user
+    principal = principal_cache.get(token_data.username)
+    if principal is None:
+        generation = principal_cache.generation
+        user = await db.scalar(select(models.User).where(models.User.username == token_data.username))
+        if user is None:
+            raise credentials_exception
+        principal = schemas.Principal.from_orm(user)
+        principal_cache.set(token_data.username, principal, generation=generation)
+    if not principal.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Inactive user",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return principal
 
 @router.post("/token")
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = authenticate_user(db, form_data.username, form_data.password)
+    try:
+        user = await authenticate_user(db, form_data.username, form_data.password)
+    except security.PasswordHasherBusyError:
+        raise password_hashing_unavailable()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -64,20 +114,43 @@ async def login_for_access_token(
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/logout")
-async def logout(current_user: models.User = Depends(get_current_user)):
+async def logout(current_user: schemas.Principal = Depends(get_current_user)):
     return {"message": "Successfully logged out"}
 
 @router.post("/change-password")
 async def change_password(
     password_data: schemas.PasswordChange,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: schemas.Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    if not security.verify_password(password_data.current_password, current_user.hashed_password):
+    result = await db.execute(
+        select(models.User.id, models.User.username, models.User.hashed_password)
+        .where(models.User.id == current_user.id)
+    )
+    user = result.first()
+    await db.close()
+    try:
+        if user is None or not await security.password_hasher.verify(password_data.current_password, user.hashed_password):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Incorrect current password"
+            )
+        hashed_password = await security.password_hasher.hash(password_data.new_password)
+    except security.PasswordHasherBusyError:
+        raise password_hashing_unavailable()
+    await db.execute(
+        update(models.User).where(models.User.id == user.id).values(hashed_password=hashed_password)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    invalidate_principal(user.username)
+    return {"message": "Password changed successfully"}
+
+@router.get("/principal-cache")
+async def read_principal_cache_stats(current_user: schemas.Principal = Depends(get_current_user)):
+    if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Incorrect current password"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
         )
-    current_user.hashed_password = security.get_password_hash(password_data.new_password)
-    db.commit()
-    return {"message": "Password changed successfully"} 
\ No newline at end of file
+    return principal_cache.stats() 
\ No newline at end of file
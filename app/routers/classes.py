@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from pydantic import TypeAdapter
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from typing import List
-from ..core.database import get_db
+from typing import List, Optional
+from ..core.class_cache import class_cache
+from ..core.etag import etag_matches, not_modified, version_of, weak_etag
+from ..core.database import get_async_db
+from ..core.responses import adapter_response, model_response
 from ..models import models
 from ..schemas import schemas
 from .auth import get_current_user
@@ -10,92 +15,132 @@ from .students import check_admin_access
 
 router = APIRouter()
 
+class_list_adapter = TypeAdapter(List[schemas.Class])
+
 @router.post("/", response_model=schemas.Class)
-def create_class(
+async def create_class(
     class_data: schemas.ClassCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
 ):
     check_admin_access(current_user)
     
     try:
         db_class = models.Class(**class_data.dict())
         db.add(db_class)
-        db.commit()
-        db.refresh(db_class)
-        return schemas.Class.from_orm(db_class)
+        await db.commit()
+        class_cache.invalidate()
+        await db.refresh(db_class)
+        return model_response(schemas.Class.from_orm(db_class))
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="A class with this information already exists"
         )
 
 @router.get("/", response_model=List[schemas.Class])
-def read_classes(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+async def read_classes(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
 ):
-    classes = db.query(models.Class).all()
-    return [schemas.Class.from_orm(class_) for class_ in classes]
+    classes = await class_cache.get_all(db)
+    etag = weak_etag([(class_.id, version_of(class_)) for class_ in classes.values()])
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return adapter_response(class_list_adapter, list(classes.values()), headers={"ETag": etag})
 
 @router.get("/{class_id}", response_model=schemas.Class)
-def read_class(
+async def read_class(
     class_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
 ):
-    db_class = db.query(models.Class).filter(models.Class.id == class_id).first()
-    if db_class is None:
+    class_ = await class_cache.get(db, class_id)
+    if class_ is None:
         raise HTTPException(status_code=404, detail="Class not found")
-    return schemas.Class.from_orm(db_class)
+    etag = weak_etag(class_.id, version_of(class_))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return model_response(class_, headers={"ETag": etag})
 
 @router.put("/{class_id}", response_model=schemas.Class)
-def update_class(
+async def update_class(
     class_id: int,
     class_data: schemas.ClassUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user),
+    if_match: Optional[str] = Header(None)
 ):
     check_admin_access(current_user)
     
     try:
-        db_class = db.query(models.Class).filter(models.Class.id == class_id).first()
+        query = select(models.Class).where(models.Class.id == class_id)
+        if if_match:
+            # Khóa dòng tới khi commit để không ai sửa chen giữa lúc kiểm tra và lúc ghi
+            query = query.with_for_update()
+        db_class = await db.scalar(query)
         if db_class is None:
             raise HTTPException(status_code=404, detail="Class not found")
+        if if_match and not etag_matches(if_match, weak_etag(db_class.id, version_of(db_class))):
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="Class has been modified by another request"
+            )
         
         for key, value in class_data.dict(exclude_unset=True).items():
             setattr(db_class, key, value)
         
-        db.commit()
-        db.refresh(db_class)
-        return schemas.Class.from_orm(db_class)
+        await db.commit()
+        class_cache.invalidate()
+        await db.refresh(db_class)
+        return model_response(
+            schemas.Class.from_orm(db_class), headers={"ETag": weak_etag(db_class.id, version_of(db_class))}
+        )
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="A class with this information already exists"
         )
 
 @router.delete("/{class_id}")
-def delete_class(
+async def delete_class(
     class_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
 ):
     check_admin_access(current_user)
     
-    db_class = db.query(models.Class).filter(models.Class.id == class_id).first()
+    db_class = await db.scalar(select(models.Class).where(models.Class.id == class_id))
     if db_class is None:
         raise HTTPException(status_code=404, detail="Class not found")
     
     # Check if there are any students in this class
-    if db.query(models.Student).filter(models.Student.class_id == class_id).count() > 0:
+    student_count = await db.scalar(
+        select(func.count()).select_from(models.Student).where(models.Student.class_id == class_id)
+    )
+    if student_count > 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot delete class with existing students"
         )
     
-    db.delete(db_class)
-    db.commit()
+    # Lớp học phần trỏ tới lớp (khóa ngoại không có ondelete): xóa lớp sẽ lỗi khi commit
+    section_count = await db.scalar(
+        select(func.count()).select_from(models.CourseSection).where(models.CourseSection.class_id == class_id)
+    )
+    if section_count > 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot delete class with existing course sections"
+        )
+    
+    await db.delete(db_class)
+    # Lớp không còn sinh viên: các dòng thống kê còn lại của lớp đều bằng 0
+    await db.execute(delete(models.StudentStat).where(models.StudentStat.class_id == class_id))
+    await db.commit()
+    class_cache.invalidate()
     return {"message": "Class deleted successfully"} 
\ No newline at end of file
@@ -0,0 +1,141 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import cast, select, String
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import List
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..core.database import get_async_db
+from ..core.feedback import (
+    AGGREGATE_COLUMNS, LECTURER_SCOPE, SECTION_SCOPE, FeedbackBufferFullError, PendingFeedback,
+    feedback_buffer, feedback_summary,
+)
+from ..models import models
+from ..schemas import schemas
+from .auth import get_current_user
+from .students import check_admin_access
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# (có tồn tại, giảng viên) của lớp học phần theo id; bị xóa khi sửa/xóa lớp học phần
+section_cache = TTLCache(maxsize=settings.FEEDBACK_SECTION_CACHE_SIZE, ttl=settings.FEEDBACK_SECTION_CACHE_TTL)
+
+AGGREGATE_TOTALS = [getattr(models.FeedbackAggregate, column) for column in AGGREGATE_COLUMNS]
+
+def session_factory_for(db: AsyncSession):
+    # Ghi lô bằng session riêng trên cùng engine với request
+    return async_sessionmaker(db.bind, autoflush=False, expire_on_commit=False)
+
+@router.post("/", status_code=status.HTTP_202_ACCEPTED)
+async def submit_feedback(
+    feedback: schemas.FeedbackCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    if current_user.role != models.UserRole.STUDENT:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only students can submit feedback"
+        )
+
+    # Thường không truy vấn DB: giảng viên của lớp học phần lấy từ cache
+    section = section_cache.get(feedback.section_id)
+    if section is None:
+        generation = section_cache.generation
+        row = (await db.execute(
+            select(models.CourseSection.id, models.CourseSection.lecturer)
+            .where(models.CourseSection.id == feedback.section_id)
+        )).first()
+        section = (row is not None, row.lecturer if row is not None else None)
+        section_cache.set(feedback.section_id, section, generation=generation)
+    exists, lecturer = section
+    if not exists:
+        raise HTTPException(status_code=404, detail="Section not found")
+
+    try:
+        full = feedback_buffer.add(PendingFeedback(
+            section_id=feedback.section_id,
+            user_id=current_user.id,
+            lecturer=lecturer,
+            rating=feedback.rating,
+            comment=feedback.comment,
+        ))
+    except FeedbackBufferFullError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Feedback queue is full, please retry",
+            headers={"Retry-After": "1"},
+        )
+    if full:
+        # Đánh giá đã được nhận: lỗi khi ghi lô chỉ ghi log, lô được giữ lại cho lần flush sau
+        try:
+            await feedback_buffer.flush(session_factory_for(db))
+        except Exception as e:
+            logger.error(f"Failed to flush teaching feedback: {e}")
+    return {"message": "Feedback accepted"}
+
+@router.post("/flush")
+async def flush_feedback(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+
+    written = await feedback_buffer.flush(session_factory_for(db))
+    return {"written": written}
+
+@router.get("/sections", response_model=List[schemas.FeedbackSummary])
+async def read_section_feedback(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+
+    aggregate = models.FeedbackAggregate
+    section = models.CourseSection
+    rows = await db.execute(
+        select(section.id, section.code, section.name, section.lecturer, *AGGREGATE_TOTALS)
+        .join(aggregate, (aggregate.scope == SECTION_SCOPE) & (aggregate.key == cast(section.id, String)))
+        .where(aggregate.response_count > 0)
+        .order_by(section.id)
+    )
+    return [
+        feedback_summary(totals, section_id=id, section_code=code, section_name=name, lecturer=lecturer)
+        for id, code, name, lecturer, *totals in rows
+    ]
+
+@router.get("/sections/{section_id}", response_model=schemas.FeedbackSummary)
+async def read_section_feedback_by_id(
+    section_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+
+    section = await db.scalar(select(models.CourseSection).where(models.CourseSection.id == section_id))
+    if section is None:
+        raise HTTPException(status_code=404, detail="Section not found")
+    aggregate = models.FeedbackAggregate
+    totals = (await db.execute(
+        select(*AGGREGATE_TOTALS).where(aggregate.scope == SECTION_SCOPE, aggregate.key == str(section_id))
+    )).first()
+    return feedback_summary(
+        totals, section_id=section.id, section_code=section.code, section_name=section.name, lecturer=section.lecturer
+    )
+
+@router.get("/lecturers", response_model=List[schemas.FeedbackSummary])
+async def read_lecturer_feedback(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+
+    aggregate = models.FeedbackAggregate
+    rows = await db.execute(
+        select(aggregate.key, *AGGREGATE_TOTALS)
+        .where(aggregate.scope == LECTURER_SCOPE, aggregate.response_count > 0)
+        .order_by(aggregate.key)
+    )
+    return [feedback_summary(totals, lecturer=lecturer) for lecturer, *totals in rows]
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from ..core.database import get_async_db
+from ..models import models
+from ..schemas import schemas
+from .auth import get_current_user
+from .students import check_admin_access
+
+router = APIRouter()
+
+@router.get("/top", response_model=List[schemas.StudentRiskScore])
+async def read_top_risk(
+    class_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+
+    risk = models.StudentRiskScore
+    # Đọc theo chỉ mục (class_id, score) / (score) rồi chỉ join các dòng đã chọn
+    query = (
+        select(
+            risk.student_id,
+            models.Student.student_code,
+            models.Student.full_name,
+            risk.class_id,
+            risk.score,
+            risk.computed_at,
+        )
+        .join(models.Student, models.Student.id == risk.student_id)
+        .order_by(risk.score.desc(), risk.student_id)
+        .limit(limit)
+    )
+    if class_id is not None:
+        query = query.where(risk.class_id == class_id)
+    rows = await db.execute(query)
+    return [schemas.StudentRiskScore(**row._mapping) for row in rows]
@@ -0,0 +1,71 @@
+from collections import defaultdict
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from ..core.database import get_async_db
+from ..core.class_cache import class_cache
+from ..core.stats import STAT_COLUMNS, build_student_stats
+from ..models import models
+from ..schemas import schemas
+from .auth import get_current_user
+from .students import check_admin_access
+
+router = APIRouter()
+
+# Cột cộng dồn; đọc từ bảng student_stats (vài dòng mỗi lớp), không quét bảng students
+STAT_TOTALS = [getattr(models.StudentStat, column) for column in STAT_COLUMNS]
+
+@router.get("/", response_model=schemas.StudentStats)
+async def read_stats(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+
+    stat = models.StudentStat
+    rows = await db.execute(
+        select(stat.dimension, stat.value, *[func.sum(column) for column in STAT_TOTALS])
+        .group_by(stat.dimension, stat.value)
+        .order_by(stat.dimension, stat.value)
+    )
+    return build_student_stats(rows.all())
+
+@router.get("/classes", response_model=List[schemas.StudentStats])
+async def read_class_stats(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+
+    stat = models.StudentStat
+    rows = await db.execute(
+        select(stat.class_id, stat.dimension, stat.value, *STAT_TOTALS).order_by(stat.dimension, stat.value)
+    )
+    rows_by_class = defaultdict(list)
+    for class_id, *row in rows:
+        rows_by_class[class_id].append(row)
+    classes = await class_cache.get_all(db)
+    return [
+        build_student_stats(rows_by_class[class_id], class_id=class_id, class_name=class_.name)
+        for class_id, class_ in classes.items()
+    ]
+
+@router.get("/classes/{class_id}", response_model=schemas.StudentStats)
+async def read_class_stats_by_id(
+    class_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+
+    class_ = await class_cache.get(db, class_id)
+    if class_ is None:
+        raise HTTPException(status_code=404, detail="Class not found")
+    stat = models.StudentStat
+    rows = await db.execute(
+        select(stat.dimension, stat.value, *STAT_TOTALS)
+        .where(stat.class_id == class_id)
+        .order_by(stat.dimension, stat.value)
+    )
+    return build_student_stats(rows.all(), class_id=class_id, class_name=class_.name)
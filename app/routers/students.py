@@ -1,14 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, UploadFile, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import noload
 from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
-from ..core.database import get_db
+from ..core.database import get_async_db
 from ..models import models
 from ..schemas import schemas
-from .auth import get_current_user
-from ..core.security import get_password_hash
+from .auth import get_current_user, invalidate_principal, password_hashing_unavailable
+from ..core.security import PasswordHasherBusyError, password_hasher
+from ..core.pagination import InvalidCursorError, apply_keyset, decode_cursor, encode_cursor, keyset_order
+from ..core.search import apply_search, build_search_key, fold_text
+from ..core.cache import TTLCache
+from ..core.class_cache import class_cache
+from ..core.etag import etag_matches, not_modified, version_of, weak_etag
+from ..core.responses import adapter_response, model_response
+from ..core.stats import apply_student_stats, stat_values
+from ..core.admissions import admission_values, apply_admission_cube
+from ..core.risk import RISK_SOURCE_FIELDS, rescore_students
+from ..core.recommend import CATALOG_ITEMS, RECOMMENDATION_SOURCE_FIELDS, recompute_recommendations
+from ..core.activities import ACTIVITY_SOURCE_FIELDS, activity_index, find_peers, sync_student_activities
+from ..core.config import settings
 from math import ceil
-from sqlalchemy import or_
+import csv
+import io
+from datetime import date, datetime
+import json
 import logging
 import traceback
 
@@ -18,18 +37,75 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-def check_admin_access(current_user: models.User):
+# Cache tổng số bản ghi theo bộ lọc, bị xóa khi tạo/sửa/xóa sinh viên
+student_count_cache = TTLCache(
+    maxsize=settings.STUDENT_COUNT_CACHE_SIZE,
+    ttl=settings.STUDENT_COUNT_CACHE_TTL
+)
+
+# Gợi ý ngành/môn học đã đọc theo student_id, bị xóa khi hồ sơ sinh viên thay đổi
+recommendation_cache = TTLCache(
+    maxsize=settings.RECOMMENDATION_CACHE_SIZE,
+    ttl=settings.RECOMMENDATION_CACHE_TTL
+)
+recommendation_list_adapter = TypeAdapter(List[schemas.Recommendation])
+
+TOTAL_MODES = ("exact", "estimate", "none")
+
+def check_admin_access(current_user: schemas.Principal):
     if current_user.role != models.UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
         )
 
+# Thông báo lỗi theo tên ràng buộc vi phạm, dùng chung cho tạo đơn lẻ và import hàng loạt
+STUDENT_CONSTRAINT_ERRORS = [
+    ("users_username_key", "Email đã được đăng ký cho tài khoản khác"),
+    ("students_email_key", "Email đã được đăng ký cho sinh viên khác"),
+    ("students_student_code_key", "Mã sinh viên đã tồn tại"),
+    ("students_id_card_key", "Số CCCD/CMND đã được đăng ký"),
+    ("students_class_id_fkey", "Lớp học không tồn tại"),
+]
+
+def integrity_error_detail(error_message: str) -> str:
+    for constraint_name, detail in STUDENT_CONSTRAINT_ERRORS:
+        if constraint_name in error_message:
+            return detail
+    return "Thông tin sinh viên không hợp lệ"
+
+def student_query():
+    # class_info không truy vấn từ DB mà lấy từ class_cache khi trả về (student_response)
+    return select(models.Student).options(noload(models.Student.class_info))
+
+# Các trường của schemas.Student đọc thẳng từ ORM; class_info lấy từ class_cache
+STUDENT_RESPONSE_FIELDS = [name for name in schemas.Student.model_fields if name != "class_info"]
+
+def student_response(student: models.Student, classes) -> schemas.Student:
+    # Dữ liệu đọc từ DB đã được validate khi ghi, nên dựng model bằng model_construct
+    # (không validate lại, nhất là EmailStr) và để pydantic-core serialize đúng một lượt
+    values = {name: getattr(student, name) for name in STUDENT_RESPONSE_FIELDS}
+    return schemas.Student.model_construct(class_info=classes.get(student.class_id), **values)
+
+def student_version(student, classes):
+    # class_info nằm trong response nên đổi tên lớp cũng phải đổi ETag của sinh viên
+    class_ = classes.get(student.class_id)
+    return (student.id, version_of(student), version_of(class_) if class_ is not None else None)
+
+def student_etag(student, classes) -> str:
+    return weak_etag(*student_version(student, classes))
+
+async def load_student(db: AsyncSession, student_id: int):
+    # Đọc lại sau commit để lấy giá trị do server sinh (created_at, updated_at)
+    return await db.scalar(
+        student_query().where(models.Student.id == student_id).execution_options(populate_existing=True)
+    )
+
 @router.post("/", response_model=schemas.Student)
-def create_student(
+async def create_student(
     student: schemas.StudentCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
 ):
     try:
         check_admin_access(current_user)
@@ -37,7 +113,7 @@ def create_student(
         # Validate class_id
         if student.class_id is not None:
             # Check if class exists
-            db_class = db.query(models.Class).filter(models.Class.id == student.class_id).first()
+            db_class = await class_cache.get(db, student.class_id)
             if not db_class:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -45,9 +121,13 @@ def create_student(
                 )
         
         # Create user account for student
+        try:
+            hashed_password = await password_hasher.hash(student.password)
+        except PasswordHasherBusyError:
+            raise password_hashing_unavailable()
         db_user = models.User(
             username=student.email,  # Using email as username
-            hashed_password=get_password_hash(student.password),
+            hashed_password=hashed_password,
             role=models.UserRole.STUDENT
         )
         db.add(db_user)
@@ -56,48 +136,30 @@ def create_student(
         student_data = student.dict(exclude={'password'})
         db_student = models.Student(**student_data)
         db.add(db_student)
+        await apply_student_stats(db, added=[stat_values(db_student)])
+        await apply_admission_cube(db, added=[admission_values(db_student)])
+        await db.flush()
+        await rescore_students(db, models.Student.id == db_student.id)
+        await recompute_recommendations(db, models.Student.id == db_student.id)
+        activity_links = await sync_student_activities(db, models.Student.id == db_student.id)
         
-        db.commit()
-        db.refresh(db_student)
-        return schemas.Student.from_orm(db_student)
+        await db.commit()
+        student_count_cache.clear()
+        activity_index.update(activity_links)
+        db_student = await load_student(db, db_student.id)
+        return model_response(student_response(db_student, await class_cache.get_all(db)))
     except HTTPException as he:
         raise he
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         error_message = str(e)
         logger.error(f"IntegrityError when creating student: {error_message}")
-        if "users_username_key" in error_message:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email đã được đăng ký cho tài khoản khác"
-            )
-        elif "students_email_key" in error_message:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email đã được đăng ký cho sinh viên khác"
-            )
-        elif "students_student_code_key" in error_message:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Mã sinh viên đã tồn tại"
-            )
-        elif "students_id_card_key" in error_message:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Số CCCD/CMND đã được đăng ký"
-            )
-        elif "students_class_id_fkey" in error_message:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Lớp học không tồn tại"
-            )
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Thông tin sinh viên không hợp lệ"
-            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=integrity_error_detail(error_message)
+        )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         error_message = str(e)
         error_traceback = traceback.format_exc()
         logger.error(f"Unexpected error when creating student: {error_message}\n{error_traceback}")
@@ -106,19 +168,329 @@ def create_student(
             detail="Đã xảy ra lỗi khi tạo sinh viên"
         )
 
+IMPORT_FORMATS = ("csv", "jsonl")
+
+def detect_import_format(upload: UploadFile, import_format: Optional[str]) -> str:
+    if import_format:
+        return import_format.lower()
+    filename = (upload.filename or "").lower()
+    content_type = (upload.content_type or "").lower()
+    if filename.endswith((".jsonl", ".ndjson")) or "ndjson" in content_type or "jsonl" in content_type:
+        return "jsonl"
+    return "csv"
+
+def iter_import_rows(upload: UploadFile, import_format: str):
+    # Đọc tuần tự từ file tải lên, trả về (số dòng, dữ liệu, lỗi phân tích)
+    text = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    if import_format == "csv":
+        for row_number, row in enumerate(csv.DictReader(text), start=1):
+            # Ô trống trong CSV được hiểu là không có giá trị
+            yield row_number, {key: value for key, value in row.items() if key and value not in (None, "")}, None
+        return
+    for row_number, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield row_number, None, "Dòng JSON không hợp lệ"
+            continue
+        if not isinstance(data, dict):
+            yield row_number, None, "Dòng JSON không hợp lệ"
+            continue
+        yield row_number, data, None
+
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors()
+    )
+
+async def import_student_batch(db: AsyncSession, batch, class_ids, seen, errors) -> int:
+    # Kiểm tra, băm mật khẩu song song và chèn một lô sinh viên; trả về số bản ghi đã tạo
+    valid = []
+    for row_number, data, parse_error in batch:
+        if parse_error:
+            errors.append(schemas.StudentImportError(row=row_number, detail=parse_error))
+            continue
+        try:
+            student = schemas.StudentCreate(**data)
+        except ValidationError as e:
+            errors.append(schemas.StudentImportError(
+                row=row_number, student_code=data.get("student_code"), detail=format_validation_error(e)
+            ))
+            continue
+        
+        detail = None
+        if student.class_id not in class_ids:
+            detail = integrity_error_detail("students_class_id_fkey")
+        elif student.email in seen["email"]:
+            detail = integrity_error_detail("students_email_key")
+        elif student.student_code in seen["student_code"]:
+            detail = integrity_error_detail("students_student_code_key")
+        elif student.id_card in seen["id_card"]:
+            detail = integrity_error_detail("students_id_card_key")
+        if detail:
+            errors.append(schemas.StudentImportError(row=row_number, student_code=student.student_code, detail=detail))
+            continue
+        seen["email"].add(student.email)
+        seen["student_code"].add(student.student_code)
+        seen["id_card"].add(student.id_card)
+        valid.append((row_number, student))
+    
+    if not valid:
+        return 0
+    
+    # Kiểm tra trùng với dữ liệu đã có bằng vài truy vấn IN cho cả lô
+    emails = [student.email for _, student in valid]
+    codes = [student.student_code for _, student in valid]
+    id_cards = [student.id_card for _, student in valid]
+    taken = {
+        "users_username_key": select(models.User.username).where(models.User.username.in_(emails)),
+        "students_email_key": select(models.Student.email).where(models.Student.email.in_(emails)),
+        "students_student_code_key": select(models.Student.student_code).where(models.Student.student_code.in_(codes)),
+        "students_id_card_key": select(models.Student.id_card).where(models.Student.id_card.in_(id_cards)),
+    }
+    for name, statement in taken.items():
+        taken[name] = set((await db.scalars(statement)).all())
+    rows = []
+    for row_number, student in valid:
+        values = {
+            "users_username_key": student.email,
+            "students_email_key": student.email,
+            "students_student_code_key": student.student_code,
+            "students_id_card_key": student.id_card,
+        }
+        conflict = next((name for name, value in values.items() if value in taken[name]), None)
+        if conflict:
+            errors.append(schemas.StudentImportError(
+                row=row_number, student_code=student.student_code, detail=integrity_error_detail(conflict)
+            ))
+            continue
+        rows.append((row_number, student))
+    # Kết thúc transaction đọc để không giữ kết nối trong lúc băm mật khẩu
+    await db.rollback()
+    if not rows:
+        return 0
+    
+    hashed_passwords = await password_hasher.hash_many([student.password for _, student in rows])
+    user_rows = []
+    student_rows = []
+    for (row_number, student), hashed_password in zip(rows, hashed_passwords):
+        user_rows.append({
+            "username": student.email,
+            "hashed_password": hashed_password,
+            "is_active": True,
+            "role": models.UserRole.STUDENT,
+        })
+        student_data = student.dict(exclude={"password"})
+        # Chèn bằng Core nên không chạy event before_insert, tự tính search_key
+        student_data["search_key"] = build_search_key(student.full_name, student.student_code, student.email)
+        student_rows.append(student_data)
+    
+    try:
+        await db.execute(insert(models.User), user_rows)
+        await db.execute(insert(models.Student), student_rows)
+        await apply_student_stats(db, added=[stat_values(row) for row in student_rows])
+        await apply_admission_cube(db, added=[admission_values(row) for row in student_rows])
+        imported = models.Student.student_code.in_([row["student_code"] for row in student_rows])
+        await rescore_students(db, imported)
+        await recompute_recommendations(db, imported)
+        activity_links = await sync_student_activities(db, imported)
+        await db.commit()
+        activity_index.update(activity_links)
+        return len(rows)
+    except IntegrityError:
+        # Có bản ghi trùng được tạo song song: chèn lại từng dòng để biết dòng nào lỗi
+        await db.rollback()
+    
+    created = 0
+    activity_links = {}
+    for (row_number, student), user_row, student_row in zip(rows, user_rows, student_rows):
+        try:
+            async with db.begin_nested():
+                await db.execute(insert(models.User), [user_row])
+                await db.execute(insert(models.Student), [student_row])
+                await apply_student_stats(db, added=[stat_values(student_row)])
+                await apply_admission_cube(db, added=[admission_values(student_row)])
+                await rescore_students(db, models.Student.student_code == student_row["student_code"])
+                await recompute_recommendations(db, models.Student.student_code == student_row["student_code"])
+                activity_links.update(
+                    await sync_student_activities(db, models.Student.student_code == student_row["student_code"])
+                )
+            created += 1
+        except IntegrityError as e:
+            errors.append(schemas.StudentImportError(
+                row=row_number, student_code=student.student_code, detail=integrity_error_detail(str(e))
+            ))
+    await db.commit()
+    activity_index.update(activity_links)
+    return created
+
+@router.post("/bulk", response_model=schemas.StudentImportResult)
+async def import_students(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+    
+    import_format = detect_import_format(file, format)
+    if import_format not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Định dạng file không được hỗ trợ"
+        )
+    
+    seen = {"email": set(), "student_code": set(), "id_card": set()}
+    errors = []
+    total = 0
+    created = 0
+    try:
+        class_ids = set((await db.scalars(select(models.Class.id))).all())
+        batch = []
+        for row in iter_import_rows(file, import_format):
+            total += 1
+            batch.append(row)
+            if len(batch) >= settings.STUDENT_IMPORT_BATCH_SIZE:
+                created += await import_student_batch(db, batch, class_ids, seen, errors)
+                batch = []
+        if batch:
+            created += await import_student_batch(db, batch, class_ids, seen, errors)
+    except UnicodeDecodeError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File phải được mã hóa UTF-8"
+        )
+    except Exception as e:
+        await db.rollback()
+        error_message = str(e)
+        error_traceback = traceback.format_exc()
+        logger.error(f"Unexpected error when importing students: {error_message}\n{error_traceback}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Đã xảy ra lỗi khi import sinh viên"
+        )
+    finally:
+        if created:
+            student_count_cache.clear()
+    
+    errors.sort(key=lambda error: error.row)
+    return {
+        "total": total,
+        "created": created,
+        "failed": total - created,
+        "errors": errors
+    }
+
+# Các cột cho phép sắp xếp: (cột, có unique hay không)
+SORTABLE_COLUMNS = {
+    "id": (models.Student.id, True),
+    "student_code": (models.Student.student_code, True),
+    "full_name": (models.Student.full_name, False),
+}
+
+# Các trường chọn được qua fields= ở danh sách; class_name lấy từ bảng classes
+LIST_FIELDS = ["id"] + list(schemas.StudentBase.model_fields) + ["created_at", "updated_at", "class_name"]
+LIST_VIEWS = {"full": None, "compact": list(schemas.StudentListItem.model_fields)}
+
+def list_column(name: str):
+    if name == "class_name":
+        return models.Class.name.label("class_name")
+    return getattr(models.Student, name)
+
+def apply_student_filters(query, filters: schemas.StudentFilter, dialect_name: str):
+    # Trả về (query đã lọc, biểu thức xếp hạng tìm kiếm hoặc None)
+    rank = None
+    if filters.search:
+        query, rank = apply_search(
+            query, models.Student.search_key, models.Student.id, filters.search, dialect_name
+        )
+    
+    if filters.class_id:
+        query = query.filter(models.Student.class_id == filters.class_id)
+    
+    if filters.gender:
+        query = query.filter(models.Student.gender == filters.gender)
+    
+    if filters.academic_status:
+        query = query.filter(models.Student.academic_status == filters.academic_status)
+    
+    if filters.study_status:
+        query = query.filter(models.Student.study_status == filters.study_status)
+    
+    if filters.min_gpa is not None:
+        query = query.filter(models.Student.gpa >= filters.min_gpa)
+    
+    if filters.max_gpa is not None:
+        query = query.filter(models.Student.gpa <= filters.max_gpa)
+    
+    return query, rank
+
+def student_filter_key(filters: schemas.StudentFilter):
+    # Chuẩn hóa theo đúng cách apply_student_filters bỏ qua các giá trị rỗng
+    return (
+        fold_text(filters.search) or None,
+        filters.class_id or None,
+        filters.gender or None,
+        filters.academic_status or None,
+        filters.study_status or None,
+        filters.min_gpa,
+        filters.max_gpa,
+    )
+
+async def estimate_count(db: AsyncSession, query) -> Optional[int]:
+    # Ước lượng số dòng từ planner của Postgres thay vì đếm toàn bộ
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    compiled = query.compile(dialect=bind.dialect)
+    params = compiled.params
+    if compiled.positiontup is not None:
+        # asyncpg dùng tham số đánh số ($1, $2...), cần truyền theo thứ tự
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    connection = await db.connection()
+    result = await connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), params)
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+async def count_students(db: AsyncSession, query, filters: schemas.StudentFilter, total_mode: str) -> Optional[int]:
+    if total_mode == "none":
+        return None
+    if total_mode == "estimate":
+        estimate = await estimate_count(db, query)
+        if estimate is not None:
+            return estimate
+    key = student_filter_key(filters)
+    total = student_count_cache.get(key)
+    if total is None:
+        generation = student_count_cache.generation
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
+        student_count_cache.set(key, total, generation=generation)
+    return total
+
+def apply_student_sort(query, sort_by: str, sort_order: str):
+    column, unique = SORTABLE_COLUMNS[sort_by]
+    return query.order_by(*keyset_order(column, models.Student.id, sort_order, unique))
+
 @router.get("/", response_model=schemas.PaginatedStudentResponse)
-def read_students(
+async def read_students(
     page: int = 1,
     page_size: int = 10,
-    search: Optional[str] = None,
-    class_id: Optional[int] = None,
-    gender: Optional[str] = None,
-    academic_status: Optional[str] = None,
-    study_status: Optional[str] = None,
-    min_gpa: Optional[float] = None,
-    max_gpa: Optional[float] = None,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    sort_by: Optional[str] = None,
+    sort_order: str = "asc",
+    total_mode: str = "exact",
+    view: str = "full",
+    fields: Optional[str] = None,
+    filters: schemas.StudentFilter = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
 ):
     try:
         check_admin_access(current_user)
@@ -129,53 +501,112 @@ def read_students(
         if page_size < 1:
             page_size = 10
         
-        # Tính toán skip
-        skip = (page - 1) * page_size
-        
-        # Xây dựng query với các điều kiện lọc
-        query = db.query(models.Student)
-        
-        # Áp dụng các bộ lọc
-        if search:
-            search = f"%{search}%"
-            query = query.filter(
-                or_(
-                    models.Student.full_name.ilike(search),
-                    models.Student.student_code.ilike(search),
-                    models.Student.email.ilike(search)
-                )
+        # Mặc định: khi tìm kiếm thì xếp theo mức độ liên quan, ngược lại theo id
+        if sort_by is None:
+            sort_by = "relevance" if filters.search and not cursor else "id"
+        if (sort_by not in SORTABLE_COLUMNS and sort_by != "relevance") or sort_order not in ("asc", "desc"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Tham số sắp xếp không hợp lệ"
             )
+        if total_mode not in TOTAL_MODES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Tham số total_mode không hợp lệ"
+            )
+        if sort_by == "relevance" and cursor:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Không hỗ trợ cursor khi sắp xếp theo mức độ liên quan"
+            )
+        if view not in LIST_VIEWS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Tham số view không hợp lệ"
+            )
+        # fields= ưu tiên hơn view; None nghĩa là trả về đầy đủ thông tin sinh viên
+        selected = parse_fields(fields, LIST_FIELDS) if fields else LIST_VIEWS[view]
         
-        if class_id:
-            query = query.filter(models.Student.class_id == class_id)
-        
-        if gender:
-            query = query.filter(models.Student.gender == gender)
-        
-        if academic_status:
-            query = query.filter(models.Student.academic_status == academic_status)
+        # Xây dựng query với các điều kiện lọc
+        query, rank = apply_student_filters(select(models.Student), filters, db.get_bind().dialect.name)
         
-        if study_status:
-            query = query.filter(models.Student.study_status == study_status)
+        # Lấy tổng số học sinh sau khi áp dụng bộ lọc (có cache; có thể ước lượng hoặc bỏ qua)
+        total = await count_students(db, query, filters, total_mode)
+        if selected is None:
+            query = query.options(noload(models.Student.class_info))
+        else:
+            # Chỉ SELECT các cột được yêu cầu, kèm id, cột sắp xếp (tạo cursor) và các cột
+            # dùng cho ETag; các cột thêm vào không xuất hiện trong response
+            output = ["id"] + [name for name in selected if name != "id"]
+            columns = list(output)
+            for name in (sort_by, "class_id", "created_at", "updated_at"):
+                if name in LIST_FIELDS and name not in columns:
+                    columns.append(name)
+            query = query.with_only_columns(*[list_column(name) for name in columns])
+            if "class_name" in columns:
+                query = query.outerjoin(models.Class, models.Class.id == models.Student.class_id)
         
-        if min_gpa is not None:
-            query = query.filter(models.Student.gpa >= min_gpa)
+        if sort_by == "relevance":
+            query = query.order_by(*([rank] if rank is not None else []), models.Student.id)
+        else:
+            query = apply_student_sort(query, sort_by, sort_order)
+        if cursor:
+            # Chế độ keyset: bắt đầu ngay sau bản ghi cuối của trang trước, không dùng OFFSET
+            try:
+                cursor_sort_by, cursor_sort_order, key, last_id = decode_cursor(cursor)
+            except InvalidCursorError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Cursor không hợp lệ"
+                )
+            if (cursor_sort_by, cursor_sort_order) != (sort_by, sort_order):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Cursor không khớp với tham số sắp xếp"
+                )
+            column, unique = SORTABLE_COLUMNS[sort_by]
+            query = apply_keyset(query, column, models.Student.id, sort_order, key, last_id, unique)
+        else:
+            # Tính toán skip
+            query = query.offset((page - 1) * page_size)
         
-        if max_gpa is not None:
-            query = query.filter(models.Student.gpa <= max_gpa)
+        # Lấy thêm một bản ghi để biết còn trang tiếp theo hay không
+        if selected is None:
+            students = (await db.scalars(query.limit(page_size + 1))).all()
+        else:
+            students = (await db.execute(query.limit(page_size + 1))).all()
+        next_cursor = None
+        if len(students) > page_size:
+            students = students[:page_size]
+            if sort_by != "relevance":
+                last = students[-1]
+                key = getattr(last, SORTABLE_COLUMNS[sort_by][0].key)
+                next_cursor = encode_cursor(sort_by, sort_order, key, last.id)
         
-        # Lấy tổng số học sinh sau khi áp dụng bộ lọc
-        total = query.count()
+        # ETag của trang tính từ các bản ghi đã lấy, trước khi serialize
+        classes = await class_cache.get_all(db)
+        etag = weak_etag(total, next_cursor, [student_version(student, classes) for student in students])
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
         
-        # Lấy danh sách học sinh theo trang
-        students = query.offset(skip).limit(page_size).all()
+        if selected is not None:
+            # Dựng JSON trực tiếp từ các dòng bằng orjson, không tạo ORM object hay model pydantic
+            return ORJSONResponse({
+                "total": total,
+                "page": page,
+                "page_size": page_size,
+                "items": [dict(zip(output, row)) for row in students],
+                "next_cursor": next_cursor
+            }, headers={"ETag": etag})
         
-        return {
-            "total": total,
-            "page": page,
-            "page_size": page_size,
-            "items": [schemas.Student.from_orm(student) for student in students]
-        }
+        # Trang và từng sinh viên đều dựng bằng model_construct rồi serialize một lượt
+        return model_response(schemas.PaginatedStudentResponse.model_construct(
+            total=total,
+            page=page,
+            page_size=page_size,
+            items=[student_response(student, classes) for student in students],
+            next_cursor=next_cursor
+        ), headers={"ETag": etag})
     except HTTPException as he:
         raise he
     except Exception as e:
@@ -187,27 +618,172 @@ def read_students(
             detail="Đã xảy ra lỗi khi lấy danh sách sinh viên"
         )
 
+# Các cột được phép export (không gồm search_key nội bộ)
+EXPORT_FIELDS = ["id"] + list(schemas.StudentBase.model_fields) + ["created_at", "updated_at"]
+EXPORT_FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+def parse_fields(fields: Optional[str], allowed: List[str]) -> List[str]:
+    if not fields:
+        return list(allowed)
+    selected = []
+    for name in fields.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in allowed:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Trường không hợp lệ: {name}"
+            )
+        if name not in selected:
+            selected.append(name)
+    return selected
+
+def export_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+@router.get("/export")
+async def export_students(
+    format: str = "csv",
+    fields: Optional[str] = None,
+    filters: schemas.StudentFilter = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+    
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Định dạng export không được hỗ trợ"
+        )
+    selected = parse_fields(fields, EXPORT_FIELDS)
+    
+    # Chỉ chọn các cột cần thiết, duyệt theo id qua server-side cursor (yield_per)
+    query = select(*[getattr(models.Student, name) for name in selected])
+    query, _ = apply_student_filters(query, filters, db.get_bind().dialect.name)
+    query = query.order_by(models.Student.id).execution_options(yield_per=settings.STUDENT_EXPORT_BATCH_SIZE)
+    
+    async def generate():
+        # Session của dependency đã đóng khi response bắt đầu stream; generator mở lại
+        # kết nối khi chạy query và tự đóng khi kết thúc
+        try:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if format == "csv":
+                writer.writerow(selected)
+            pending = 0
+            result = await db.stream(query)
+            async for row in result:
+                values = [export_value(value) for value in row]
+                if format == "csv":
+                    writer.writerow(values)
+                else:
+                    buffer.write(json.dumps(dict(zip(selected, values)), ensure_ascii=False))
+                    buffer.write("\n")
+                pending += 1
+                if pending >= settings.STUDENT_EXPORT_BATCH_SIZE:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate(0)
+                    pending = 0
+            yield buffer.getvalue()
+        except Exception as e:
+            error_message = str(e)
+            error_traceback = traceback.format_exc()
+            logger.error(f"Unexpected error when exporting students: {error_message}\n{error_traceback}")
+            raise
+        finally:
+            await db.close()
+    
+    filename = f"students.{format}"
+    return StreamingResponse(
+        generate(),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.post("/batch", response_model=schemas.StudentBatchResponse)
+async def read_students_batch(
+    batch: schemas.StudentBatchRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    if (batch.ids is None) == (batch.student_codes is None):
+        raise HTTPException(status_code=400, detail="Cần truyền đúng một trong hai trường ids hoặc student_codes")
+    if batch.ids is not None:
+        column, keys = models.Student.id, batch.ids
+    else:
+        column, keys = models.Student.student_code, batch.student_codes
+    # Bỏ khóa trùng nhưng giữ nguyên thứ tự yêu cầu
+    keys = list(dict.fromkeys(keys))
+    if len(keys) > settings.STUDENT_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tối đa {settings.STUDENT_BATCH_MAX_SIZE} sinh viên mỗi yêu cầu"
+        )
+
+    try:
+        if current_user.role == models.UserRole.STUDENT:
+            # Giống read_student: sinh viên chỉ được xem hồ sơ của chính mình
+            own = await db.scalar(student_query().where(models.Student.email == current_user.username))
+            if not own or any(key != getattr(own, column.key) for key in keys):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Không có quyền truy cập"
+                )
+            found = {getattr(own, column.key): own} if keys else {}
+        elif keys:
+            # Một truy vấn IN (...) cho cả lô; class_info lấy từ class_cache
+            result = await db.scalars(student_query().where(column.in_(keys)))
+            found = {getattr(student, column.key): student for student in result}
+        else:
+            found = {}
+
+        classes = await class_cache.get_all(db)
+        return model_response(schemas.StudentBatchResponse.model_construct(
+            items=[student_response(found[key], classes) for key in keys if key in found],
+            missing=[key for key in keys if key not in found]
+        ))
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        error_message = str(e)
+        error_traceback = traceback.format_exc()
+        logger.error(f"Unexpected error when reading student batch: {error_message}\n{error_traceback}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Đã xảy ra lỗi khi lấy thông tin sinh viên"
+        )
+
 @router.get("/{student_id}", response_model=schemas.Student)
-def read_student(
+async def read_student(
     student_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
 ):
     try:
         # Allow students to view their own profile
         if current_user.role == models.UserRole.STUDENT:
-            student = db.query(models.Student).filter(models.Student.email == current_user.username).first()
-            if student and student.id == student_id:
-                return schemas.Student.from_orm(student)
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Không có quyền truy cập"
-            )
+            db_student = await db.scalar(student_query().where(models.Student.email == current_user.username))
+            if not db_student or db_student.id != student_id:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Không có quyền truy cập"
+                )
+        else:
+            db_student = await db.scalar(student_query().where(models.Student.id == student_id))
+            if db_student is None:
+                raise HTTPException(status_code=404, detail="Không tìm thấy sinh viên")
         
-        db_student = db.query(models.Student).filter(models.Student.id == student_id).first()
-        if db_student is None:
-            raise HTTPException(status_code=404, detail="Không tìm thấy sinh viên")
-        return schemas.Student.from_orm(db_student)
+        classes = await class_cache.get_all(db)
+        etag = student_etag(db_student, classes)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return model_response(student_response(db_student, classes), headers={"ETag": etag})
     except HTTPException as he:
         raise he
     except Exception as e:
@@ -219,40 +795,174 @@ def read_student(
             detail="Đã xảy ra lỗi khi lấy thông tin sinh viên"
         )
 
+@router.get("/{student_id}/recommendations", response_model=List[schemas.Recommendation])
+async def read_student_recommendations(
+    student_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    try:
+        # Giống read_student: sinh viên chỉ được xem gợi ý của chính mình
+        if current_user.role == models.UserRole.STUDENT:
+            own_id = await db.scalar(select(models.Student.id).where(models.Student.email == current_user.username))
+            if own_id != student_id:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Không có quyền truy cập"
+                )
+        
+        recommendations = recommendation_cache.get(student_id)
+        if recommendations is None:
+            generation = recommendation_cache.generation
+            rows = (await db.scalars(
+                select(models.StudentRecommendation)
+                .where(models.StudentRecommendation.student_id == student_id)
+                .order_by(models.StudentRecommendation.rank)
+            )).all()
+            if not rows and await db.scalar(select(models.Student.id).where(models.Student.id == student_id)) is None:
+                raise HTTPException(status_code=404, detail="Không tìm thấy sinh viên")
+            recommendations = [
+                schemas.Recommendation(
+                    code=row.item_code,
+                    name=CATALOG_ITEMS[row.item_code][0],
+                    kind=CATALOG_ITEMS[row.item_code][1],
+                    score=round(row.score, 4)
+                )
+                for row in rows
+                if row.item_code in CATALOG_ITEMS
+            ]
+            recommendation_cache.set(student_id, recommendations, generation=generation)
+        return adapter_response(recommendation_list_adapter, recommendations)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        error_message = str(e)
+        error_traceback = traceback.format_exc()
+        logger.error(f"Unexpected error when reading recommendations: {error_message}\n{error_traceback}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Đã xảy ra lỗi khi lấy gợi ý cho sinh viên"
+        )
+
+@router.get("/{student_id}/peers", response_model=List[schemas.Peer])
+async def read_student_peers(
+    student_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    try:
+        # Giống read_student: sinh viên chỉ được xem bạn cùng sở thích của chính mình
+        if current_user.role == models.UserRole.STUDENT:
+            own_id = await db.scalar(select(models.Student.id).where(models.Student.email == current_user.username))
+            if own_id != student_id:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Không có quyền truy cập"
+                )
+        
+        student_activities, members = await activity_index.get(db)
+        if student_id not in student_activities and await db.scalar(
+            select(models.Student.id).where(models.Student.id == student_id)
+        ) is None:
+            raise HTTPException(status_code=404, detail="Không tìm thấy sinh viên")
+        # Tra chỉ mục ngược trong bộ nhớ, chỉ đọc DB cho các sinh viên và hoạt động được trả về
+        peers = find_peers(student_activities, members, student_id, limit)
+        if not peers:
+            return []
+        students = {
+            row.id: row for row in await db.execute(
+                select(models.Student.id, models.Student.student_code, models.Student.full_name, models.Student.class_id)
+                .where(models.Student.id.in_([peer_id for peer_id, _ in peers]))
+            )
+        }
+        names = dict((await db.execute(
+            select(models.Activity.id, models.Activity.name)
+            .where(models.Activity.id.in_(student_activities[student_id]))
+        )).all())
+        return [
+            schemas.Peer(
+                student_id=peer_id,
+                student_code=students[peer_id].student_code,
+                full_name=students[peer_id].full_name,
+                class_id=students[peer_id].class_id,
+                shared_activities=[names[activity_id] for activity_id in shared if activity_id in names],
+            )
+            for peer_id, shared in peers
+            if peer_id in students
+        ]
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        error_message = str(e)
+        error_traceback = traceback.format_exc()
+        logger.error(f"Unexpected error when reading peers: {error_message}\n{error_traceback}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Đã xảy ra lỗi khi tìm bạn cùng sở thích"
+        )
+
 @router.put("/{student_id}", response_model=schemas.Student)
-def update_student(
+async def update_student(
     student_id: int,
     student: schemas.StudentUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user),
+    if_match: Optional[str] = Header(None)
 ):
     try:
         check_admin_access(current_user)
         
-        db_student = db.query(models.Student).filter(models.Student.id == student_id).first()
+        # Khóa dòng tới khi commit để không ai sửa chen giữa lúc đọc (kiểm tra If-Match,
+        # tính phần chênh lệch thống kê) và lúc ghi
+        query = student_query().where(models.Student.id == student_id).with_for_update()
+        db_student = await db.scalar(query)
         if db_student is None:
             raise HTTPException(status_code=404, detail="Không tìm thấy sinh viên")
+        if if_match and not etag_matches(if_match, student_etag(db_student, await class_cache.get_all(db))):
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="Thông tin sinh viên đã bị thay đổi bởi một yêu cầu khác"
+            )
         
         # Check if class exists if class_id is provided
         student_data = student.dict(exclude_unset=True)
         if "class_id" in student_data:
-            db_class = db.query(models.Class).filter(models.Class.id == student_data["class_id"]).first()
+            db_class = await class_cache.get(db, student_data["class_id"])
             if not db_class:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Không tìm thấy lớp học với ID {student_data['class_id']}"
                 )
         
+        old_stats = stat_values(db_student)
+        old_admission = admission_values(db_student)
         for key, value in student_data.items():
             setattr(db_student, key, value)
+        await apply_student_stats(db, added=[stat_values(db_student)], removed=[old_stats])
+        await apply_admission_cube(db, added=[admission_values(db_student)], removed=[old_admission])
+        await db.flush()
+        if student_data.keys() & set(RISK_SOURCE_FIELDS):
+            await rescore_students(db, models.Student.id == student_id)
+        if student_data.keys() & set(RECOMMENDATION_SOURCE_FIELDS):
+            await recompute_recommendations(db, models.Student.id == student_id)
+        activity_links = {}
+        if student_data.keys() & set(ACTIVITY_SOURCE_FIELDS):
+            activity_links = await sync_student_activities(db, models.Student.id == student_id)
         
-        db.commit()
-        db.refresh(db_student)
-        return schemas.Student.from_orm(db_student)
+        await db.commit()
+        student_count_cache.clear()
+        recommendation_cache.pop(student_id)
+        activity_index.update(activity_links)
+        db_student = await load_student(db, student_id)
+        classes = await class_cache.get_all(db)
+        return model_response(
+            student_response(db_student, classes), headers={"ETag": student_etag(db_student, classes)}
+        )
     except HTTPException as he:
         raise he
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         error_message = str(e)
         logger.error(f"IntegrityError when updating student: {error_message}")
         if "students_email_key" in error_message:
@@ -276,7 +986,7 @@ def update_student(
                 detail="Thông tin sinh viên không hợp lệ"
             )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         error_message = str(e)
         error_traceback = traceback.format_exc()
         logger.error(f"Unexpected error when updating student: {error_message}\n{error_traceback}")
@@ -286,30 +996,44 @@ def update_student(
         )
 
 @router.delete("/{student_id}")
-def delete_student(
+async def delete_student(
     student_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
 ):
     try:
         check_admin_access(current_user)
         
-        db_student = db.query(models.Student).filter(models.Student.id == student_id).first()
+        db_student = await db.scalar(
+            select(models.Student).where(models.Student.id == student_id).with_for_update()
+        )
         if db_student is None:
             raise HTTPException(status_code=404, detail="Không tìm thấy sinh viên")
         
         # Delete associated user account
-        db_user = db.query(models.User).filter(models.User.username == db_student.email).first()
+        db_user = await db.scalar(select(models.User).where(models.User.username == db_student.email))
         if db_user:
-            db.delete(db_user)
+            await db.delete(db_user)
         
-        db.delete(db_student)
-        db.commit()
+        await db.execute(delete(models.StudentRiskScore).where(models.StudentRiskScore.student_id == student_id))
+        await db.execute(
+            delete(models.StudentRecommendation).where(models.StudentRecommendation.student_id == student_id)
+        )
+        await db.execute(delete(models.StudentActivity).where(models.StudentActivity.student_id == student_id))
+        await db.execute(delete(models.StudentPeerGroup).where(models.StudentPeerGroup.student_id == student_id))
+        await db.delete(db_student)
+        await apply_student_stats(db, removed=[stat_values(db_student)])
+        await apply_admission_cube(db, removed=[admission_values(db_student)])
+        await db.commit()
+        student_count_cache.clear()
+        recommendation_cache.pop(student_id)
+        activity_index.update({student_id: set()})
+        invalidate_principal(db_student.email)
         return {"message": "Xóa sinh viên thành công"}
     except HTTPException as he:
         raise he
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         error_message = str(e)
         error_traceback = traceback.format_exc()
         logger.error(f"Unexpected error when deleting student: {error_message}\n{error_traceback}")
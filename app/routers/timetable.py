@@ -0,0 +1,235 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from pydantic import TypeAdapter
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.exc import IntegrityError
+from typing import List
+from ..core.database import get_async_db
+from ..core.feedback import remove_section_feedback
+from ..core.responses import adapter_response, model_response
+from ..core.timetable import run_schedule_job
+from ..models import models
+from ..schemas import schemas
+from .auth import get_current_user
+from .feedback import section_cache
+from .students import check_admin_access
+
+router = APIRouter()
+
+room_list_adapter = TypeAdapter(List[schemas.Room])
+slot_list_adapter = TypeAdapter(List[schemas.TimeSlot])
+section_list_adapter = TypeAdapter(List[schemas.CourseSection])
+session_list_adapter = TypeAdapter(List[schemas.SectionSession])
+
+def construct(schema, obj):
+    # Đọc từ DB nên dựng bằng model_construct (không validate lại) như student_response
+    return schema.model_construct(**{name: getattr(obj, name) for name in schema.model_fields})
+
+async def enqueue_schedule_job(db: AsyncSession, background_tasks: BackgroundTasks, section_id=None) -> models.ScheduleJob:
+    job = models.ScheduleJob(section_id=section_id, status=models.ScheduleJobStatus.PENDING)
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    # Session của request đã đóng khi background task chạy: job tự mở session trên cùng engine
+    session_factory = async_sessionmaker(db.bind, autoflush=False, expire_on_commit=False)
+    background_tasks.add_task(run_schedule_job, session_factory, job.id)
+    return job
+
+# Rooms
+@router.post("/rooms", response_model=schemas.Room)
+async def create_room(
+    room: schemas.RoomCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+
+    try:
+        db_room = models.Room(**room.dict())
+        db.add(db_room)
+        await db.commit()
+        await db.refresh(db_room)
+        return model_response(schemas.Room.from_orm(db_room))
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A room with this name already exists"
+        )
+
+@router.get("/rooms", response_model=List[schemas.Room])
+async def read_rooms(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    rooms = await db.scalars(select(models.Room).order_by(models.Room.id))
+    return adapter_response(room_list_adapter, [construct(schemas.Room, room) for room in rooms])
+
+# Time slots
+@router.post("/slots", response_model=schemas.TimeSlot)
+async def create_slot(
+    slot: schemas.TimeSlotCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+
+    try:
+        db_slot = models.TimeSlot(**slot.dict())
+        db.add(db_slot)
+        await db.commit()
+        await db.refresh(db_slot)
+        return model_response(schemas.TimeSlot.from_orm(db_slot))
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This time slot already exists"
+        )
+
+@router.get("/slots", response_model=List[schemas.TimeSlot])
+async def read_slots(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    slots = await db.scalars(
+        select(models.TimeSlot).order_by(models.TimeSlot.day_of_week, models.TimeSlot.period)
+    )
+    return adapter_response(slot_list_adapter, [construct(schemas.TimeSlot, slot) for slot in slots])
+
+# Course sections
+@router.post("/sections", response_model=schemas.CourseSection)
+async def create_section(
+    section: schemas.CourseSectionCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+
+    try:
+        db_section = models.CourseSection(**section.dict())
+        db.add(db_section)
+        await db.commit()
+        await db.refresh(db_section)
+        return model_response(schemas.CourseSection.from_orm(db_section))
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A section with this code already exists or the class does not exist"
+        )
+
+@router.get("/sections", response_model=List[schemas.CourseSection])
+async def read_sections(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    sections = await db.scalars(select(models.CourseSection).order_by(models.CourseSection.id))
+    return adapter_response(section_list_adapter, [construct(schemas.CourseSection, section) for section in sections])
+
+@router.put("/sections/{section_id}", response_model=schemas.CourseSection)
+async def update_section(
+    section_id: int,
+    section: schemas.CourseSectionUpdate,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+
+    db_section = await db.scalar(select(models.CourseSection).where(models.CourseSection.id == section_id))
+    if db_section is None:
+        raise HTTPException(status_code=404, detail="Section not found")
+
+    for key, value in section.dict(exclude_unset=True).items():
+        setattr(db_section, key, value)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Class does not exist"
+        )
+    section_cache.pop(section_id)
+    await db.refresh(db_section)
+    result = schemas.CourseSection.from_orm(db_section)
+    # Chỉ xếp lại lớp học phần vừa sửa, giữ nguyên lịch của các lớp khác
+    await enqueue_schedule_job(db, background_tasks, section_id=section_id)
+    return model_response(result)
+
+@router.delete("/sections/{section_id}")
+async def delete_section(
+    section_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+
+    db_section = await db.scalar(select(models.CourseSection).where(models.CourseSection.id == section_id))
+    if db_section is None:
+        raise HTTPException(status_code=404, detail="Section not found")
+
+    await db.execute(delete(models.SectionAssignment).where(models.SectionAssignment.section_id == section_id))
+    await remove_section_feedback(db, section_id)
+    await db.delete(db_section)
+    await db.commit()
+    section_cache.pop(section_id)
+    return {"message": "Section deleted successfully"}
+
+# Scheduling jobs
+@router.post("/jobs", response_model=schemas.ScheduleJob, status_code=status.HTTP_202_ACCEPTED)
+async def create_schedule_job(
+    job: schemas.ScheduleJobCreate,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+
+    if job.section_id is not None:
+        exists = await db.scalar(select(models.CourseSection.id).where(models.CourseSection.id == job.section_id))
+        if exists is None:
+            raise HTTPException(status_code=404, detail="Section not found")
+    db_job = await enqueue_schedule_job(db, background_tasks, section_id=job.section_id)
+    return model_response(schemas.ScheduleJob.from_orm(db_job), status_code=status.HTTP_202_ACCEPTED)
+
+@router.get("/jobs/{job_id}", response_model=schemas.ScheduleJob)
+async def read_schedule_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    check_admin_access(current_user)
+
+    job = await db.scalar(select(models.ScheduleJob).where(models.ScheduleJob.id == job_id))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return model_response(schemas.ScheduleJob.from_orm(job))
+
+# Timetable of a class
+@router.get("/classes/{class_id}", response_model=List[schemas.SectionSession])
+async def read_class_timetable(
+    class_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    rows = await db.execute(
+        select(
+            models.CourseSection.id.label("section_id"),
+            models.CourseSection.code.label("section_code"),
+            models.CourseSection.name.label("section_name"),
+            models.CourseSection.lecturer,
+            models.SectionAssignment.session,
+            models.TimeSlot.day_of_week,
+            models.TimeSlot.period,
+            models.Room.id.label("room_id"),
+            models.Room.name.label("room_name"),
+        )
+        .join(models.SectionAssignment, models.SectionAssignment.section_id == models.CourseSection.id)
+        .join(models.TimeSlot, models.TimeSlot.id == models.SectionAssignment.slot_id)
+        .join(models.Room, models.Room.id == models.SectionAssignment.room_id)
+        .where(models.CourseSection.class_id == class_id)
+        .order_by(models.TimeSlot.day_of_week, models.TimeSlot.period)
+    )
+    return adapter_response(session_list_adapter, [schemas.SectionSession.model_construct(**row._mapping) for row in rows])
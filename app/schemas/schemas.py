@@ -1,7 +1,7 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field
+from typing import Optional, List, Union
 from datetime import datetime
-from ..models.models import UserRole
+from ..models.models import ScheduleJobStatus, UserRole
 
 # User schemas
 class UserBase(BaseModel):
@@ -20,6 +20,15 @@ class User(UserBase):
     class Config:
         from_attributes = True
 
+class Principal(BaseModel):
+    id: int
+    username: str
+    role: UserRole
+    is_active: bool
+
+    class Config:
+        from_attributes = True
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -143,15 +152,44 @@ class Student(StudentBase):
     class Config:
         from_attributes = True
 
+# Dạng rút gọn cho lưới danh sách (view=compact)
+class StudentListItem(BaseModel):
+    id: int
+    student_code: str
+    full_name: str
+    class_id: int
+    class_name: Optional[str] = None
+    gpa: Optional[float] = None
+
 class PaginatedStudentResponse(BaseModel):
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
     items: List[Student]
+    next_cursor: Optional[str] = None
     
     class Config:
         from_attributes = True
 
+class StudentBatchRequest(BaseModel):
+    ids: Optional[List[int]] = None
+    student_codes: Optional[List[str]] = None
+
+class StudentBatchResponse(BaseModel):
+    items: List[Student]
+    missing: List[Union[int, str]]
+
+class StudentImportError(BaseModel):
+    row: int
+    student_code: Optional[str] = None
+    detail: str
+
+class StudentImportResult(BaseModel):
+    total: int
+    created: int
+    failed: int
+    errors: List[StudentImportError]
+
 class StudentFilter(BaseModel):
     search: Optional[str] = None
     class_id: Optional[int] = None
@@ -159,4 +197,168 @@ class StudentFilter(BaseModel):
     academic_status: Optional[str] = None
     study_status: Optional[str] = None
     min_gpa: Optional[float] = None
-    max_gpa: Optional[float] = None 
\ No newline at end of file
+    max_gpa: Optional[float] = None 
+# Thống kê sinh viên (student_stats)
+class StatBucket(BaseModel):
+    value: Optional[str] = None
+    student_count: int
+    average_gpa: Optional[float] = None
+    credits_sum: int
+
+class StudentStats(BaseModel):
+    class_id: Optional[int] = None
+    class_name: Optional[str] = None
+    student_count: int
+    average_gpa: Optional[float] = None
+    credits_sum: int
+    academic_status: List[StatBucket] = []
+    study_status: List[StatBucket] = []
+    gender: List[StatBucket] = []
+    gpa: List[StatBucket] = []
+
+# Phân tích tuyển sinh (admission_cube)
+class AdmissionCell(BaseModel):
+    cohort: Optional[int] = None
+    high_school: Optional[str] = None
+    hometown: Optional[str] = None
+    score_band: Optional[str] = None
+    student_count: int
+    average_gpa: Optional[float] = None
+    dropout_rate: float
+
+class AdmissionModel(BaseModel):
+    sample_size: int
+    intercept: Optional[float] = None
+    slope: Optional[float] = None
+    r_squared: Optional[float] = None
+    entrance_score: Optional[float] = None
+    predicted_gpa: Optional[float] = None
+
+# Hoạt động ngoại khóa/kỹ năng và nhóm cùng sở thích
+class Activity(BaseModel):
+    id: int
+    name: str
+    student_count: int
+
+class PeerGroupMember(BaseModel):
+    student_id: int
+    student_code: str
+    full_name: str
+    class_id: Optional[int] = None
+
+class Peer(PeerGroupMember):
+    shared_activities: List[str]
+
+class PeerGroup(BaseModel):
+    group_id: int
+    name: str  # Tên hoạt động đại diện cho nhóm
+    size: int
+    activities: List[str]  # Các hoạt động phổ biến nhất trong nhóm
+
+class PeerGroupDetail(PeerGroup):
+    students: List[PeerGroupMember]
+
+# Gợi ý ngành/môn học
+class Recommendation(BaseModel):
+    code: str
+    name: str
+    kind: str  # major / course
+    score: float
+
+# Điểm rủi ro bỏ học
+class StudentRiskScore(BaseModel):
+    student_id: int
+    student_code: str
+    full_name: str
+    class_id: Optional[int] = None
+    score: float
+    computed_at: datetime
+
+# Thời khóa biểu
+class RoomCreate(BaseModel):
+    name: str
+    capacity: int
+
+class Room(RoomCreate):
+    id: int
+
+    class Config:
+        from_attributes = True
+
+class TimeSlotCreate(BaseModel):
+    day_of_week: int
+    period: int
+
+class TimeSlot(TimeSlotCreate):
+    id: int
+
+    class Config:
+        from_attributes = True
+
+class CourseSectionBase(BaseModel):
+    code: str
+    name: str
+    class_id: Optional[int] = None
+    lecturer: Optional[str] = None
+    size: int
+    sessions_per_week: int = 1
+
+class CourseSectionCreate(CourseSectionBase):
+    pass
+
+class CourseSectionUpdate(BaseModel):
+    name: Optional[str] = None
+    class_id: Optional[int] = None
+    lecturer: Optional[str] = None
+    size: Optional[int] = None
+    sessions_per_week: Optional[int] = None
+
+class CourseSection(CourseSectionBase):
+    id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class SectionSession(BaseModel):
+    section_id: int
+    section_code: str
+    section_name: str
+    lecturer: Optional[str] = None
+    session: int
+    day_of_week: int
+    period: int
+    room_id: int
+    room_name: str
+
+# Đánh giá giảng dạy
+class FeedbackCreate(BaseModel):
+    section_id: int
+    rating: int = Field(..., ge=1, le=5)
+    comment: Optional[str] = Field(None, max_length=2000)
+
+class FeedbackSummary(BaseModel):
+    section_id: Optional[int] = None
+    section_code: Optional[str] = None
+    section_name: Optional[str] = None
+    lecturer: Optional[str] = None
+    response_count: int
+    average_rating: Optional[float] = None
+    histogram: List[int]  # Số đánh giá 1..5 sao
+
+class ScheduleJobCreate(BaseModel):
+    section_id: Optional[int] = None
+
+class ScheduleJob(BaseModel):
+    id: int
+    section_id: Optional[int] = None
+    status: ScheduleJobStatus
+    assigned: Optional[int] = None
+    unassigned: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,97 @@
+# Đo chỉ mục hoạt động ngoại khóa:
+#   backfill - rebuild_activities: chuẩn hóa chuỗi tự do của toàn bộ sinh viên
+#   index    - nạp chỉ mục ngược và tra bạn cùng sở thích (find_peers) trong bộ nhớ
+#   groups   - lan truyền nhãn trên đồ thị sinh viên - hoạt động
+#
+#   python -m benchmarks.bench_activities --rows 100000 --lookups 2000
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import Counter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.core.activities import ActivityIndex, find_peers, label_propagation, rebuild_activities
+from app.models import models
+
+# Các nhóm sở thích: sinh viên chọn phần lớn hoạt động trong một nhóm, thỉnh thoảng một hoạt động bất kỳ
+INTERESTS = [
+    ["Bóng đá", "Bóng rổ", "Cầu lông", "Chạy bộ", "Bơi lội"],
+    ["CLB Tiếng Anh", "IELTS", "Hùng biện", "Dịch thuật"],
+    ["Lập trình", "Thuật toán", "Robot", "Arduino", "Olympic Tin"],
+    ["Vẽ", "Nhiếp ảnh", "Thiết kế", "Guitar", "Hát"],
+    ["Tình nguyện", "Hiến máu", "Mùa hè xanh", "Công tác xã hội"],
+    ["Khởi nghiệp", "Đầu tư", "Kinh doanh", "Thuyết trình"],
+]
+ALL_ACTIVITIES = [activity for group in INTERESTS for activity in group]
+
+
+def seed(engine, rows: int, batch_size: int = 50000):
+    models.Base.metadata.create_all(bind=engine)
+    rng = random.Random(0)
+
+    def activities():
+        chosen = rng.sample(rng.choice(INTERESTS), rng.randint(1, 3))
+        if rng.random() < 0.2:
+            chosen.append(rng.choice(ALL_ACTIVITIES).lower())
+        return chosen
+
+    with engine.begin() as conn:
+        for start in range(0, rows, batch_size):
+            conn.execute(insert(models.Student), [
+                {
+                    "student_code": f"SV{i:08d}",
+                    "email": f"sv{i}@example.com",
+                    "id_card": f"{i:012d}",
+                    "extracurricular_activities": ", ".join(activities()),
+                    "special_skills": "; ".join(activities()[:1]),
+                }
+                for i in range(start, min(start + batch_size, rows))
+            ])
+
+
+async def load_index(url: str):
+    engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"))
+    async with async_sessionmaker(engine)() as db:
+        started = time.perf_counter()
+        student_activities, members = await ActivityIndex().get(db)
+        elapsed = time.perf_counter() - started
+    await engine.dispose()
+    return elapsed, student_activities, members
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the activity index and peer groups")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    engine = create_engine(url)
+    seed(engine, args.rows)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        links = rebuild_activities(conn)
+    print(f"backfill  {time.perf_counter() - started:>8.2f} s   ({links} links)")
+    engine.dispose()
+
+    elapsed, student_activities, members = asyncio.run(load_index(url))
+    print(f"index     {elapsed:>8.2f} s   ({len(members)} activities)")
+    latencies = []
+    for student_id in random.Random(1).sample(sorted(student_activities), args.lookups):
+        started = time.perf_counter()
+        find_peers(student_activities, members, student_id, 10)
+        latencies.append(time.perf_counter() - started)
+    print(f"peers     p50 {statistics.median(latencies) * 1000:>6.2f} ms   max {max(latencies) * 1000:>6.2f} ms")
+
+    started = time.perf_counter()
+    labels = label_propagation(student_activities)
+    sizes = sorted(Counter(labels.values()).values(), reverse=True)
+    print(f"groups    {time.perf_counter() - started:>8.2f} s   ({len(sizes)} groups, largest {sizes[:8]})")
+
+
+if __name__ == "__main__":
+    main()
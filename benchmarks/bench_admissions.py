@@ -0,0 +1,79 @@
+# Đo phân tích tuyển sinh:
+#   rebuild - rebuild_admission_cube: tính lại toàn bộ khối từ bảng students
+#   query   - gộp nhóm theo trường THPT/khóa trên admission_cube so với quét thẳng bảng students
+#
+#   python -m benchmarks.bench_admissions --rows 200000
+import argparse
+import os
+import random
+import tempfile
+import time
+from sqlalchemy import create_engine, func, insert, select
+from app.core.admissions import rebuild_admission_cube
+from app.models import models
+
+# Mỗi trường THPT thuộc một tỉnh, như dữ liệu thật: quê quán đi theo trường
+SCHOOLS = [(f"THPT {i:03d}", f"Tỉnh {i % 63:02d}") for i in range(300)]
+STATUSES = ["Đang học"] * 8 + ["Bảo lưu", "Thôi học"]
+
+
+def seed(engine, rows: int, batch_size: int = 50000):
+    models.Base.metadata.create_all(bind=engine)
+    rng = random.Random(0)
+    with engine.begin() as conn:
+        schools = [rng.choice(SCHOOLS) for _ in range(rows)]
+        for start in range(0, rows, batch_size):
+            conn.execute(insert(models.Student), [
+                {
+                    "student_code": f"SV{i:08d}",
+                    "email": f"sv{i}@example.com",
+                    "id_card": f"{i:012d}",
+                    "graduation_year": rng.randint(2015, 2024),
+                    "high_school": schools[i][0],
+                    "hometown": schools[i][1],
+                    "university_entrance_score": round(rng.uniform(15, 30), 2),
+                    "gpa": round(rng.uniform(1, 4), 2),
+                    "study_status": rng.choice(STATUSES),
+                }
+                for i in range(start, min(start + batch_size, rows))
+            ])
+
+
+def timed(conn, query, repeat: int = 5) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        conn.execute(query).all()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark admissions analytics")
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+    seed(engine, args.rows)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        cells = rebuild_admission_cube(conn)
+    print(f"rebuild  {time.perf_counter() - started:>8.2f} s   ({cells} cells for {args.rows} students)")
+
+    cube = models.AdmissionCube
+    student = models.Student
+    with engine.connect() as conn:
+        for name, cube_keys, student_keys in (
+            ("high_school", [cube.high_school], [student.high_school]),
+            ("cohort", [cube.cohort], [student.graduation_year]),
+        ):
+            from_cube = timed(conn, select(
+                *cube_keys, func.sum(cube.student_count), func.sum(cube.gpa_sum), func.sum(cube.gpa_count)
+            ).group_by(*cube_keys))
+            from_students = timed(conn, select(
+                *student_keys, func.count(), func.sum(student.gpa), func.count(student.gpa)
+            ).group_by(*student_keys))
+            print(f"group by {name:<12} cube {from_cube * 1000:>8.1f} ms   students {from_students * 1000:>8.1f} ms")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# Đo ghi đánh giá giảng dạy lúc cao điểm cuối kỳ:
+#   single   - mỗi đánh giá một transaction (chèn + cộng tổng hợp), như ghi thẳng trong request
+#   buffered - FeedbackBuffer: gom rồi ghi theo lô batch_size
+#   report   - đọc tổng hợp theo giảng viên từ feedback_aggregates so với quét teaching_feedback
+#
+#   python -m benchmarks.bench_feedback --submissions 20000 --batch-size 500
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.core.feedback import LECTURER_SCOPE, FeedbackBuffer, PendingFeedback, write_batch
+from app.models import models
+
+SECTIONS = 400
+LECTURERS = 120
+
+
+def submissions(count: int, offset: int):
+    rng = random.Random(offset)
+    return [
+        PendingFeedback(
+            section_id=section_id,
+            user_id=offset + i,
+            lecturer=f"GV{section_id % LECTURERS:03d}",
+            rating=rng.choice([3, 4, 4, 5, 5, 2, 1]),
+            comment=rng.choice([None, "Giảng dễ hiểu", "Cần thêm ví dụ"]),
+        )
+        for i in range(count)
+        for section_id in [rng.randint(1, SECTIONS)]
+    ]
+
+
+async def bench(url: str, count: int, batch_size: int):
+    engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"))
+    session_factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    items = submissions(count // 10, 0)
+    started = time.perf_counter()
+    for item in items:
+        await write_batch(session_factory, [item])
+    single = (time.perf_counter() - started) / len(items)
+
+    buffer = FeedbackBuffer(batch_size=batch_size, flush_interval=1.0, max_pending=count)
+    items = submissions(count, count)
+    started = time.perf_counter()
+    for item in items:
+        if buffer.add(item):
+            await buffer.flush(session_factory)
+    await buffer.flush(session_factory)
+    buffered = (time.perf_counter() - started) / len(items)
+    await engine.dispose()
+    return single, buffered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark teaching feedback ingestion")
+    parser.add_argument("--submissions", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    engine = create_engine(url)
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.CourseSection), [
+            {"id": i, "code": f"HP{i:04d}", "name": f"Học phần {i}", "lecturer": f"GV{i % LECTURERS:03d}", "size": 60}
+            for i in range(1, SECTIONS + 1)
+        ])
+
+    single, buffered = asyncio.run(bench(url, args.submissions, args.batch_size))
+    print(f"single    {single * 1e6:>8.0f} us/feedback   ({1 / single:>7.0f}/s)")
+    print(f"buffered  {buffered * 1e6:>8.0f} us/feedback   ({1 / buffered:>7.0f}/s)")
+
+    aggregate = models.FeedbackAggregate
+    feedback = models.TeachingFeedback
+    with engine.connect() as conn:
+        for name, query in (
+            ("aggregates", select(aggregate.key, aggregate.response_count, aggregate.rating_sum)
+             .where(aggregate.scope == LECTURER_SCOPE)),
+            ("scan", select(feedback.lecturer, func.count(), func.sum(feedback.rating)).group_by(feedback.lecturer)),
+        ):
+            started = time.perf_counter()
+            for _ in range(20):
+                conn.execute(query).all()
+            print(f"report {name:<10} {(time.perf_counter() - started) / 20 * 1000:>7.2f} ms")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
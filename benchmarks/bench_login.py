@@ -0,0 +1,113 @@
+# Đo thông lượng đăng nhập khi có nhiều request đồng thời, và độ trễ của một endpoint nhẹ
+# chạy song song (cho thấy event loop có bị bcrypt chặn hay không).
+#
+#   python -m benchmarks.bench_login --logins 200 --concurrency 50
+#   python -m benchmarks.bench_login --blocking   # băm ngay trên event loop như trước đây
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.core import security
+from app.core.database import get_async_db
+from app.models import models
+from app.routers import auth
+
+
+def build_app(path: str, users: int) -> FastAPI:
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(bind=engine)
+    hashed = security.get_password_hash("password")
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"username": f"user{i}", "hashed_password": hashed, "is_active": True, "role": models.UserRole.STUDENT}
+            for i in range(users)
+        ])
+    engine.dispose()
+    SessionLocal = async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{path}"), expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with SessionLocal() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/api/v1/auth")
+    app.dependency_overrides[get_async_db] = override_get_async_db
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+async def run(app: FastAPI, logins: int, concurrency: int, users: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        semaphore = asyncio.Semaphore(concurrency)
+        statuses = []
+        done = asyncio.Event()
+
+        async def login(i):
+            async with semaphore:
+                response = await client.post(
+                    "/api/v1/auth/token",
+                    data={"username": f"user{i % users}", "password": "password"}
+                )
+                statuses.append(response.status_code)
+
+        async def pinger(latencies, interval=0.01):
+            # Độ trễ = thời gian một vòng (ngủ + gọi /ping) trừ đi khoảng nghỉ dự kiến
+            while not done.is_set():
+                started = time.perf_counter()
+                await asyncio.sleep(interval)
+                await client.get("/ping")
+                latencies.append(time.perf_counter() - started - interval)
+
+        ping_latencies = []
+        ping_task = asyncio.create_task(pinger(ping_latencies))
+        started = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await ping_task
+    return statuses, elapsed, ping_latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent login throughput")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--blocking", action="store_true", help="hash inline on the event loop")
+    args = parser.parse_args()
+
+    if args.blocking:
+        async def run_inline(fn, *fn_args):
+            return fn(*fn_args)
+        security.password_hasher._run = run_inline
+
+    tmpdir = tempfile.mkdtemp()
+    app = build_app(os.path.join(tmpdir, "bench.db"), args.users)
+    statuses, elapsed, pings = asyncio.run(run(app, args.logins, args.concurrency, args.users))
+    security.password_hasher.shutdown()
+
+    ok = statuses.count(200)
+    busy = statuses.count(503)
+    print(f"mode:            {'blocking' if args.blocking else 'thread pool'} ({security.password_hasher.max_workers} workers)")
+    print(f"logins:          {ok} ok, {busy} rejected (503), {len(statuses) - ok - busy} other")
+    print(f"throughput:      {len(statuses) / elapsed:.1f} req/s over {elapsed:.2f}s")
+    if pings:
+        pings.sort()
+        print(f"ping latency:    p50 {statistics.median(pings) * 1000:.1f} ms, "
+              f"p99 {pings[int(len(pings) * 0.99) - 1 if len(pings) > 1 else 0] * 1000:.1f} ms, "
+              f"max {pings[-1] * 1000:.1f} ms ({len(pings)} samples)")
+
+
+if __name__ == "__main__":
+    main()
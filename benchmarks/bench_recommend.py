@@ -0,0 +1,110 @@
+# Đo gợi ý ngành/môn học:
+#   recompute - recompute_all: tính top-k cho toàn bộ sinh viên theo lô (cosine bằng NumPy)
+#   endpoint  - độ trễ GET /students/{id}/recommendations (lần đầu đọc DB, sau đó từ cache)
+#
+#   python -m benchmarks.bench_recommend --rows 100000 --requests 2000
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from app.core.database import get_async_db
+from app.core.recommend import recompute_all
+from app.models import models
+from app.routers import students
+from app.routers.auth import get_current_user
+from app.schemas import schemas
+
+SKILLS = [
+    "Lập trình Python", "Thuật toán", "Vẽ, nhiếp ảnh", "Tiếng Anh IELTS 7.0", "Thuyết trình, lãnh đạo",
+    "Tư vấn tâm lý", "Robot, Arduino", "Kế toán, đầu tư", None,
+]
+
+
+def seed(engine, rows: int, batch_size: int = 50000):
+    models.Base.metadata.create_all(bind=engine)
+    rng = random.Random(0)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Class), [{"id": 1, "name": "Bench Class", "academic_year": "2024-2025"}])
+        for start in range(0, rows, batch_size):
+            conn.execute(insert(models.Student), [
+                {
+                    "student_code": f"SV{i:08d}",
+                    "full_name": f"Sinh viên {i}",
+                    "email": f"sv{i}@example.com",
+                    "id_card": f"{i:012d}",
+                    "class_id": 1,
+                    "special_skills": rng.choice(SKILLS),
+                    "extracurricular_activities": rng.choice(SKILLS),
+                    "gpa": round(rng.uniform(1, 4), 2),
+                    "university_entrance_score": round(rng.uniform(15, 30), 2),
+                }
+                for i in range(start, min(start + batch_size, rows))
+            ])
+
+
+def admin_principal():
+    return schemas.Principal(id=1, username="admin", role=models.UserRole.ADMIN, is_active=True)
+
+
+async def bench_endpoint(url: str, rows: int, requests: int):
+    engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with SessionLocal() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(students.router, prefix="/api/v1/students")
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_current_user] = admin_principal
+    students.recommendation_cache.clear()
+
+    ids = [random.randint(1, rows) for _ in range(requests)]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        results = {}
+        for name in ("miss", "hit"):
+            latencies = []
+            for student_id in ids:
+                started = time.perf_counter()
+                response = await client.get(f"/api/v1/students/{student_id}/recommendations")
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200
+            results[name] = latencies
+    await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark course/major recommendations")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    engine = create_engine(url)
+    seed(engine, args.rows)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        count = recompute_all(conn)
+    print(f"recompute  {time.perf_counter() - started:>8.2f} s   ({count} students)")
+    engine.dispose()
+
+    results = asyncio.run(bench_endpoint(url, args.rows, args.requests))
+    for name, latencies in results.items():
+        latencies.sort()
+        p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+        print(f"endpoint {name:<5} p50 {statistics.median(latencies) * 1000:>6.2f} ms   p99 {p99 * 1000:>6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
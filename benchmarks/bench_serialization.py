@@ -0,0 +1,121 @@
+# Đo thời gian CPU để serialize một trang danh sách sinh viên (mặc định 500 dòng):
+#   before  - from_orm từng dòng, FastAPI dump rồi validate lại theo response_model, json.dumps
+#   after   - model_construct từ thuộc tính ORM (không validate lại), model_dump_json (pydantic-core)
+#   compact - view=compact: các dòng của SELECT cột trực tiếp qua orjson
+#
+#   python -m benchmarks.bench_serialization --rows 500 --repeat 50
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timezone
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from app.core.responses import model_response
+from app.models import models
+from app.routers.students import LIST_VIEWS, student_response
+from app.schemas import schemas
+
+
+def build_students(rows: int):
+    created_at = datetime(2024, 9, 1, tzinfo=timezone.utc)
+    class_ = models.Class(id=1, name="CNTT-K65", academic_year="2024-2025", created_at=created_at)
+    students = [
+        models.Student(
+            id=i + 1,
+            student_code=f"SV{i:08d}",
+            full_name=f"Nguyễn Văn {i:04d}",
+            email=f"sv{i}@example.com",
+            phone="0900000000",
+            address="Số 1 Đại Cồ Việt, Hà Nội",
+            hometown="Nam Định",
+            id_card=f"{i:012d}",
+            date_of_birth=datetime(2004, 1, 1, tzinfo=timezone.utc),
+            gender="Nam" if i % 2 else "Nữ",
+            class_id=1,
+            gpa=round((i % 40) / 10, 1),
+            academic_status="Khá",
+            accumulated_credits=90,
+            study_status="Đang học",
+            nationality="Việt Nam",
+            created_at=created_at,
+            class_info=class_,
+        )
+        for i in range(rows)
+    ]
+    return students, {1: schemas.Class.from_orm(class_)}
+
+
+async def before(students, field):
+    content = {
+        "total": len(students),
+        "page": 1,
+        "page_size": len(students),
+        "items": [schemas.Student.from_orm(student) for student in students],
+        "next_cursor": None,
+    }
+    serialized = await serialize_response(field=field, response_content=content)
+    return JSONResponse(serialized).body
+
+
+async def after(students, classes):
+    return model_response(schemas.PaginatedStudentResponse.model_construct(
+        total=len(students),
+        page=1,
+        page_size=len(students),
+        items=[student_response(student, classes) for student in students],
+        next_cursor=None,
+    )).body
+
+
+async def compact(rows, output):
+    return ORJSONResponse({
+        "total": len(rows),
+        "page": 1,
+        "page_size": len(rows),
+        "items": [dict(zip(output, row)) for row in rows],
+        "next_cursor": None,
+    }).body
+
+
+async def measure(fn, repeat):
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        started = time.process_time()
+        size = len(await fn())
+        timings.append(time.process_time() - started)
+    return statistics.median(timings), size
+
+
+async def run(rows: int, repeat: int):
+    students, classes = build_students(rows)
+    field = create_response_field(name="Response", type_=schemas.PaginatedStudentResponse)
+    output = ["id"] + [name for name in LIST_VIEWS["compact"] if name != "id"]
+    compact_rows = [
+        tuple("CNTT-K65" if name == "class_name" else getattr(student, name) for name in output)
+        for student in students
+    ]
+    results = {
+        "before": await measure(lambda: before(students, field), repeat),
+        "after": await measure(lambda: after(students, classes), repeat),
+        "compact": await measure(lambda: compact(compact_rows, output), repeat),
+    }
+    baseline = results["before"][0]
+    print(f"{rows} rows, median of {repeat} runs (CPU time)")
+    for name, (elapsed, size) in results.items():
+        print(f"{name:<8} {elapsed * 1000:>8.2f} ms/request   {size / 1024:>7.1f} KiB   "
+              f"{baseline / elapsed:>5.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark student page serialization")
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
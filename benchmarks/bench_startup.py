@@ -0,0 +1,87 @@
+# Đo thời gian khởi động lạnh: từ lúc chạy tiến trình uvicorn mới tới khi GET / trả về 200
+# (tương ứng một instance Cloud Run mới nhận request đầu tiên), và riêng thời gian `import app.main`
+# trong một tiến trình Python mới. Mỗi lần đo đều là tiến trình mới nên không có cache import.
+#
+#   python -m benchmarks.bench_startup --runs 5
+#   python -m benchmarks.bench_startup --runs 5 --prewarm 5   # kèm mở sẵn kết nối DB ở nền
+#
+# GET / không truy vấn DB nên chỉ cần POSTGRES_* có giá trị (engine tạo kết nối lười); nếu chưa
+# đặt, script điền giá trị giả. Với --prewarm cần một Postgres thật đang chạy.
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+
+DUMMY_DATABASE_ENV = {
+    "POSTGRES_USER": "postgres",
+    "POSTGRES_PASSWORD": "postgres",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_DB": "students",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def child_env(prewarm: int) -> dict:
+    env = {**DUMMY_DATABASE_ENV, **os.environ}
+    env["DB_PREWARM_CONNECTIONS"] = str(prewarm)
+    return env
+
+
+def time_import(env: dict) -> float:
+    code = "import time; started = time.perf_counter(); import app.main; print(time.perf_counter() - started)"
+    output = subprocess.run([sys.executable, "-c", code], env=env, check=True, capture_output=True, text=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def time_first_response(env: dict, timeout: float) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited early: {server.stderr.read().decode()[-2000:]}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/", timeout=0.5).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                pass
+            time.sleep(0.005)
+        raise RuntimeError(f"no response from uvicorn within {timeout:.0f}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold start: process spawn to first response")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--prewarm", type=int, default=0, help="DB_PREWARM_CONNECTIONS for the server")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    env = child_env(args.prewarm)
+    imports = [time_import(env) for _ in range(args.runs)]
+    responses = [time_first_response(env, args.timeout) for _ in range(args.runs)]
+    print(f"runs:            {args.runs} (prewarm {args.prewarm} connections)")
+    print(f"import app.main: median {statistics.median(imports) * 1000:.0f} ms, "
+          f"min {min(imports) * 1000:.0f} ms, max {max(imports) * 1000:.0f} ms")
+    print(f"first response:  median {statistics.median(responses) * 1000:.0f} ms, "
+          f"min {min(responses) * 1000:.0f} ms, max {max(responses) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
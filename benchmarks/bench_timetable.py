@@ -0,0 +1,81 @@
+# Xếp thời khóa biểu trên một bộ dữ liệu giả lập cỡ một trường đại học:
+#   full        - xếp toàn bộ từ đầu (tham lam + tìm kiếm cục bộ)
+#   incremental - đổi giảng viên/sĩ số của một lớp học phần rồi chỉ xếp lại lớp đó
+# Kết quả được kiểm tra lại: không trùng phòng, lớp, giảng viên; phòng đủ chỗ; mỗi buổi một ngày.
+#
+#   python -m benchmarks.bench_timetable --sections 4000 --rooms 200
+import argparse
+import random
+import time
+from collections import Counter
+from app.core.timetable import Room, Section, Slot, TimetableSolver, solve_timetable
+
+ROOM_CAPACITIES = [40, 40, 60, 60, 80, 120, 200]
+
+
+def build_instance(sections: int, rooms: int, days: int, periods: int, seed: int = 0):
+    rng = random.Random(seed)
+    slots = [Slot(day * periods + period + 1, day + 1, period + 1) for day in range(days) for period in range(periods)]
+    room_list = [Room(i + 1, rng.choice(ROOM_CAPACITIES)) for i in range(rooms)]
+    max_capacity = max(room.capacity for room in room_list)
+    groups = max(sections // 10, 1)
+    lecturers = max(sections // 5, 1)
+    section_list = [
+        Section(
+            i + 1,
+            rng.randrange(groups),
+            f"GV{rng.randrange(lecturers):04d}",
+            min(rng.choice([30, 35, 45, 55, 70, 100, 150]), max_capacity),
+            rng.choice([1, 2, 2, 3]),
+        )
+        for i in range(sections)
+    ]
+    return section_list, room_list, slots
+
+
+def validate(sections, rooms, slots, assignments):
+    by_id = {section.id: section for section in sections}
+    capacity = {room.id: room.capacity for room in rooms}
+    day = {slot.id: slot.day for slot in slots}
+    used = Counter()
+    for (section_id, session), (slot_id, room_id) in assignments.items():
+        section = by_id[section_id]
+        assert capacity[room_id] >= section.size
+        used[("room", slot_id, room_id)] += 1
+        used[("class", slot_id, section.class_id)] += 1
+        used[("lecturer", slot_id, section.lecturer)] += 1
+        used[("day", section_id, day[slot_id])] += 1
+    assert max(used.values(), default=0) <= 1, "conflicting timetable"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the timetable solver")
+    parser.add_argument("--sections", type=int, default=4000)
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--days", type=int, default=6)
+    parser.add_argument("--periods", type=int, default=10)
+    args = parser.parse_args()
+
+    sections, rooms, slots = build_instance(args.sections, args.rooms, args.days, args.periods)
+    sessions = sum(section.sessions for section in sections)
+    print(f"{len(sections)} sections, {sessions} sessions, {len(rooms)} rooms, {len(slots)} slots")
+
+    started = time.perf_counter()
+    assignments, unassigned = solve_timetable(sections, rooms, slots, {})
+    elapsed = time.perf_counter() - started
+    validate(sections, rooms, slots, assignments)
+    print(f"full         {elapsed:>7.2f} s   assigned {len(assignments)}   unassigned {len(unassigned)}")
+
+    # Đổi một lớp học phần: giảng viên khác, đông hơn
+    changed = sections[len(sections) // 2]
+    sections[len(sections) // 2] = changed._replace(lecturer="GV-NEW", size=max(room.capacity for room in rooms))
+    started = time.perf_counter()
+    updated, unassigned = solve_timetable(sections, rooms, slots, assignments, section_id=changed.id)
+    elapsed = time.perf_counter() - started
+    validate(sections, rooms, slots, updated)
+    moved = sum(1 for key in updated if assignments.get(key) != updated[key])
+    print(f"incremental  {elapsed:>7.2f} s   assigned {len(updated)}   unassigned {len(unassigned)}   moved {moved}")
+
+
+if __name__ == "__main__":
+    main()
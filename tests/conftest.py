@@ -1,12 +1,19 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.main import app
-from app.core.database import get_db
+from app.core.database import get_async_db, get_db
 from app.models import models
 from app.schemas.schemas import UserRole
 from app.core.security import get_password_hash
+from app.core.activities import activity_index
+from app.core.class_cache import class_cache
+from app.routers.auth import principal_cache
+from app.routers.feedback import section_cache
+from app.routers.students import recommendation_cache, student_count_cache
 
 # Create test database engine
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -19,12 +26,24 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the routers, on the same database file. TestClient runs every request
+# on a fresh event loop, so connections must not be pooled across requests.
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 @pytest.fixture(scope="function")
 def test_db():
     # Drop all tables first
     models.Base.metadata.drop_all(bind=engine)
     # Create test database tables
     models.Base.metadata.create_all(bind=engine)
+    # Caches in the app process must not outlive the tables they describe
+    student_count_cache.clear()
+    recommendation_cache.clear()
+    principal_cache.clear()
+    class_cache.invalidate()
+    activity_index.invalidate()
+    section_cache.clear()
     
     # Override the get_db dependency
     def override_get_db():
@@ -34,7 +53,12 @@ def test_db():
         finally:
             db.close()
     
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+    
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     yield
     # Clean up after tests
     try:
@@ -127,4 +151,28 @@ def test_class(test_db, db_session):
     db_session.add(class_data)
     db_session.commit()
     db_session.refresh(class_data)
-    return class_data 
\ No newline at end of file
+    return class_data 
+
+# Shared by the test modules that create students through the API
+student_data = {
+    "full_name": "Test Student",
+    "phone": "0123456789",
+    "address": "Test Address",
+    "hometown": "Test Hometown",
+    "gender": "Nam",
+    "date_of_birth": "2000-01-01T00:00:00",
+    "password": "password123"
+}
+
+def create_student(client, admin_token, class_id, i, **fields):
+    data = dict(
+        student_data,
+        student_code=f"ST{i:03d}",
+        email=f"student{i}@example.com",
+        id_card=f"1000000{i:02d}",
+        class_id=class_id,
+        **fields
+    )
+    response = client.post("/api/v1/students/", headers={"Authorization": f"Bearer {admin_token}"}, json=data)
+    assert response.status_code == 200
+    return response.json()["id"]
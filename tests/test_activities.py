@@ -0,0 +1,82 @@
+from app.core.activities import activity_index, label_propagation, parse_activities, rebuild_activities
+from tests.conftest import engine
+from tests.conftest import create_student
+
+def test_parse_activities_normalizes_free_text():
+    assert parse_activities("Bóng đá, Vẽ;  nhiếp   ảnh.", "bong da\nGuitar", None) == {
+        "bong da": "Bóng đá",
+        "ve": "Vẽ",
+        "nhiep anh": "Nhiếp ảnh",
+        "guitar": "Guitar",
+    }
+
+def test_label_propagation_finds_communities():
+    # Activities 1-2 and 3-4 are shared by two separate circles; 5 only links 12 and 13
+    labels = label_propagation({
+        10: [1, 2], 11: [1, 2], 12: [1, 2, 5],
+        13: [3, 4, 5], 14: [3, 4], 15: [3],
+    })
+    assert labels[10] == labels[11] == labels[12]
+    assert labels[13] == labels[14] == labels[15]
+    assert labels[10] != labels[13]
+
+def test_student_peers_follow_writes(client, admin_token, test_class):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    me = create_student(client, admin_token, test_class.id, 0,
+                        extracurricular_activities="Bóng đá, CLB Tiếng Anh", special_skills="Guitar")
+    both = create_student(client, admin_token, test_class.id, 1,
+                          extracurricular_activities="bong da", special_skills="guitar")
+    one = create_student(client, admin_token, test_class.id, 2, extracurricular_activities="CLB tiếng Anh")
+    create_student(client, admin_token, test_class.id, 3, special_skills="Cờ vua")
+
+    response = client.get(f"/api/v1/students/{me}/peers", headers=headers)
+    assert response.status_code == 200
+    assert [(peer["student_id"], peer["shared_activities"]) for peer in response.json()] == [
+        (both, ["Bóng đá", "Guitar"]), (one, ["CLB Tiếng Anh"])
+    ]
+
+    response = client.put(f"/api/v1/students/{both}", headers=headers, json={"special_skills": "Cờ vua"})
+    assert response.status_code == 200
+    response = client.delete(f"/api/v1/students/{one}", headers=headers)
+    assert response.status_code == 200
+    expected = [(both, ["Bóng đá"])]
+    peers = client.get(f"/api/v1/students/{me}/peers", headers=headers).json()
+    assert [(peer["student_id"], peer["shared_activities"]) for peer in peers] == expected
+
+    activities = client.get("/api/v1/activities/", headers=headers).json()
+    assert [(activity["name"], activity["student_count"]) for activity in activities] == [
+        ("Bóng đá", 2), ("Cờ vua", 2), ("CLB Tiếng Anh", 1), ("Guitar", 1)
+    ]
+
+    # The backfill produces the same links as the write path
+    with engine.begin() as conn:
+        rebuild_activities(conn)
+    activity_index.invalidate()
+    peers = client.get(f"/api/v1/students/{me}/peers", headers=headers).json()
+    assert [(peer["student_id"], peer["shared_activities"]) for peer in peers] == expected
+
+    response = client.get("/api/v1/students/999999/peers", headers=headers)
+    assert response.status_code == 404
+
+def test_peer_group_detection(client, admin_token, test_class):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    for i, activities in enumerate(("Bóng đá, Bóng rổ", "Bóng đá", "Bóng rổ, Bóng đá", "Vẽ, Nhiếp ảnh", "Nhiếp ảnh")):
+        create_student(client, admin_token, test_class.id, i, extracurricular_activities=activities)
+
+    response = client.post("/api/v1/activities/groups/detect", headers=headers)
+    assert response.status_code == 202
+    groups = client.get("/api/v1/activities/groups", headers=headers).json()
+    assert [(group["size"], group["activities"]) for group in groups] == [
+        (3, ["Bóng đá", "Bóng rổ"]), (2, ["Nhiếp ảnh", "Vẽ"])
+    ]
+    assert groups[0]["name"] in ("Bóng đá", "Bóng rổ")
+
+    response = client.get(f"/api/v1/activities/groups/{groups[1]['group_id']}", headers=headers)
+    assert response.status_code == 200
+    assert [student["student_code"] for student in response.json()["students"]] == ["ST003", "ST004"]
+    response = client.get("/api/v1/activities/groups/999999", headers=headers)
+    assert response.status_code == 404
+
+def test_peer_groups_require_admin(client, test_class):
+    response = client.post("/api/v1/activities/groups/detect")
+    assert response.status_code == 401
@@ -0,0 +1,76 @@
+from app.core.admissions import rebuild_admission_cube
+from tests.conftest import engine
+from tests.conftest import create_student
+
+def cells(response):
+    assert response.status_code == 200
+    return response.json()
+
+def test_admission_cube_follows_student_writes(client, admin_token, test_class):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    create_student(client, admin_token, test_class.id, 0, graduation_year=2022, high_school="THPT A",
+                   university_entrance_score=28.0, gpa=3.6)
+    create_student(client, admin_token, test_class.id, 1, graduation_year=2022, high_school="THPT A",
+                   university_entrance_score=22.0, gpa=2.4, study_status="Thôi học")
+    third = create_student(client, admin_token, test_class.id, 2, graduation_year=2023, high_school="THPT B",
+                           university_entrance_score=25.0, gpa=3.0)
+    fourth = create_student(client, admin_token, test_class.id, 3, graduation_year=2023, high_school="THPT B",
+                            university_entrance_score=19.0, gpa=2.0)
+
+    response = client.put(f"/api/v1/students/{third}", headers=headers, json={"high_school": "THPT A"})
+    assert response.status_code == 200
+    response = client.delete(f"/api/v1/students/{fourth}", headers=headers)
+    assert response.status_code == 200
+
+    by_school = cells(client.get("/api/v1/admissions/cube", headers=headers, params={"group_by": "high_school"}))
+    assert by_school == [{
+        "cohort": None, "high_school": "THPT A", "hometown": None, "score_band": None,
+        "student_count": 3, "average_gpa": 3.0, "dropout_rate": round(1 / 3, 4),
+    }]
+
+    diced = cells(client.get(
+        "/api/v1/admissions/cube", headers=headers,
+        params={"group_by": ["cohort", "score_band"], "high_school": "THPT A"}
+    ))
+    assert [(cell["cohort"], cell["score_band"], cell["student_count"]) for cell in diced] == [
+        (2022, "21-24", 1), (2022, "27-30", 1), (2023, "24-27", 1)
+    ]
+    assert diced[0]["dropout_rate"] == 1.0
+
+    # A full rebuild produces the same cube as the incremental updates
+    with engine.begin() as conn:
+        rebuild_admission_cube(conn)
+    assert cells(client.get(
+        "/api/v1/admissions/cube", headers=headers,
+        params={"group_by": ["cohort", "score_band"], "high_school": "THPT A"}
+    )) == diced
+
+def test_admission_model_fits_gpa_on_entrance_score(client, admin_token, test_class):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    # GPA = 0.2 * score - 2 exactly
+    for i, score in enumerate((20.0, 22.5, 25.0, 27.5)):
+        create_student(client, admin_token, test_class.id, i, graduation_year=2022,
+                       university_entrance_score=score, gpa=0.2 * score - 2)
+    create_student(client, admin_token, test_class.id, 4, graduation_year=2023)
+
+    model = cells(client.get("/api/v1/admissions/model", headers=headers, params={"entrance_score": 24}))
+    assert model["sample_size"] == 4
+    assert model["slope"] == 0.2
+    assert model["intercept"] == -2.0
+    assert model["r_squared"] == 1.0
+    assert model["predicted_gpa"] == 2.8
+
+    model = cells(client.get("/api/v1/admissions/model", headers=headers, params={"cohort": 2023}))
+    assert model == {
+        "sample_size": 0, "intercept": None, "slope": None, "r_squared": None,
+        "entrance_score": None, "predicted_gpa": None,
+    }
+
+def test_admissions_validation(client, admin_token, test_class):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = client.get("/api/v1/admissions/cube", headers=headers, params={"group_by": "gender"})
+    assert response.status_code == 422
+    response = client.get("/api/v1/admissions/cube", headers=headers, params={"score_band": "30-40"})
+    assert response.status_code == 400
+    response = client.get("/api/v1/admissions/cube")
+    assert response.status_code == 401
@@ -6,6 +6,7 @@ from app.core.database import get_db
 from app.models import models
 from app.schemas.schemas import UserRole
 from app.core.security import get_password_hash
+from app.routers.auth import invalidate_principal, principal_cache
 
 def test_login_success(test_db, admin_user, client, db_session):
     # Verify admin user exists in database
@@ -156,4 +157,47 @@ def test_change_password_invalid_token(test_db, client):
             "new_password": "newpassword123"
         }
     )
-    assert response.status_code == 401 
\ No newline at end of file
+    assert response.status_code == 401 
+
+def test_deactivated_user_token_rejected(test_db, admin_user, admin_token, client, db_session):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    assert client.post("/api/v1/auth/logout", headers=headers).status_code == 200
+
+    # Deactivation invalidates the cached principal immediately
+    user = db_session.query(models.User).filter(models.User.username == "admin").first()
+    user.is_active = False
+    db_session.commit()
+
+    response = client.post("/api/v1/auth/logout", headers=headers)
+    assert response.status_code == 401
+    assert "Inactive user" in response.json()["detail"]
+
+def test_principal_cache_stats(test_db, admin_token, client):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    for _ in range(3):
+        client.post("/api/v1/auth/logout", headers=headers)
+
+    response = client.get("/api/v1/auth/principal-cache", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["hits"] >= 3
+    assert 0 < data["hit_rate"] <= 1
+
+def test_principal_cache_drops_fill_started_before_invalidation():
+    generation = principal_cache.generation
+    # A password change or deactivation lands while a request is still loading the old row
+    invalidate_principal("admin")
+    principal_cache.set("admin", "stale principal", generation=generation)
+    assert principal_cache.get("admin") is None
+
+def test_login_hashing_queue_full(test_db, admin_user, client, monkeypatch):
+    from app.core.security import password_hasher
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+
+    response = client.post(
+        "/api/v1/auth/token",
+        data={"username": "admin", "password": "admin"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
@@ -103,6 +103,41 @@ def test_update_class(test_db, admin_token):
     assert data["name"] == update_data["name"]
     assert data["description"] == update_data["description"]
 
+def test_update_class_refreshes_cached_reads(test_db, admin_token):
+    create_response = client.post(
+        "/api/v1/classes/",
+        headers={"Authorization": f"Bearer {admin_token}"},
+        json=test_class_data
+    )
+    class_id = create_response.json()["id"]
+    
+    # Reads are served from the class cache; an update must invalidate it
+    client.get("/api/v1/classes/", headers={"Authorization": f"Bearer {admin_token}"})
+    client.put(
+        f"/api/v1/classes/{class_id}",
+        headers={"Authorization": f"Bearer {admin_token}"},
+        json={"name": "Renamed Class"}
+    )
+    response = client.get("/api/v1/classes/", headers={"Authorization": f"Bearer {admin_token}"})
+    assert [class_["name"] for class_ in response.json()] == ["Renamed Class"]
+    response = client.get(f"/api/v1/classes/{class_id}", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.json()["name"] == "Renamed Class"
+
+def test_get_classes_not_modified(test_db, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    client.post("/api/v1/classes/", headers=headers, json=test_class_data)
+    
+    response = client.get("/api/v1/classes/", headers=headers)
+    etag = response.headers["ETag"]
+    response = client.get("/api/v1/classes/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    
+    # A new class changes the collection version
+    client.post("/api/v1/classes/", headers=headers, json={**test_class_data, "name": "Another Class"})
+    response = client.get("/api/v1/classes/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
 def test_delete_class(test_db, admin_token):
     # Create a class first
     create_response = client.post(
@@ -164,6 +199,19 @@ def test_delete_class_with_students(test_db, admin_token):
     assert response.status_code == 400
     assert "Cannot delete class with existing students" in response.json()["detail"]
 
+def test_delete_class_with_course_sections(test_db, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    class_id = client.post("/api/v1/classes/", headers=headers, json=test_class_data).json()["id"]
+    response = client.post("/api/v1/timetable/sections", headers=headers, json={
+        "code": "INT1", "name": "Môn 1", "class_id": class_id, "lecturer": "GV 1", "size": 30, "sessions_per_week": 1
+    })
+    assert response.status_code == 200
+    
+    response = client.delete(f"/api/v1/classes/{class_id}", headers=headers)
+    assert response.status_code == 400
+    assert "Cannot delete class with existing course sections" in response.json()["detail"]
+    assert client.get(f"/api/v1/classes/{class_id}", headers=headers).status_code == 200
+
 def test_unauthorized_access(test_db):
     # Test accessing endpoints without token
     response = client.get("/api/v1/classes/")
@@ -0,0 +1,55 @@
+import asyncio
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from app.core import database
+from app.core.config import settings
+from app.core.database import pool_limits, pool_options, ping_idle_connections, prewarm_pool, worker_connections
+
+def test_pool_limits_follow_worker_budget(monkeypatch):
+    monkeypatch.setattr(settings, "DB_MAX_CONNECTIONS", 20)
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 5)
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 4)
+    assert worker_connections() == 5
+    assert pool_limits(worker_connections()) == (5, 0)
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 1)
+    assert pool_limits(worker_connections()) == (5, 15)
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 40)
+    assert pool_limits(worker_connections()) == (1, 0)
+
+def test_null_pool_mode(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_MODE", "null")
+    assert pool_options(QueuePool, 10) == {"poolclass": NullPool}
+    monkeypatch.setattr(settings, "DB_POOL_MODE", "queue")
+    options = pool_options(QueuePool, 10)
+    assert (options["poolclass"], options["pool_size"], options["max_overflow"]) == (QueuePool, 5, 5)
+
+def test_idle_connection_is_replaced_when_ping_fails(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ping.db'}", poolclass=QueuePool, pool_size=1, max_overflow=0)
+    ping_idle_connections(engine, idle_seconds=0)
+    with engine.connect() as conn:
+        stale = conn.connection.dbapi_connection
+    # Kết nối đã trả về pool bị đóng từ phía server
+    stale.close()
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+        assert conn.connection.dbapi_connection is not stale
+    engine.dispose()
+
+def test_prewarm_opens_at_most_pool_size(tmp_path, monkeypatch):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'prewarm.db'}", poolclass=AsyncAdaptedQueuePool, pool_size=2, max_overflow=10
+    )
+    monkeypatch.setattr(database, "async_engine", engine)
+    opened = []
+    event.listen(engine.sync_engine, "connect", lambda dbapi_connection, connection_record: opened.append(1))
+
+    async def scenario():
+        await prewarm_pool(5)
+        checked_in = engine.pool.checkedin()
+        await engine.dispose()
+        return checked_in
+
+    # Overflow connections would be opened only to be closed again on return
+    assert asyncio.run(scenario()) == 2
+    assert len(opened) == 2
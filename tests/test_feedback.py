@@ -0,0 +1,127 @@
+import asyncio
+from app.core import feedback
+from app.core.feedback import FeedbackBuffer, PendingFeedback, feedback_buffer, rebuild_statements
+from tests.conftest import engine
+from tests.conftest import create_student
+
+def student_headers(client, admin_token, class_id, i):
+    create_student(client, admin_token, class_id, i)
+    response = client.post(
+        "/api/v1/auth/token",
+        data={"username": f"student{i}@example.com", "password": "password123"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def create_section(client, headers, class_id, code, lecturer):
+    response = client.post("/api/v1/timetable/sections", headers=headers, json={
+        "code": code, "name": f"Môn {code}", "class_id": class_id, "lecturer": lecturer, "size": 30
+    })
+    assert response.status_code == 200
+    return response.json()["id"]
+
+def test_feedback_is_buffered_and_aggregated(client, admin_token, test_class):
+    admin = {"Authorization": f"Bearer {admin_token}"}
+    first = create_section(client, admin, test_class.id, "INT1", "GV A")
+    second = create_section(client, admin, test_class.id, "INT2", "GV A")
+    students = [student_headers(client, admin_token, test_class.id, i) for i in range(3)]
+
+    for headers, rating in zip(students, (5, 4, 4)):
+        response = client.post("/api/v1/feedback/", headers=headers, json={"section_id": first, "rating": rating})
+        assert response.status_code == 202
+    response = client.post("/api/v1/feedback/", headers=students[0], json={"section_id": second, "rating": 2})
+    assert response.status_code == 202
+    # A second submission for the same section is ignored
+    response = client.post("/api/v1/feedback/", headers=students[0], json={"section_id": first, "rating": 1})
+    assert response.status_code == 202
+
+    # Nothing is written until the buffer is flushed
+    summary = client.get(f"/api/v1/feedback/sections/{first}", headers=admin).json()
+    assert summary["response_count"] == 0
+    assert feedback_buffer.pending == 5
+    response = client.post("/api/v1/feedback/flush", headers=admin)
+    assert response.json() == {"written": 4}
+
+    summary = client.get(f"/api/v1/feedback/sections/{first}", headers=admin).json()
+    assert summary == {
+        "section_id": first, "section_code": "INT1", "section_name": "Môn INT1", "lecturer": "GV A",
+        "response_count": 3, "average_rating": 4.33, "histogram": [0, 0, 0, 2, 1],
+    }
+    sections = client.get("/api/v1/feedback/sections", headers=admin).json()
+    assert [(row["section_id"], row["response_count"]) for row in sections] == [(first, 3), (second, 1)]
+    lecturers = client.get("/api/v1/feedback/lecturers", headers=admin).json()
+    assert lecturers == [{
+        "section_id": None, "section_code": None, "section_name": None, "lecturer": "GV A",
+        "response_count": 4, "average_rating": 3.75, "histogram": [0, 1, 0, 2, 1],
+    }]
+
+    # A full rebuild produces the same aggregates as the streaming updates
+    with engine.begin() as conn:
+        for statement in rebuild_statements(conn.dialect.name):
+            conn.execute(statement)
+    assert client.get("/api/v1/feedback/lecturers", headers=admin).json() == lecturers
+
+    # Deleting a section removes its feedback from the lecturer aggregates
+    response = client.delete(f"/api/v1/timetable/sections/{second}", headers=admin)
+    assert response.status_code == 200
+    lecturers = client.get("/api/v1/feedback/lecturers", headers=admin).json()
+    assert (lecturers[0]["response_count"], lecturers[0]["histogram"]) == (3, [0, 0, 0, 2, 1])
+
+def test_feedback_flushes_full_batches(client, admin_token, test_class, monkeypatch):
+    admin = {"Authorization": f"Bearer {admin_token}"}
+    section = create_section(client, admin, test_class.id, "INT1", "GV A")
+    students = [student_headers(client, admin_token, test_class.id, i) for i in range(2)]
+    monkeypatch.setattr(feedback_buffer, "batch_size", 2)
+
+    client.post("/api/v1/feedback/", headers=students[0], json={"section_id": section, "rating": 3})
+    assert feedback_buffer.pending == 1
+    client.post("/api/v1/feedback/", headers=students[1], json={"section_id": section, "rating": 5})
+    assert feedback_buffer.pending == 0
+    summary = client.get(f"/api/v1/feedback/sections/{section}", headers=admin).json()
+    assert (summary["response_count"], summary["average_rating"]) == (2, 4.0)
+
+def test_feedback_validation(client, admin_token, test_class, monkeypatch):
+    admin = {"Authorization": f"Bearer {admin_token}"}
+    section = create_section(client, admin, test_class.id, "INT1", "GV A")
+    headers = student_headers(client, admin_token, test_class.id, 0)
+
+    response = client.post("/api/v1/feedback/", headers=headers, json={"section_id": section, "rating": 6})
+    assert response.status_code == 422
+    response = client.post("/api/v1/feedback/", headers=headers, json={"section_id": 999999, "rating": 5})
+    assert response.status_code == 404
+    response = client.post("/api/v1/feedback/", headers=admin, json={"section_id": section, "rating": 5})
+    assert response.status_code == 403
+    response = client.get("/api/v1/feedback/lecturers", headers=headers)
+    assert response.status_code == 403
+
+    monkeypatch.setattr(feedback_buffer, "max_pending", 0)
+    response = client.post("/api/v1/feedback/", headers=headers, json={"section_id": section, "rating": 5})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+def test_stop_keeps_the_batch_being_written(monkeypatch):
+    written = []
+
+    async def scenario():
+        buffer = FeedbackBuffer(batch_size=10, flush_interval=0, max_pending=100)
+        in_flight = asyncio.Event()
+
+        async def write_batch(session_factory, batch):
+            if not in_flight.is_set():
+                # The flush loop is cancelled by stop() while this batch is being written
+                in_flight.set()
+                await asyncio.sleep(3600)
+            written.extend(batch)
+            return len(batch)
+
+        monkeypatch.setattr(feedback, "write_batch", write_batch)
+        for i in range(3):
+            buffer.add(PendingFeedback(section_id=1, user_id=i, lecturer="GV A", rating=5, comment=None))
+        buffer.start(None)
+        await in_flight.wait()
+        await buffer.stop()
+        return buffer.pending
+
+    assert asyncio.run(scenario()) == 0
+    assert [item.user_id for item in written] == [0, 1, 2]
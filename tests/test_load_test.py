@@ -0,0 +1,24 @@
+from itertools import islice
+from benchmarks.dataset import generate_students
+from benchmarks.load_test import compare, percentile
+
+def test_dataset_is_reproducible():
+    first = list(islice(generate_students(1000, seed=3), 5))
+    assert first == list(islice(generate_students(1000, seed=3), 5))
+    assert first != list(islice(generate_students(1000, seed=4), 5))
+    assert len({student["id_card"] for student in generate_students(1000)}) == 1000
+
+def test_percentile_nearest_rank():
+    ordered = list(range(1, 101))
+    assert (percentile(ordered, 50), percentile(ordered, 95), percentile(ordered, 99)) == (50, 95, 99)
+    assert percentile([7], 99) == 7
+
+def test_compare_flags_regressions():
+    def report(**scenarios):
+        return {"scenarios": {
+            name: {"p95_ms": p95, "rps": rps, "errors": errors} for name, (p95, rps, errors) in scenarios.items()
+        }}
+    baseline = report(list=(10.0, 100.0, 0), detail=(5.0, 400.0, 0), login=(200.0, 50.0, 0), search=(8.0, 90.0, 0))
+    current = report(list=(11.0, 95.0, 0), detail=(7.0, 400.0, 0), login=(200.0, 30.0, 0), search=(8.0, 90.0, 2))
+    assert compare(baseline, current, threshold=0.2) == ["detail", "login", "search"]
+    assert compare(baseline, baseline, threshold=0.2) == []
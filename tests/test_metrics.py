@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from app.core import metrics
+from app.core.config import settings
+from app.core.metrics import Histogram, InstrumentedQueuePool, register_engine
+
+def scrape(client, **kwargs):
+    response = client.get("/metrics", **kwargs)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test histogram", ("kind",), (0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.labels("a").observe(value)
+    assert histogram.render() == [
+        "# HELP test_seconds Test histogram",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{kind="a",le="0.1"} 2',
+        'test_seconds_bucket{kind="a",le="1.0"} 3',
+        'test_seconds_bucket{kind="a",le="+Inf"} 4',
+        'test_seconds_sum{kind="a"} 3.65',
+        'test_seconds_count{kind="a"} 4',
+    ]
+
+def test_request_metrics_use_route_templates(client, admin_token, test_class):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    route = 'method="GET",route="/api/v1/classes/{class_id}"'
+    before = scrape(client)
+    assert f'http_request_duration_seconds_count{{{route},status="2xx"}}' in before
+
+    for _ in range(2):
+        assert client.get(f"/api/v1/classes/{test_class.id}", headers=headers).status_code == 200
+    assert client.get("/api/v1/classes/999999", headers=headers).status_code == 404
+    assert client.get("/no-such-page").status_code == 404
+
+    after = scrape(client)
+    def delta(sample):
+        return after[sample] - before.get(sample, 0)
+    assert delta(f'http_request_duration_seconds_count{{{route},status="2xx"}}') == 2
+    assert delta(f'http_request_duration_seconds_count{{{route},status="4xx"}}') == 1
+    assert delta('http_request_duration_seconds_count{method="GET",route="unmatched",status="4xx"}') == 1
+    # Every class lookup reads the database at least once
+    assert delta(f"http_request_queries_count{{{route}}}") == 3
+    assert delta(f"http_request_queries_sum{{{route}}}") >= 3
+    # The scrape itself is in flight while it renders
+    assert after["http_requests_in_flight"] == 1
+    # Logging in verified the admin password on the hashing pool
+    assert after['password_hash_seconds_count{operation="verify"}'] >= 1
+
+def test_pool_metrics(monkeypatch, client):
+    engine = create_engine(
+        "sqlite:///./test.db", poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=1, pool_timeout=0.01
+    )
+    monkeypatch.setitem(metrics._engines, "test", engine)
+    register_engine("test", engine)
+    first = engine.connect()
+    second = engine.connect()
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+
+    samples = scrape(client)
+    assert samples['db_pool_size{engine="test"}'] == 1
+    assert samples['db_pool_checked_out{engine="test"}'] == 2
+    assert samples['db_pool_overflow{engine="test"}'] == 1
+    assert samples['db_pool_checkout_seconds_count{engine="test"}'] == 3
+    assert samples['db_pool_checkout_timeouts_total{engine="test"}'] == 1
+
+    first.close()
+    second.close()
+    engine.dispose()
+    samples = scrape(client)
+    assert samples['db_pool_checked_out{engine="test"}'] == 0
+    assert samples['db_pool_overflow{engine="test"}'] == 0
+
+def test_metrics_token(monkeypatch, client):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    scrape(client, headers={"Authorization": "Bearer secret"})
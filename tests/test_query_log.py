@@ -0,0 +1,68 @@
+import logging
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.config import settings
+from app.core.query_log import (
+    QueryLogMiddleware, QueryTrace, assert_max_queries, fingerprint, install_query_log, report,
+)
+from tests.conftest import create_student
+
+def test_fingerprint_normalizes_parameters():
+    assert fingerprint("SELECT a FROM t\n  WHERE id IN (?, ?, ?) AND b = $1 AND c = 'x' LIMIT 20") == (
+        "SELECT a FROM t WHERE id IN (?) AND b = ? AND c = ? LIMIT ?"
+    )
+    assert fingerprint("INSERT INTO t (a, b) VALUES (%(a_1)s, %(b_1)s), (%(a_2)s, %(b_2)s)") == (
+        "INSERT INTO t (a, b) VALUES (?)"
+    )
+    assert fingerprint("SELECT x::text FROM t2") == "SELECT x::text FROM t2"
+
+def test_student_list_query_count_does_not_grow(client, admin_token, test_class):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    create_student(client, admin_token, test_class.id, 0)
+    with assert_max_queries(10, max_repeats=1) as one:
+        assert client.get("/api/v1/students/", headers=headers).status_code == 200
+
+    for i in range(1, 6):
+        create_student(client, admin_token, test_class.id, i)
+    with assert_max_queries(one.count, max_repeats=1):
+        response = client.get("/api/v1/students/", headers=headers)
+    assert len(response.json()["items"]) == 6
+
+def test_assert_max_queries_reports_repeated_statements(client, admin_token, test_class):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    student_ids = [create_student(client, admin_token, test_class.id, i) for i in range(3)]
+    with pytest.raises(AssertionError, match="possible N\\+1"):
+        with assert_max_queries(100, max_repeats=1):
+            for student_id in student_ids:
+                client.get(f"/api/v1/students/{student_id}", headers=headers)
+    with pytest.raises(AssertionError, match="Expected at most 0 queries"):
+        with assert_max_queries(0):
+            client.get(f"/api/v1/students/{student_ids[0]}", headers=headers)
+
+def test_middleware_logs_slow_and_repeated_statements(admin_token, test_class, monkeypatch, caplog):
+    client = TestClient(QueryLogMiddleware(app, app.routes))
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    student_id = create_student(client, admin_token, test_class.id, 0)
+    install_query_log()
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(settings, "QUERY_REPEAT_THRESHOLD", 2)
+
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger="app.core.query_log"):
+        client.post("/api/v1/students/batch", headers=headers, json={"ids": [student_id]})
+        client.get(f"/api/v1/students/{student_id}", headers=headers)
+    messages = [record.getMessage() for record in caplog.records]
+    assert any(message.startswith("Slow query (") and " on POST /api/v1/students/batch: " in message for message in messages)
+    assert any(message.startswith("Slow query (") and " on GET /api/v1/students/{student_id}: " in message for message in messages)
+    assert not any(message.startswith("Possible N+1") for message in messages)
+
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger="app.core.query_log"):
+        trace = QueryTrace()
+        for _ in range(2):
+            trace.record("SELECT ? FROM classes WHERE id = ?", 0.001, False)
+        report(trace, "GET /api/v1/students/")
+    assert [record.getMessage() for record in caplog.records] == [
+        "Possible N+1 on GET /api/v1/students/: 2 x SELECT ? FROM classes WHERE id = ?"
+    ]
@@ -0,0 +1,57 @@
+from app.core.recommend import recommend_rows
+from tests.conftest import create_student, student_data
+
+def test_recommend_rows_matches_profile():
+    rows = [
+        (1, "Lập trình Python, thuật toán", "Giải Olympic Tin học", None, 3.5, 27.0),
+        (2, "Vẽ, nhiếp ảnh", None, "CLB thiết kế", 2.2, 20.0),
+        (3, None, None, None, None, None),
+    ]
+    recommendations = recommend_rows(rows, top_k=3)
+    by_student = {}
+    for row in recommendations:
+        by_student.setdefault(row["student_id"], []).append(row)
+    assert by_student[1][0]["item_code"] in ("7480201", "7480101")
+    assert by_student[2][0]["item_code"] == "7210403"
+    assert [row["rank"] for row in by_student[1]] == [1, 2, 3]
+    assert by_student[1][0]["score"] >= by_student[1][1]["score"] >= by_student[1][2]["score"]
+    # Empty profile: nothing to recommend
+    assert 3 not in by_student
+
+def test_student_recommendations(client, admin_token, test_class):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    student_id = create_student(
+        client, admin_token, test_class.id, 0,
+        special_skills="Lập trình, thuật toán", gpa=3.4, university_entrance_score=26.0
+    )
+    other_id = create_student(client, admin_token, test_class.id, 1, special_skills="Nhiếp ảnh")
+
+    response = client.get(f"/api/v1/students/{student_id}/recommendations", headers=headers)
+    assert response.status_code == 200
+    recommendations = response.json()
+    assert 0 < len(recommendations) <= 5
+    assert recommendations[0]["code"] in ("7480201", "7480101")
+    assert recommendations[0]["name"]
+
+    # A profile update recomputes the list and invalidates the cached one
+    response = client.put(
+        f"/api/v1/students/{student_id}", headers=headers,
+        json={"special_skills": "Tiếng Anh IELTS 7.5, dịch thuật"}
+    )
+    assert response.status_code == 200
+    response = client.get(f"/api/v1/students/{student_id}/recommendations", headers=headers)
+    assert response.json()[0]["code"] in ("7220201", "FLF2101")
+
+    # Students only see their own recommendations
+    token_response = client.post(
+        "/api/v1/auth/token",
+        data={"username": "student0@example.com", "password": student_data["password"]}
+    )
+    student_headers = {"Authorization": f"Bearer {token_response.json()['access_token']}"}
+    response = client.get(f"/api/v1/students/{student_id}/recommendations", headers=student_headers)
+    assert response.status_code == 200
+    response = client.get(f"/api/v1/students/{other_id}/recommendations", headers=student_headers)
+    assert response.status_code == 403
+
+    response = client.get("/api/v1/students/999999/recommendations", headers=headers)
+    assert response.status_code == 404
@@ -0,0 +1,65 @@
+import numpy as np
+from app.core.risk import rescore_all, score_features
+from app.routers import students
+from tests.conftest import create_student, engine
+
+def test_score_features_orders_by_risk():
+    scores = score_features(
+        gpa=np.array([3.8, 1.2, np.nan, 3.0]),
+        credits=np.array([120.0, 10.0, np.nan, 90.0]),
+        entrance_score=np.array([27.0, 15.0, np.nan, 22.0]),
+        graduation_year=np.array([2020.0, 2020.0, np.nan, 2020.0]),
+        study_status=np.array(["Đang học", "Cảnh báo học vụ", "", "Thôi học"]),
+        current_year=2024,
+    )
+    assert scores.shape == (4,)
+    assert ((scores > 0) & (scores < 1)).all()
+    assert scores[1] > scores[2] > scores[0]
+    assert scores[3] > scores[0]
+
+def test_top_risk(client, admin_token, test_class):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    low = create_student(client, admin_token, test_class.id, 0, gpa=3.9, study_status="Đang học")
+    high = create_student(client, admin_token, test_class.id, 1, gpa=1.0, study_status="Cảnh báo học vụ")
+    middle = create_student(client, admin_token, test_class.id, 2, gpa=2.5)
+
+    response = client.get("/api/v1/risk/top", headers=headers, params={"class_id": test_class.id})
+    assert response.status_code == 200
+    top = response.json()
+    assert [row["student_id"] for row in top] == [high, middle, low]
+    assert top[0]["student_code"] == "ST001"
+
+    # Only the updated student is rescored, and the order follows
+    response = client.put(f"/api/v1/students/{low}", headers=headers, json={"gpa": 0.5, "study_status": "Thôi học"})
+    assert response.status_code == 200
+    top = client.get("/api/v1/risk/top", headers=headers, params={"limit": 1}).json()
+    assert [row["student_id"] for row in top] == [low]
+
+    response = client.delete(f"/api/v1/students/{low}", headers=headers)
+    assert response.status_code == 200
+    top = client.get("/api/v1/risk/top", headers=headers).json()
+    assert [row["student_id"] for row in top] == [high, middle]
+
+    # A full rescore gives the same scores as the incremental ones
+    with engine.begin() as conn:
+        assert rescore_all(conn) == 2
+    rescored = client.get("/api/v1/risk/top", headers=headers).json()
+    assert [row["score"] for row in rescored] == [row["score"] for row in top]
+
+def test_update_rescores_only_on_risk_fields(client, admin_token, test_class, monkeypatch):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    student_id = create_student(client, admin_token, test_class.id, 0, gpa=3.0)
+    rescored = []
+
+    async def record_rescore(db, condition):
+        rescored.append(condition)
+
+    monkeypatch.setattr(students, "rescore_students", record_rescore)
+    assert client.put(f"/api/v1/students/{student_id}", headers=headers, json={"phone": "0987654321"}).status_code == 200
+    assert rescored == []
+    assert client.put(f"/api/v1/students/{student_id}", headers=headers, json={"gpa": 1.5}).status_code == 200
+    assert len(rescored) == 1
+
+def test_top_risk_requires_admin(client, test_class):
+    response = client.get("/api/v1/risk/top")
+    assert response.status_code == 401
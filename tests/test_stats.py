@@ -0,0 +1,69 @@
+import json
+from app.core.stats import rebuild_statements
+from tests.conftest import create_student, engine, student_data
+
+def buckets(stats, dimension):
+    return {bucket["value"]: bucket["student_count"] for bucket in stats[dimension]}
+
+def test_stats_follow_student_writes(client, admin_token, test_class):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    create_student(client, admin_token, test_class.id, 0, gender="Nam", gpa=3.7, academic_status="Giỏi", accumulated_credits=100)
+    create_student(client, admin_token, test_class.id, 1, gender="Nữ", gpa=2.8, academic_status="Khá", accumulated_credits=60)
+    third = create_student(client, admin_token, test_class.id, 2, gender="Nữ")
+    fourth = create_student(client, admin_token, test_class.id, 3, gender="Nam", gpa=1.5, accumulated_credits=20)
+
+    response = client.put(f"/api/v1/students/{third}", headers=headers, json={"gpa": 3.3, "academic_status": "Giỏi"})
+    assert response.status_code == 200
+    response = client.delete(f"/api/v1/students/{fourth}", headers=headers)
+    assert response.status_code == 200
+
+    response = client.get(f"/api/v1/stats/classes/{test_class.id}", headers=headers)
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["class_name"] == "Test Class"
+    assert stats["student_count"] == 3
+    assert stats["credits_sum"] == 160
+    assert stats["average_gpa"] == round((3.7 + 2.8 + 3.3) / 3, 2)
+    assert buckets(stats, "gender") == {"Nam": 1, "Nữ": 2}
+    assert buckets(stats, "academic_status") == {"Giỏi": 2, "Khá": 1}
+    assert buckets(stats, "study_status") == {None: 3}
+    assert buckets(stats, "gpa") == {"3.6-4.0": 1, "3.2-3.6": 1, "2.5-3.2": 1}
+
+    response = client.get("/api/v1/stats/", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == dict(stats, class_id=None, class_name=None)
+
+    # A full rebuild produces the same numbers as the incremental updates
+    with engine.begin() as conn:
+        for statement in rebuild_statements(conn.dialect.name):
+            conn.execute(statement)
+    response = client.get("/api/v1/stats/classes", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == [stats]
+
+def test_stats_follow_bulk_import(client, admin_token, test_class):
+    rows = [
+        dict(student_data, student_code=f"ST{i:03d}", email=f"student{i}@example.com", id_card=f"1000000{i:02d}",
+             class_id=test_class.id, gender="Nam", gpa=2.0 + i)
+        for i in range(2)
+    ]
+    body = "\n".join(json.dumps(row) for row in rows)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = client.post(
+        "/api/v1/students/bulk",
+        headers=headers,
+        files={"file": ("students.jsonl", body.encode("utf-8"), "application/x-ndjson")}
+    )
+    assert response.json()["created"] == 2
+
+    stats = client.get(f"/api/v1/stats/classes/{test_class.id}", headers=headers).json()
+    assert stats["student_count"] == 2
+    assert buckets(stats, "gpa") == {"2.0-2.5": 1, "2.5-3.2": 1}
+
+def test_stats_require_admin(client, test_class):
+    response = client.get("/api/v1/stats/")
+    assert response.status_code == 401
+
+def test_stats_unknown_class(client, admin_token, test_class):
+    response = client.get("/api/v1/stats/classes/999999", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 404
@@ -1,13 +1,9 @@
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy.orm import Session
+import json
 from datetime import datetime
-from app.main import app
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.query_log import assert_max_queries
 from app.models import models
-from app.schemas.schemas import UserRole
-
-client = TestClient(app)
 
 # Test data
 test_student_data = {
@@ -29,50 +25,7 @@ test_class_data = {
     "description": "Test Class Description"
 }
 
-@pytest.fixture
-def test_db():
-    # Create test database
-    from app.core.database import engine
-    models.Base.metadata.create_all(bind=engine)
-    yield
-    # Clean up after tests
-    models.Base.metadata.drop_all(bind=engine)
-
-@pytest.fixture
-def admin_token(test_db):
-    # Create admin user and get token
-    from app.core.security import get_password_hash
-    db = next(get_db())
-    admin = models.User(
-        username="admin",
-        hashed_password=get_password_hash("admin"),
-        role=UserRole.ADMIN,
-        is_active=True
-    )
-    db.add(admin)
-    db.commit()
-    
-    response = client.post(
-        "/api/v1/auth/token",
-        data={"username": "admin", "password": "admin"}
-    )
-    return response.json()["access_token"]
-
-@pytest.fixture
-def test_class(test_db):
-    db = next(get_db())
-    # Delete existing test class if exists
-    db.query(models.Class).filter(models.Class.name == test_class_data["name"]).delete()
-    db.commit()
-    
-    # Create new test class
-    class_data = models.Class(**test_class_data)
-    db.add(class_data)
-    db.commit()
-    db.refresh(class_data)
-    return class_data
-
-def test_create_student(test_db, admin_token, test_class):
+def test_create_student(client, test_db, admin_token, test_class):
     student_data = test_student_data.copy()
     student_data["class_id"] = test_class.id
     response = client.post(
@@ -86,7 +39,7 @@ def test_create_student(test_db, admin_token, test_class):
     assert data["full_name"] == test_student_data["full_name"]
     assert data["email"] == test_student_data["email"]
 
-def test_create_student_duplicate_email(test_db, admin_token, test_class):
+def test_create_student_duplicate_email(client, test_db, admin_token, test_class):
     student_data = test_student_data.copy()
     student_data["class_id"] = test_class.id
     # Create first student
@@ -105,7 +58,7 @@ def test_create_student_duplicate_email(test_db, admin_token, test_class):
     assert response.status_code == 400
     assert "Email already registered" in response.json()["detail"]
 
-def test_get_students(test_db, admin_token, test_class):
+def test_get_students(client, test_db, admin_token, test_class):
     # Create a student first
     student_data = test_student_data.copy()
     student_data["class_id"] = test_class.id
@@ -134,7 +87,202 @@ def test_get_students(test_db, admin_token, test_class):
     assert data["page"] == 1
     assert data["page_size"] == 10
 
-def test_get_student_by_id(test_db, admin_token, test_class):
+def create_students(client, admin_token, test_class, count):
+    ids = []
+    for i in range(count):
+        student_data = test_student_data.copy()
+        student_data["class_id"] = test_class.id
+        student_data["student_code"] = f"ST{i:03d}"
+        student_data["email"] = f"student{i}@example.com"
+        student_data["id_card"] = f"1000000{i:02d}"
+        student_data["full_name"] = f"Student {count - i}"
+        response = client.post(
+            "/api/v1/students/",
+            headers={"Authorization": f"Bearer {admin_token}"},
+            json=student_data
+        )
+        assert response.status_code == 200
+        ids.append(response.json()["id"])
+    return ids
+
+def test_get_students_constant_query_count(client, test_db, admin_token, test_class):
+    def queries_for_page(page_size):
+        # total_mode=none: the count query is covered by its own cache
+        params = {"page_size": page_size, "total_mode": "none"}
+        client.get("/api/v1/students/", headers={"Authorization": f"Bearer {admin_token}"}, params=params)
+        with assert_max_queries(1) as trace:
+            response = client.get(
+                "/api/v1/students/",
+                headers={"Authorization": f"Bearer {admin_token}"},
+                params=params
+            )
+        assert response.status_code == 200
+        assert all(item["class_info"]["name"] == "Test Class" for item in response.json()["items"])
+        return trace.count
+
+    create_students(client, admin_token, test_class, 6)
+    # class_info comes from the class cache: one SELECT on students whatever the page size
+    assert queries_for_page(1) == queries_for_page(6) == 1
+
+def test_get_students_cursor_pagination(client, test_db, admin_token, test_class):
+    ids = create_students(client, admin_token, test_class, 5)
+
+    seen = []
+    params = {"page_size": 2, "sort_by": "full_name", "class_id": test_class.id}
+    while True:
+        response = client.get(
+            "/api/v1/students/",
+            headers={"Authorization": f"Bearer {admin_token}"},
+            params=params
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 5
+        seen.extend(item["id"] for item in data["items"])
+        if data["next_cursor"] is None:
+            break
+        params["cursor"] = data["next_cursor"]
+
+    # Sorted by full_name ascending, which is the reverse of creation order
+    assert seen == list(reversed(ids))
+
+def test_get_students_cursor_pagination_with_null_names(client, test_db, admin_token, test_class):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    ids = create_students(client, admin_token, test_class, 5)
+    for student_id in (ids[1], ids[3]):
+        response = client.put(f"/api/v1/students/{student_id}", headers=headers, json={"full_name": None})
+        assert response.status_code == 200
+
+    def walk(sort_order):
+        seen = []
+        params = {"page_size": 2, "sort_by": "full_name", "sort_order": sort_order}
+        while True:
+            data = client.get("/api/v1/students/", headers=headers, params=params).json()
+            seen.extend(item["id"] for item in data["items"])
+            if data["next_cursor"] is None:
+                return seen
+            params["cursor"] = data["next_cursor"]
+
+    # NULL names come last ascending and first descending, ordered by id; no page is skipped
+    named = [ids[4], ids[2], ids[0]]
+    assert walk("asc") == named + [ids[1], ids[3]]
+    assert walk("desc") == [ids[3], ids[1]] + list(reversed(named))
+
+def test_get_students_invalid_cursor(client, test_db, admin_token, test_class):
+    response = client.get(
+        "/api/v1/students/",
+        headers={"Authorization": f"Bearer {admin_token}"},
+        params={"cursor": "not-a-cursor"}
+    )
+    assert response.status_code == 400
+
+    # A cursor issued for one sort order cannot be reused with another
+    create_students(client, admin_token, test_class, 2)
+    response = client.get(
+        "/api/v1/students/",
+        headers={"Authorization": f"Bearer {admin_token}"},
+        params={"page_size": 1}
+    )
+    next_cursor = response.json()["next_cursor"]
+    response = client.get(
+        "/api/v1/students/",
+        headers={"Authorization": f"Bearer {admin_token}"},
+        params={"cursor": next_cursor, "sort_by": "full_name"}
+    )
+    assert response.status_code == 400
+
+def test_get_students_total_modes(client, test_db, admin_token, test_class):
+    ids = create_students(client, admin_token, test_class, 2)
+
+    def list_students(**params):
+        response = client.get(
+            "/api/v1/students/",
+            headers={"Authorization": f"Bearer {admin_token}"},
+            params={"class_id": test_class.id, **params}
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    assert list_students()["total"] == 2
+    # Cached total is invalidated by writes
+    client.delete(f"/api/v1/students/{ids[0]}", headers={"Authorization": f"Bearer {admin_token}"})
+    assert list_students()["total"] == 1
+
+    data = list_students(total_mode="none")
+    assert data["total"] is None
+    assert len(data["items"]) == 1
+    # Planner estimate on Postgres, exact count elsewhere
+    assert isinstance(list_students(total_mode="estimate")["total"], int)
+
+    response = client.get(
+        "/api/v1/students/",
+        headers={"Authorization": f"Bearer {admin_token}"},
+        params={"total_mode": "approximate"}
+    )
+    assert response.status_code == 400
+
+def test_get_students_sparse_fields(client, test_db, admin_token, test_class):
+    ids = create_students(client, admin_token, test_class, 3)
+
+    def list_students(**params):
+        response = client.get(
+            "/api/v1/students/",
+            headers={"Authorization": f"Bearer {admin_token}"},
+            params=params
+        )
+        return response
+
+    response = list_students(fields="student_code,class_name", page_size=2, sort_by="full_name")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 3
+    assert data["items"][0] == {"id": ids[2], "student_code": "ST002", "class_name": "Test Class"}
+    # The cursor still works although the sort column was not requested
+    response = list_students(fields="student_code,class_name", sort_by="full_name", cursor=data["next_cursor"])
+    assert [item["id"] for item in response.json()["items"]] == [ids[0]]
+
+    data = list_students(view="compact").json()
+    assert set(data["items"][0]) == {"id", "student_code", "full_name", "class_id", "class_name", "gpa"}
+    # The full view stays the default
+    assert "class_info" in list_students().json()["items"][0]
+
+    assert list_students(fields="hashed_password").status_code == 400
+    assert list_students(view="tiny").status_code == 400
+
+def test_search_students_without_diacritics(client, test_db, admin_token, test_class):
+    for i, full_name in enumerate(["Nguyễn Văn A", "Trần Thị Bình", "Nguyễn Văn Anh Đức"]):
+        student_data = test_student_data.copy()
+        student_data["class_id"] = test_class.id
+        student_data["student_code"] = f"SV{i:03d}"
+        student_data["email"] = f"search{i}@example.com"
+        student_data["id_card"] = f"2000000{i:02d}"
+        student_data["full_name"] = full_name
+        response = client.post(
+            "/api/v1/students/",
+            headers={"Authorization": f"Bearer {admin_token}"},
+            json=student_data
+        )
+        assert response.status_code == 200
+
+    def search(term):
+        response = client.get(
+            "/api/v1/students/",
+            headers={"Authorization": f"Bearer {admin_token}"},
+            params={"search": term}
+        )
+        assert response.status_code == 200
+        return [item["full_name"] for item in response.json()["items"]]
+
+    assert sorted(search("nguyen van a")) == ["Nguyễn Văn A", "Nguyễn Văn Anh Đức"]
+    assert search("anh duc") == ["Nguyễn Văn Anh Đức"]
+    assert search("TRẦN") == ["Trần Thị Bình"]
+    assert search("sv001") == ["Trần Thị Bình"]
+    assert search("search2@") == ["Nguyễn Văn Anh Đức"]
+    # Short terms fall back to a substring match on the folded key
+    assert len(search("a")) == 3
+    assert search("zzz") == []
+
+def test_get_student_by_id(client, test_db, admin_token, test_class):
     # Create a student first
     student_data = test_student_data.copy()
     student_data["class_id"] = test_class.id
@@ -154,7 +302,98 @@ def test_get_student_by_id(test_db, admin_token, test_class):
     data = response.json()
     assert data["id"] == student_id
 
-def test_update_student(test_db, admin_token, test_class):
+def test_get_student_conditional_requests(client, test_db, admin_token, test_class):
+    student_id = create_students(client, admin_token, test_class, 1)[0]
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    response = client.get(f"/api/v1/students/{student_id}", headers=headers)
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+    response = client.get(f"/api/v1/students/{student_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    list_response = client.get("/api/v1/students/", headers=headers)
+    list_etag = list_response.headers["ETag"]
+    response = client.get("/api/v1/students/", headers={**headers, "If-None-Match": list_etag})
+    assert response.status_code == 304
+
+    # A write with the current ETag succeeds and returns the new one
+    response = client.put(
+        f"/api/v1/students/{student_id}",
+        headers={**headers, "If-Match": etag},
+        json={"full_name": "Updated Name"}
+    )
+    assert response.status_code == 200
+    new_etag = response.headers["ETag"]
+    assert new_etag != etag
+    response = client.get(f"/api/v1/students/{student_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == new_etag
+    response = client.get("/api/v1/students/", headers={**headers, "If-None-Match": list_etag})
+    assert response.status_code == 200
+
+    # A stale ETag is rejected instead of overwriting the newer version
+    response = client.put(
+        f"/api/v1/students/{student_id}",
+        headers={**headers, "If-Match": etag},
+        json={"full_name": "Lost Update"}
+    )
+    assert response.status_code == 412
+    assert client.get(f"/api/v1/students/{student_id}", headers=headers).json()["full_name"] == "Updated Name"
+
+def test_get_students_batch(client, test_db, admin_token, test_class):
+    ids = create_students(client, admin_token, test_class, 3)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    
+    # One SELECT on students for the whole batch; class_info comes from the class cache
+    with assert_max_queries(1):
+        response = client.post(
+            "/api/v1/students/batch",
+            headers=headers,
+            json={"ids": [ids[2], 999999, ids[0], ids[2]]}
+        )
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["id"] for item in data["items"]] == [ids[2], ids[0]]
+    assert data["missing"] == [999999]
+    assert data["items"][0]["class_info"]["name"] == "Test Class"
+    
+    response = client.post(
+        "/api/v1/students/batch",
+        headers=headers,
+        json={"student_codes": ["ST001", "NOPE"]}
+    )
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()["items"]] == [ids[1]]
+    assert response.json()["missing"] == ["NOPE"]
+    
+    # Exactly one of ids / student_codes, within the configured limit
+    response = client.post("/api/v1/students/batch", headers=headers, json={})
+    assert response.status_code == 400
+    response = client.post(
+        "/api/v1/students/batch",
+        headers=headers,
+        json={"ids": list(range(1, settings.STUDENT_BATCH_MAX_SIZE + 2))}
+    )
+    assert response.status_code == 400
+
+def test_get_students_batch_student_access(client, test_db, admin_token, test_class):
+    ids = create_students(client, admin_token, test_class, 2)
+    token_response = client.post(
+        "/api/v1/auth/token",
+        data={"username": "student0@example.com", "password": test_student_data["password"]}
+    )
+    headers = {"Authorization": f"Bearer {token_response.json()['access_token']}"}
+    
+    response = client.post("/api/v1/students/batch", headers=headers, json={"ids": [ids[0]]})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()["items"]] == [ids[0]]
+    
+    response = client.post("/api/v1/students/batch", headers=headers, json={"ids": [ids[0], ids[1]]})
+    assert response.status_code == 403
+
+def test_update_student(client, test_db, admin_token, test_class):
     # Create a student first
     student_data = test_student_data.copy()
     student_data["class_id"] = test_class.id
@@ -180,7 +419,7 @@ def test_update_student(test_db, admin_token, test_class):
     assert data["full_name"] == update_data["full_name"]
     assert data["phone"] == update_data["phone"]
 
-def test_delete_student(test_db, admin_token, test_class):
+def test_delete_student(client, test_db, admin_token, test_class):
     # Create a student first
     student_data = test_student_data.copy()
     student_data["class_id"] = test_class.id
@@ -205,12 +444,12 @@ def test_delete_student(test_db, admin_token, test_class):
     )
     assert get_response.status_code == 404
 
-def test_unauthorized_access(test_db, test_class):
+def test_unauthorized_access(client, test_db, test_class):
     # Test accessing endpoints without token
     response = client.get("/api/v1/students/")
     assert response.status_code == 401
 
-def test_student_access_own_profile(test_db, admin_token, test_class):
+def test_student_access_own_profile(client, test_db, admin_token, test_class):
     # Create a student
     student_data = test_student_data.copy()
     student_data["class_id"] = test_class.id
@@ -255,7 +494,7 @@ def test_student_access_own_profile(test_db, admin_token, test_class):
     )
     assert response.status_code == 403
 
-def test_create_student_invalid_class_id(test_db, admin_token):
+def test_create_student_invalid_class_id(client, test_db, admin_token):
     student_data = test_student_data.copy()
     student_data["class_id"] = 99999  # Non-existent class ID
     response = client.post(
@@ -266,7 +505,7 @@ def test_create_student_invalid_class_id(test_db, admin_token):
     assert response.status_code == 404
     assert "Class not found" in response.json()["detail"]
 
-def test_update_student_invalid_class_id(test_db, admin_token, test_class):
+def test_update_student_invalid_class_id(client, test_db, admin_token, test_class):
     # Create a student first
     student_data = test_student_data.copy()
     student_data["class_id"] = test_class.id
@@ -287,4 +526,98 @@ def test_update_student_invalid_class_id(test_db, admin_token, test_class):
         json=update_data
     )
     assert response.status_code == 404
-    assert "Class not found" in response.json()["detail"] 
\ No newline at end of file
+    assert "Class not found" in response.json()["detail"] 
+def test_bulk_import_students_csv(client, test_db, admin_token, test_class):
+    existing = test_student_data.copy()
+    existing["class_id"] = test_class.id
+    client.post(
+        "/api/v1/students/",
+        headers={"Authorization": f"Bearer {admin_token}"},
+        json=existing
+    )
+
+    header = "student_code,full_name,email,phone,address,hometown,id_card,date_of_birth,gender,class_id,gpa,password"
+    lines = [
+        header,
+        f"SV100,Nguyễn Văn A,a@example.com,0901,Hà Nội,Hà Nội,300000001,2003-01-01T00:00:00,Nam,{test_class.id},3.2,secret1",
+        f"SV101,Trần Thị B,b@example.com,0902,Huế,Huế,300000002,2003-02-01T00:00:00,Nữ,{test_class.id},,secret2",
+        # Invalid email
+        f"SV102,Lê Văn C,not-an-email,0903,Huế,Huế,300000003,2003-03-01T00:00:00,Nam,{test_class.id},,secret3",
+        # Student code duplicated within the file
+        f"SV101,Phạm Văn D,d@example.com,0904,Huế,Huế,300000004,2003-04-01T00:00:00,Nam,{test_class.id},,secret4",
+        # Email already registered by an existing student
+        f"SV105,Đỗ Thị E,{test_student_data['email']},0905,Huế,Huế,300000005,2003-05-01T00:00:00,Nữ,{test_class.id},,secret5",
+        # Unknown class
+        "SV106,Vũ Văn F,f@example.com,0906,Huế,Huế,300000006,2003-06-01T00:00:00,Nam,99999,,secret6",
+    ]
+    response = client.post(
+        "/api/v1/students/bulk",
+        headers={"Authorization": f"Bearer {admin_token}"},
+        files={"file": ("students.csv", "\n".join(lines).encode("utf-8"), "text/csv")}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 6
+    assert data["created"] == 2
+    assert data["failed"] == 4
+    errors = {error["row"]: error["detail"] for error in data["errors"]}
+    assert set(errors) == {3, 4, 5, 6}
+    assert "email" in errors[3]
+    assert errors[4] == "Mã sinh viên đã tồn tại"
+    assert errors[5] == "Email đã được đăng ký cho tài khoản khác"
+    assert errors[6] == "Lớp học không tồn tại"
+
+    # Imported students are searchable and can log in
+    response = client.get(
+        "/api/v1/students/",
+        headers={"Authorization": f"Bearer {admin_token}"},
+        params={"search": "nguyen van a"}
+    )
+    assert [item["student_code"] for item in response.json()["items"]] == ["SV100"]
+    response = client.post("/api/v1/auth/token", data={"username": "b@example.com", "password": "secret2"})
+    assert response.status_code == 200
+
+def test_bulk_import_students_jsonl(client, test_db, admin_token, test_class):
+    student_data = test_student_data.copy()
+    student_data["class_id"] = test_class.id
+    body = "\n".join([json.dumps(student_data), "{not json", ""])
+    response = client.post(
+        "/api/v1/students/bulk",
+        headers={"Authorization": f"Bearer {admin_token}"},
+        files={"file": ("students.jsonl", body.encode("utf-8"), "application/x-ndjson")}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 1
+    assert data["errors"] == [{"row": 2, "student_code": None, "detail": "Dòng JSON không hợp lệ"}]
+
+def test_export_students(client, test_db, admin_token, test_class):
+    create_students(client, admin_token, test_class, 3)
+
+    response = client.get(
+        "/api/v1/students/export",
+        headers={"Authorization": f"Bearer {admin_token}"},
+        params={"fields": "student_code,full_name,date_of_birth", "class_id": test_class.id}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.strip().splitlines()
+    assert lines[0] == "student_code,full_name,date_of_birth"
+    assert [line.split(",")[0] for line in lines[1:]] == ["ST000", "ST001", "ST002"]
+
+    response = client.get(
+        "/api/v1/students/export",
+        headers={"Authorization": f"Bearer {admin_token}"},
+        params={"format": "ndjson", "fields": "id,gpa", "search": "student 1"}
+    )
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 1
+    assert set(rows[0]) == {"id", "gpa"}
+
+    response = client.get(
+        "/api/v1/students/export",
+        headers={"Authorization": f"Bearer {admin_token}"},
+        params={"fields": "hashed_password"}
+    )
+    assert response.status_code == 400
@@ -0,0 +1,76 @@
+from app.core.timetable import Room, Section, Slot, TimetableSolver
+
+def test_solver_avoids_conflicts():
+    slots = [Slot(1, 1, 1), Slot(2, 1, 2), Slot(3, 2, 1)]
+    rooms = [Room(1, 30), Room(2, 100), Room(3, 30)]
+    sections = [
+        Section(1, 1, "GV A", 80, 2),   # needs the big room on two different days
+        Section(2, 1, "GV B", 20, 1),   # same student class as section 1
+        Section(3, 2, "GV A", 20, 1),   # same lecturer as section 1
+        Section(4, 3, "GV C", 90, 1),   # competes with section 1 for the big room
+    ]
+    solver = TimetableSolver(sections, rooms, slots)
+    assert solver.solve() == []
+
+    placed = solver.assignments
+    assert len(placed) == 5
+    assert len(set(placed.values())) == 5
+    day = {slot.id: slot.day for slot in slots}
+    assert day[placed[(1, 0)][0]] != day[placed[(1, 1)][0]]
+    for key in ((1, 0), (1, 1), (4, 0)):
+        assert placed[key][1] == 2
+    slots_of_section_1 = {placed[(1, 0)][0], placed[(1, 1)][0]}
+    assert placed[(2, 0)][0] not in slots_of_section_1
+    assert placed[(3, 0)][0] not in slots_of_section_1
+
+def test_solver_reports_unplaceable_sessions():
+    solver = TimetableSolver([Section(1, 1, "GV A", 50, 2)], [Room(1, 60)], [Slot(1, 1, 1), Slot(2, 1, 2)])
+    # Two sessions must fall on different days, but there is only one day
+    assert solver.solve() == [(1, 1)]
+
+def test_schedule_job_and_incremental_resolve(client, admin_token, test_class):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    for name, capacity in (("A101", 40), ("B201", 120)):
+        response = client.post("/api/v1/timetable/rooms", headers=headers, json={"name": name, "capacity": capacity})
+        assert response.status_code == 200
+    for day in (1, 2, 3):
+        for period in (1, 2):
+            response = client.post("/api/v1/timetable/slots", headers=headers, json={"day_of_week": day, "period": period})
+            assert response.status_code == 200
+    section_ids = []
+    for i, (size, sessions) in enumerate(((100, 2), (30, 2), (35, 1))):
+        response = client.post("/api/v1/timetable/sections", headers=headers, json={
+            "code": f"INT{i}", "name": f"Môn {i}", "class_id": test_class.id,
+            "lecturer": f"GV {i}", "size": size, "sessions_per_week": sessions
+        })
+        assert response.status_code == 200
+        section_ids.append(response.json()["id"])
+
+    response = client.post("/api/v1/timetable/jobs", headers=headers, json={})
+    assert response.status_code == 202
+    job = client.get(f"/api/v1/timetable/jobs/{response.json()['id']}", headers=headers).json()
+    assert job["status"] == "done"
+    assert (job["assigned"], job["unassigned"]) == (5, 0)
+
+    timetable = client.get(f"/api/v1/timetable/classes/{test_class.id}", headers=headers).json()
+    assert len(timetable) == 5
+    # One student class: never two sessions in the same slot
+    assert len({(row["day_of_week"], row["period"]) for row in timetable}) == 5
+    assert all(row["room_name"] == "B201" for row in timetable if row["section_id"] == section_ids[0])
+    before = {(row["section_id"], row["session"]): (row["day_of_week"], row["period"]) for row in timetable}
+
+    # Updating a section re-solves only that section
+    response = client.put(f"/api/v1/timetable/sections/{section_ids[2]}", headers=headers, json={"size": 110})
+    assert response.status_code == 200
+    resolve_job = client.get(f"/api/v1/timetable/jobs/{job['id'] + 1}", headers=headers).json()
+    assert resolve_job["section_id"] == section_ids[2]
+    assert resolve_job["status"] == "done"
+    timetable = client.get(f"/api/v1/timetable/classes/{test_class.id}", headers=headers).json()
+    after = {(row["section_id"], row["session"]): (row["day_of_week"], row["period"]) for row in timetable}
+    assert len(after) == 5
+    assert all(after[key] == before[key] for key in after if key[0] != section_ids[2])
+    assert all(row["room_name"] == "B201" for row in timetable if row["section_id"] == section_ids[2])
+
+def test_timetable_requires_admin_for_changes(client, test_class):
+    response = client.post("/api/v1/timetable/rooms", json={"name": "A101", "capacity": 40})
+    assert response.status_code == 401